@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+
+from tortoise import Tortoise
+
+from app.core.config import DATABASE_CONFIG
+from app.core.daily_stats import daily_stats
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="drop the existing daily stats and roll up every interaction again",
+    )
+    args = parser.parse_args()
+
+    await Tortoise.init(config=DATABASE_CONFIG)
+    try:
+        if args.rebuild:
+            await daily_stats.reset()
+        rolled_up = await daily_stats.rollup()
+        print(f"Rolled up {rolled_up} interactions into daily stats")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,19 @@
+import asyncio
+
+from tortoise import Tortoise
+
+from app.core.config import DATABASE_CONFIG
+from app.core.similar import build_similar_projects
+
+
+async def main():
+    await Tortoise.init(config=DATABASE_CONFIG)
+    try:
+        built = await build_similar_projects()
+        print(f"Stored similar projects for {built} projects")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
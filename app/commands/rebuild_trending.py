@@ -0,0 +1,19 @@
+import asyncio
+
+from tortoise import Tortoise
+
+from app.core.config import DATABASE_CONFIG
+from app.core.trending import trending
+
+
+async def main():
+    await Tortoise.init(config=DATABASE_CONFIG)
+    try:
+        scored = await trending.rebuild()
+        print(f"Rebuilt trending scores of {scored} projects")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
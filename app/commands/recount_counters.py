@@ -0,0 +1,19 @@
+import asyncio
+
+from tortoise import Tortoise
+
+from app.core.config import DATABASE_CONFIG
+from app.core.counters import recount_counters
+
+
+async def main():
+    await Tortoise.init(config=DATABASE_CONFIG)
+    try:
+        updated = await recount_counters()
+        print(f"Recounted counters of {updated} projects")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
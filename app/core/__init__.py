@@ -1,4 +1,26 @@
 from . import auth
+from . import cache
 from . import deps
 from . import config
 from . import project
+from . import counters
+from . import daily_stats
+from . import schema
+from . import metrics
+from . import trending
+from . import view_recorder
+from . import leaderboard
+from . import live
+from . import search
+from . import similar
+from . import pagination
+from . import export
+from . import images
+from . import uploads
+from . import storage
+from . import media
+from . import detail_cache
+from . import interactions
+from . import db
+from . import replicas
+from . import instrumentation
@@ -1,8 +1,7 @@
 import secrets
 
 from pathlib import Path
-from typing import List, Set
-from pydantic import computed_field
+from typing import Dict, List, Literal, Optional, Set
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -20,24 +19,41 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str
 
-    @computed_field
-    @property
-    def POSTGRESQL_DATABASE_URI(self) -> str:
-        return (
-            f"asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
-            f"@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
-        )
+    # Connections are opened per worker process, so the server sees up to
+    # DB_POOL_MAX_SIZE * workers. Behind a transaction-mode pooler (PgBouncer,
+    # Supavisor) set DB_STATEMENT_CACHE_SIZE=0: prepared statements do not
+    # survive switching server connections.
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_MAX_QUERIES: int = 50_000
+    DB_POOL_MAX_INACTIVE_LIFETIME: float = 300.0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: Optional[float] = 30.0
+
+    # Read-only GET requests are spread over these ("host" or "host:port"),
+    # falling back to the primary when none is healthy.
+    DB_REPLICAS: List[str] = []
+    DB_REPLICA_CHECK_INTERVAL: float = 5.0
+    DB_REPLICA_MAX_LAG: float = 10.0
+    # Users read from the primary this long after any write of theirs.
+    DB_REPLICA_STICKY_SECONDS: float = 10.0
+    DB_REPLICA_STICKY_CACHE_SIZE: int = 100_000
+
+    SLOW_REQUEST_SECONDS: float = 1.0
+    SERVER_TIMING: bool = True
+    # When set, /metrics requires "Authorization: Bearer <token>".
+    METRICS_TOKEN: Optional[str] = None
+    # Telegram ids of the users allowed to use the /admin endpoints.
+    ADMIN_TELEGRAM_IDS: Set[int] = set()
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 180
+    AUTH_TOKEN_CACHE_SIZE: int = 10_000
+    AUTH_TOKEN_CACHE_TTL: float = 300.0
+    AUTH_USER_CACHE_SIZE: int = 10_000
+    AUTH_USER_CACHE_TTL: float = 60.0
     BASE_DIR: Path = Path(__file__).resolve().parent.parent
     UPLOAD_DIR: str = "uploads"
 
-    ALLOWED_IMAGE_TYPES: List[str] = [
-        "image/jpeg",
-        "image/png",
-        "image/gif",
-        "image/webp",
-    ]
     ALLOWED_IMAGE_EXTENSIONS: Set[str] = {
         "jpg",
         "jpeg",
@@ -46,12 +62,119 @@ class Settings(BaseSettings):
         "webp",
     }  # type: ignore
     MAX_IMAGE_SIZE: int = 10 * 1024 * 1024  # 10 MB
+    # Derivative name -> longest side in pixels.
+    IMAGE_DERIVATIVES: Dict[str, int] = {
+        "thumbnail": 320,
+        "card": 800,
+        "full": 1920,
+    }
+    IMAGE_DERIVATIVE_FORMAT: Literal["webp", "jpeg"] = "webp"
+    IMAGE_DERIVATIVE_QUALITY: int = 80
+    IMAGE_WORKERS: int = 2
+    # Unreferenced images are deleted once this long has passed since their
+    # last upload or release, so keep it longer than a draft stays unsaved.
+    IMAGE_GC_GRACE: float = 7 * 24 * 3600
+    IMAGE_GC_INTERVAL: float = 3600.0
+    IMAGE_GC_BATCH_SIZE: int = 500
+
+    MEDIA_CACHE_SIZE: int = 4096
+    MEDIA_CACHE_TTL: float = 60.0
+    MEDIA_MAX_AGE: int = 3600
+
+    PROJECT_CACHE_SIZE: int = 1000
+    PROJECT_CACHE_TTL: float = 600.0
+
+    VIEW_FLUSH_INTERVAL: float = 2.0
+    VIEW_FLUSH_BATCH_SIZE: int = 1000
+    VIEW_QUEUE_MAX_SIZE: int = 50_000
+    VIEW_RECORDED_CACHE_SIZE: int = 100_000
+
+    LEADERBOARD_SIZE: int = 50
+    LEADERBOARD_REFRESH_INTERVAL: float = 60.0
+    LEADERBOARD_MIN_REFRESH_INTERVAL: float = 5.0
+
+    # An interaction's weight halves every TRENDING_HALF_LIFE seconds.
+    TRENDING_HALF_LIFE: float = 12 * 3600
+    TRENDING_WEIGHTS: Dict[str, float] = {"view": 1.0, "like": 4.0, "share": 8.0}
+    TRENDING_SIZE: int = 100
+    TRENDING_REFRESH_INTERVAL: float = 5.0
+    TRENDING_CHECKPOINT_INTERVAL: float = 30.0
+    TRENDING_PRUNE_INTERVAL: float = 3600.0
+    # Projects whose decayed score drops below this are forgotten.
+    TRENDING_MIN_SCORE: float = 0.05
+    TRENDING_LIKED_CACHE_SIZE: int = 100_000
+
+    # Live counter updates: at most one message per LIVE_INTERVAL per project.
+    LIVE_INTERVAL: float = 1.0
+    LIVE_RESYNC_INTERVAL: float = 10.0
+    LIVE_HEARTBEAT_INTERVAL: float = 15.0
+    LIVE_MAX_SUBSCRIBERS: int = 10_000
+
+    DAILY_STATS_INTERVAL: float = 60.0
+    # Interactions are rolled up once they are this old, so rows from
+    # transactions that were still open when the watermark moved are not skipped.
+    DAILY_STATS_DELAY: float = 60.0
+    DAILY_STATS_BATCH_SIZE: int = 100_000
+    DAILY_STATS_MAX_DAYS: int = 366
+
+    SIMILAR_K: int = 20
+    SIMILAR_WEIGHTS: Dict[str, float] = {"view": 1.0, "like": 3.0}
+    SIMILAR_MIN_SCORE: float = 0.01
+    # Dense similarity cells per batch while building (4 bytes each).
+    SIMILAR_BATCH_CELLS: int = 25_000_000
+
+    SEARCH_BACKEND: Literal["postgres", "memory"] = "postgres"
+    SEARCH_SIMILARITY_THRESHOLD: float = 0.3
+    SEARCH_MAX_LIMIT: int = 50
+    FEED_MAX_LIMIT: int = 50
+    PROJECT_BLOCKS_MAX_LIMIT: int = 200
+    PROJECT_MAX_BLOCKS: int = 1000
+    PROJECT_MAX_BLOCK_SIZE: int = 64 * 1024
+    PROJECT_BATCH_MAX_IDS: int = 100
+    # Rows per query while exporting; block data makes rows much larger.
+    EXPORT_BATCH_SIZE: int = 1000
+    EXPORT_BLOCKS_BATCH_SIZE: int = 50
 
 
 settings = Settings()
 
+
+def database_connection(host: str, port: int) -> dict:
+    return {
+        "engine": "app.core.db",
+        "credentials": {
+            "host": host,
+            "port": port,
+            "user": settings.POSTGRES_USER,
+            "password": settings.POSTGRES_PASSWORD,
+            "database": settings.POSTGRES_DB,
+            "minsize": settings.DB_POOL_MIN_SIZE,
+            "maxsize": settings.DB_POOL_MAX_SIZE,
+            "max_queries": settings.DB_POOL_MAX_QUERIES,
+            "max_inactive_connection_lifetime": settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        },
+    }
+
+
+def _replica_connection(address: str) -> dict:
+    host, _, port = address.partition(":")
+    return database_connection(host, int(port or settings.POSTGRES_PORT))
+
+
+REPLICA_CONNECTIONS = {
+    f"replica_{index}": _replica_connection(address)
+    for index, address in enumerate(settings.DB_REPLICAS, 1)
+}
+
 DATABASE_CONFIG = {
-    "connections": {"default": settings.POSTGRESQL_DATABASE_URI},
+    "connections": {
+        "default": database_connection(
+            settings.POSTGRES_SERVER, settings.POSTGRES_PORT
+        ),
+        **REPLICA_CONNECTIONS,
+    },
     "apps": {
         "models": {
             "models": ["app.models.models", "aerich.models"],
@@ -59,3 +182,6 @@ DATABASE_CONFIG = {
         },
     },
 }
+
+if REPLICA_CONNECTIONS:
+    DATABASE_CONFIG["routers"] = ["app.core.replicas.ReplicaRouter"]
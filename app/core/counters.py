@@ -0,0 +1,40 @@
+from tortoise import Tortoise
+from tortoise.expressions import F
+
+from app.models.models import Project
+
+
+COUNTER_FIELDS = ("likes_count", "views_count", "shares_count")
+
+
+async def change_counter(project_id, field: str, delta: int):
+    if field not in COUNTER_FIELDS:
+        raise ValueError(f"Unknown counter field: {field}")
+
+    await Project.filter(id=project_id).update(
+        **{field: F(field) + delta}, version=F("version") + 1
+    )
+
+
+async def recount_counters() -> int:
+    query = """
+        UPDATE projects SET
+            likes_count = (
+                SELECT COUNT(*) FROM project_likes
+                WHERE project_likes.project_id = projects.id
+            ),
+            views_count = (
+                SELECT COUNT(*) FROM project_views
+                WHERE project_views.project_id = projects.id
+            ),
+            shares_count = (
+                SELECT COUNT(*) FROM project_shares
+                WHERE project_shares.project_id = projects.id
+            ),
+            version = version + 1
+        RETURNING id
+    """
+
+    # asyncpg reports the rows returned rather than the rows updated.
+    _, rows = await Tortoise.get_connection("default").execute_query(query)
+    return len(rows)
@@ -0,0 +1,319 @@
+import asyncio
+import datetime
+import logging
+from collections import Counter as CounterDict
+from typing import List, Optional
+from uuid import UUID
+
+from tortoise import Tortoise
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge
+from app.models.models import (
+    ProjectDailyStats,
+    ProjectLike,
+    ProjectShare,
+    ProjectUnlike,
+    ProjectView,
+    RollupWatermark,
+)
+
+
+logger = logging.getLogger(__name__)
+
+ROLLED_UP = Counter(
+    "daily_stats_rolled_up_total", "Interactions added to project_daily_stats", ["kind"]
+)
+WATERMARK = Gauge(
+    "daily_stats_watermark", "Last interaction id rolled up per table", ["kind"]
+)
+
+# project_daily_stats column -> interaction model.
+SOURCES = {"views": ProjectView, "likes": ProjectLike, "shares": ProjectShare}
+STATS_COLUMNS = tuple(SOURCES)
+
+INIT_WATERMARK_QUERY = """
+    INSERT INTO rollup_watermarks (name, last_id, updated_time)
+    VALUES ($1, 0, now())
+    ON CONFLICT (name) DO NOTHING
+"""
+
+# Held until the transaction commits, so concurrent workers take turns.
+LOCK_WATERMARK_QUERY = """
+    SELECT last_id FROM rollup_watermarks WHERE name = $1 FOR UPDATE
+"""
+
+BATCH_BOUNDS_QUERY = """
+    SELECT max(id) AS upper_id, count(*) AS count FROM (
+        SELECT id FROM {table}
+        WHERE id > $1 AND created_time <= now() - make_interval(secs => $2)
+        ORDER BY id
+        LIMIT $3
+    ) AS batch
+"""
+
+ROLLUP_QUERY = """
+    INSERT INTO project_daily_stats (project_id, day, views, likes, shares)
+    SELECT project_id, (created_time AT TIME ZONE 'UTC')::date, {counts}
+    FROM ({rows}) AS interactions
+    GROUP BY 1, 2
+    ON CONFLICT (project_id, day) DO UPDATE SET
+        {column} = project_daily_stats.{column} + EXCLUDED.{column}
+"""
+
+ROWS_QUERY = "SELECT project_id, created_time FROM {table} WHERE id > $1 AND id <= $2"
+
+# Every like given is counted once: from project_likes if it is still there,
+# otherwise from its unlike, which the toggle swaps in atomically. The unlike
+# rollup then takes it back.
+LIKE_ROWS_QUERY = (
+    ROWS_QUERY.format(table="project_likes")
+    + " UNION ALL SELECT project_id, liked_time FROM project_unlikes"
+    " WHERE like_id > $1 AND like_id <= $2"
+)
+
+UPDATE_WATERMARK_QUERY = """
+    UPDATE rollup_watermarks SET last_id = $2, updated_time = now() WHERE name = $1
+"""
+
+# Takes removed likes back from the day they were given. Only likes within the
+# likes watermark have been counted; the others wait for it to pass them.
+ROLLUP_UNLIKES_QUERY = """
+    WITH removed AS (
+        DELETE FROM project_unlikes
+        WHERE id IN (
+            SELECT id FROM project_unlikes WHERE like_id <= $1 ORDER BY id LIMIT $2
+        )
+        RETURNING project_id, liked_time
+    ), counted AS (
+        SELECT project_id, (liked_time AT TIME ZONE 'UTC')::date AS day,
+            COUNT(*) AS likes
+        FROM removed
+        GROUP BY 1, 2
+    ), updated AS (
+        UPDATE project_daily_stats
+        SET likes = project_daily_stats.likes - counted.likes
+        FROM counted
+        WHERE project_daily_stats.project_id = counted.project_id
+            AND project_daily_stats.day = counted.day
+    )
+    SELECT COUNT(*) AS count FROM removed
+"""
+
+
+def _utc_day(value: datetime.datetime) -> datetime.date:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc).date()
+
+
+class DailyStatsRollup:
+    """Adds new likes, views and shares to per-project daily counts.
+
+    Each interaction table has a watermark (the last id counted), so a pass
+    only reads rows inserted since the previous one. Likes count on the day
+    they are given, and removing one takes it back from that day, so a day
+    shows the likes given on it that are still there.
+    """
+
+    def __init__(self, interval: float, delay: float, batch_size: int):
+        self.interval = interval
+        self.delay = delay
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def rollup(self) -> int:
+        total = 0
+        for column in STATS_COLUMNS:
+            while True:
+                rolled_up = await self._rollup_batch(column)
+                total += rolled_up
+                if rolled_up < self.batch_size:
+                    break
+        # After the likes, so that likes counted in this pass are taken back.
+        while True:
+            rolled_up = await self._rollup_unlikes_batch()
+            total += rolled_up
+            if rolled_up < self.batch_size:
+                break
+        return total
+
+    async def _rollup_batch(self, column: str) -> int:
+        connection = Tortoise.get_connection("default")
+        if connection.capabilities.dialect != "postgres":
+            return await self._rollup_batch_fallback(column)
+
+        table = SOURCES[column]._meta.db_table
+        counts = ", ".join(
+            "COUNT(*)" if name == column else "0" for name in STATS_COLUMNS
+        )
+        await connection.execute_query(INIT_WATERMARK_QUERY, [table])
+        async with in_transaction() as transaction:
+            _, rows = await transaction.execute_query(LOCK_WATERMARK_QUERY, [table])
+            last_id = rows[0]["last_id"]
+            _, rows = await transaction.execute_query(
+                BATCH_BOUNDS_QUERY.format(table=table),
+                [last_id, self.delay, self.batch_size],
+            )
+            upper_id, count = rows[0]["upper_id"], rows[0]["count"]
+            if upper_id is None:
+                return 0
+
+            rows_query = (
+                LIKE_ROWS_QUERY if column == "likes" else ROWS_QUERY.format(table=table)
+            )
+            await transaction.execute_query(
+                ROLLUP_QUERY.format(rows=rows_query, counts=counts, column=column),
+                [last_id, upper_id],
+            )
+            await transaction.execute_query(UPDATE_WATERMARK_QUERY, [table, upper_id])
+
+        ROLLED_UP.inc(count, kind=column)
+        WATERMARK.set(upper_id, kind=column)
+        return count
+
+    async def _rollup_batch_fallback(self, column: str) -> int:
+        model = SOURCES[column]
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+            seconds=self.delay
+        )
+        async with in_transaction():
+            watermark, _ = await RollupWatermark.get_or_create(
+                name=model._meta.db_table
+            )
+            rows = (
+                await model.filter(id__gt=watermark.last_id, created_time__lte=cutoff)
+                .order_by("id")
+                .limit(self.batch_size)
+                .values_list("id", "project_id", "created_time")
+            )
+            if not rows:
+                return 0
+
+            days = CounterDict(
+                (project_id, _utc_day(created_time))
+                for _, project_id, created_time in rows
+            )
+            if column == "likes":
+                days.update(
+                    (project_id, _utc_day(liked_time))
+                    for project_id, liked_time in await ProjectUnlike.filter(
+                        like_id__gt=watermark.last_id, like_id__lte=rows[-1][0]
+                    ).values_list("project_id", "liked_time")
+                )
+            for (project_id, day), count in days.items():
+                updated = await ProjectDailyStats.filter(
+                    project_id=project_id, day=day
+                ).update(**{column: F(column) + count})
+                if not updated:
+                    await ProjectDailyStats.create(
+                        project_id=project_id, day=day, **{column: count}
+                    )
+            watermark.last_id = rows[-1][0]
+            await watermark.save()
+
+        ROLLED_UP.inc(len(rows), kind=column)
+        WATERMARK.set(watermark.last_id, kind=column)
+        return len(rows)
+
+    async def _rollup_unlikes_batch(self) -> int:
+        connection = Tortoise.get_connection("default")
+        if connection.capabilities.dialect != "postgres":
+            return await self._rollup_unlikes_batch_fallback()
+
+        table = ProjectLike._meta.db_table
+        await connection.execute_query(INIT_WATERMARK_QUERY, [table])
+        async with in_transaction() as transaction:
+            # Waits for a likes batch in progress to move the watermark.
+            _, rows = await transaction.execute_query(LOCK_WATERMARK_QUERY, [table])
+            _, rows = await transaction.execute_query(
+                ROLLUP_UNLIKES_QUERY, [rows[0]["last_id"], self.batch_size]
+            )
+        count = rows[0]["count"]
+        ROLLED_UP.inc(count, kind="unlikes")
+        return count
+
+    async def _rollup_unlikes_batch_fallback(self) -> int:
+        async with in_transaction():
+            watermark, _ = await RollupWatermark.get_or_create(
+                name=ProjectLike._meta.db_table
+            )
+            rows = (
+                await ProjectUnlike.filter(like_id__lte=watermark.last_id)
+                .order_by("id")
+                .limit(self.batch_size)
+                .values_list("id", "project_id", "liked_time")
+            )
+            if not rows:
+                return 0
+
+            days = CounterDict(
+                (project_id, _utc_day(liked_time)) for _, project_id, liked_time in rows
+            )
+            for (project_id, day), count in days.items():
+                await ProjectDailyStats.filter(project_id=project_id, day=day).update(
+                    likes=F("likes") - count
+                )
+            await ProjectUnlike.filter(id__in=[row[0] for row in rows]).delete()
+
+        ROLLED_UP.inc(len(rows), kind="unlikes")
+        return len(rows)
+
+    async def reset(self):
+        async with in_transaction() as transaction:
+            await ProjectDailyStats.all().using_db(transaction).delete()
+            # The likes left are counted again from scratch, so earlier
+            # removals are already accounted for.
+            await ProjectUnlike.all().using_db(transaction).delete()
+            await RollupWatermark.filter(
+                name__in=[model._meta.db_table for model in SOURCES.values()]
+            ).using_db(transaction).delete()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rollup()
+            except Exception:
+                logger.exception("Failed to roll up daily project stats")
+            await asyncio.sleep(self.interval)
+
+
+async def get_daily_stats(
+    project_id: UUID, start: datetime.date, end: datetime.date
+) -> List[dict]:
+    """One row per day from start to end inclusive; days without any
+    interactions are zero."""
+    rows = await ProjectDailyStats.filter(
+        project_id=project_id, day__gte=start, day__lte=end
+    ).values("day", *STATS_COLUMNS)
+    by_day = {row["day"]: row for row in rows}
+    empty = dict.fromkeys(STATS_COLUMNS, 0)
+    return [
+        by_day.get(day, {"day": day, **empty})
+        for day in (
+            start + datetime.timedelta(days=offset)
+            for offset in range((end - start).days + 1)
+        )
+    ]
+
+
+daily_stats = DailyStatsRollup(
+    interval=settings.DAILY_STATS_INTERVAL,
+    delay=settings.DAILY_STATS_DELAY,
+    batch_size=settings.DAILY_STATS_BATCH_SIZE,
+)
@@ -0,0 +1,150 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Tuple
+
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from app.core.metrics import Gauge, Histogram
+
+
+POOL_SIZE = Gauge(
+    "db_pool_size", "Open connections in the database pool", ["connection"]
+)
+POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Connections checked out of the pool", ["connection"]
+)
+POOL_WAITING = Gauge(
+    "db_pool_waiting", "Tasks waiting to acquire a pool connection", ["connection"]
+)
+POOL_ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a pool connection",
+    ["connection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+class InstrumentedPool:
+    """Wraps an asyncpg pool to record saturation metrics on acquire/release."""
+
+    def __init__(self, pool, name: str):
+        self._pool = pool
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+    async def acquire(self, *, timeout=None):
+        POOL_WAITING.inc(connection=self._name)
+        started = time.perf_counter()
+        try:
+            connection = await self._pool.acquire(timeout=timeout)
+        finally:
+            POOL_WAITING.dec(connection=self._name)
+            POOL_ACQUIRE_SECONDS.observe(
+                time.perf_counter() - started, connection=self._name
+            )
+        POOL_IN_USE.inc(connection=self._name)
+        POOL_SIZE.set(self._pool.get_size(), connection=self._name)
+        return connection
+
+    async def release(self, connection, *, timeout=None):
+        try:
+            await self._pool.release(connection, timeout=timeout)
+        finally:
+            POOL_IN_USE.dec(connection=self._name)
+            POOL_SIZE.set(self._pool.get_size(), connection=self._name)
+
+
+class InstrumentedAsyncpgClient(AsyncpgDBClient):
+    async def create_pool(self, **kwargs):
+        pool = await super().create_pool(**kwargs)
+        POOL_SIZE.set(pool.get_size(), connection=self.connection_name)
+        return InstrumentedPool(pool, self.connection_name)
+
+
+# Lets DATABASE_CONFIG use this module as a Tortoise engine.
+client_class = InstrumentedAsyncpgClient
+
+
+# Statements kept per request for the slow request log.
+QUERY_LOG_LIMIT = 50
+QUERY_LOG_LENGTH = 500
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    # (seconds, statement) of the first QUERY_LOG_LIMIT queries.
+    queries: List[Tuple[float, str]] = field(default_factory=list)
+
+
+QUERY_METHODS = (
+    "execute_insert",
+    "execute_many",
+    "execute_query",
+    "execute_query_dict",
+    "execute_script",
+)
+
+# Nested track_queries() blocks (e.g. a benchmark around a request) all count.
+_query_stats: ContextVar[Tuple[QueryStats, ...]] = ContextVar(
+    "query_stats", default=()
+)
+# Set while a tracked method runs, so methods calling each other count once.
+_in_query: ContextVar[bool] = ContextVar("in_query", default=False)
+
+
+def _tracked(method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        active = _query_stats.get()
+        if not active or _in_query.get():
+            return await method(self, *args, **kwargs)
+
+        token = _in_query.set(True)
+        started = time.perf_counter()
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            for stats in active:
+                stats.count += 1
+                stats.seconds += elapsed
+                if len(stats.queries) < QUERY_LOG_LIMIT and args:
+                    stats.queries.append((elapsed, str(args[0])[:QUERY_LOG_LENGTH]))
+            _in_query.reset(token)
+
+    wrapper.tracks_queries = True
+    return wrapper
+
+
+def _client_classes(base=BaseDBAsyncClient):
+    for subclass in base.__subclasses__():
+        yield subclass
+        yield from _client_classes(subclass)
+
+
+def instrument_queries():
+    """Makes every loaded Tortoise client class, transaction wrappers included,
+    report to track_queries(). Call after Tortoise.init; safe to repeat."""
+    for client_class in set(_client_classes()):
+        for name in QUERY_METHODS:
+            method = client_class.__dict__.get(name)
+            if method is not None and not getattr(method, "tracks_queries", False):
+                setattr(client_class, name, _tracked(method))
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    stats = QueryStats()
+    token = _query_stats.set((*_query_stats.get(), stats))
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
@@ -1,20 +1,61 @@
+import time
 from typing import Annotated, Optional
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError, ExpiredSignatureError
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.models.models import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/telegram-login")
 
+_token_cache = TTLCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+_user_cache = TTLCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
+
+
+def decode_token(token: str) -> dict:
+    payload = _token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
+        # Never keep a token around longer than it is valid.
+        _token_cache.set(token, payload, ttl=payload.get("exp", 0) - time.time())
+    return payload
+
+
+def _get_user_id(payload: dict) -> Optional[int]:
+    try:
+        return int(payload.get("user_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def token_user_id(token: str) -> Optional[int]:
+    try:
+        return _get_user_id(decode_token(token))
+    except JWTError:
+        return None
+
+
+async def get_user(user_id: int) -> Optional[User]:
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = await User.get_or_none(id=user_id)
+        if user:
+            _user_cache.set(user_id, user)
+    return user
+
+
+def invalidate_user(user_id: int):
+    _user_cache.pop(user_id)
+
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     auth_exception = HTTPException(status_code=401, detail="Authentication is required")
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
-        user_id = payload.get("user_id")
+        payload = decode_token(token)
+        user_id = _get_user_id(payload)
         if not user_id:
             raise auth_exception
     except ExpiredSignatureError:
@@ -22,7 +63,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     except JWTError:
         raise HTTPException(status_code=403, detail="Invalid token")
 
-    user = await User.get_or_none(id=user_id)
+    user = await get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -32,6 +73,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
 CurrentUserDep = Annotated[User, Depends(get_current_user)]
 
 
+async def get_admin_user(user: CurrentUserDep) -> User:
+    if user.telegram_id not in settings.ADMIN_TELEGRAM_IDS:
+        raise HTTPException(status_code=403, detail="Admin access is required")
+    return user
+
+
+AdminUserDep = Annotated[User, Depends(get_admin_user)]
+
+
 oauth2_scheme_optional = OAuth2PasswordBearer(
     tokenUrl="api/auth/telegram-login", auto_error=False
 )
@@ -44,8 +94,8 @@ async def get_optional_user(
         return None
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
-        user_id = payload.get("user_id")
+        payload = decode_token(token)
+        user_id = _get_user_id(payload)
         if not user_id:
             return None
     except ExpiredSignatureError:
@@ -53,7 +103,7 @@ async def get_optional_user(
     except JWTError:
         return None
 
-    user = await User.get_or_none(id=user_id)
+    user = await get_user(user_id)
     return user
 
 
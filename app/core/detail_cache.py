@@ -0,0 +1,63 @@
+from typing import Optional, Tuple
+from uuid import UUID
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.encoding import dumps
+from app.models.models import Project
+
+
+# Encoded public part of the project detail response, keyed by (id, project
+# version, author version). Changes to the project bump its version and
+# changes to the author's profile bump theirs, so every worker sees a new key.
+_details = TTLCache(settings.PROJECT_CACHE_SIZE, settings.PROJECT_CACHE_TTL)
+
+
+def project_etag(
+    project_id: UUID, version: int, author_version: int, liked: bool
+) -> str:
+    return f'"{project_id.hex}-{version}-{author_version}-{int(liked)}"'
+
+
+def serialize_project(project: Project) -> bytes:
+    return dumps(
+        {
+            "id": project.id,
+            "user": {
+                "id": project.user.id,
+                "telegram_id": project.user.telegram_id,
+                "username": project.user.username,
+                "first_name": project.user.first_name,
+                "last_name": project.user.last_name,
+            },
+            "data": project.data,
+            "views_count": project.views_count,
+            "likes_count": project.likes_count,
+            "shares_count": project.shares_count,
+            "created_time": project.created_time,
+            "required_funds": project.required_funds,
+        }
+    )
+
+
+def with_liked(detail: bytes, liked: bool) -> bytes:
+    # Splice the per-user flag into the cached object instead of re-encoding.
+    return detail[:-1] + (b',"liked":true}' if liked else b',"liked":false}')
+
+
+async def get_project_detail(
+    project_id: UUID, version: int, author_version: int
+) -> Tuple[Optional[bytes], int, int]:
+    """Returns the encoded public detail and the project and author versions
+    it belongs to."""
+    detail = _details.get((project_id, version, author_version))
+    if detail is not None:
+        return detail, version, author_version
+
+    project = await Project.filter(id=project_id).select_related("user").first()
+    if project is None:
+        return None, version, author_version
+
+    detail = serialize_project(project)
+    _details.set((project.id, project.version, project.user.version), detail)
+    return detail, project.version, project.user.version
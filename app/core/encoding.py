@@ -0,0 +1,14 @@
+from uuid import UUID
+
+import orjson
+
+
+def _default(value):
+    # asyncpg returns its own UUID subclass, which orjson does not recognise.
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError
+
+
+def dumps(value) -> bytes:
+    return orjson.dumps(value, default=_default)
@@ -0,0 +1,99 @@
+import csv
+import io
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.counters import COUNTER_FIELDS
+from app.core.encoding import dumps
+from app.core.pagination import after_cursor, encode_cursor
+from app.models.models import Project
+
+
+EXPORT_FIELDS = (
+    "id",
+    "user_id",
+    "title",
+    "subtitle",
+    "image_url",
+    "required_funds",
+    "created_time",
+)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def export_columns(include_blocks: bool, include_counts: bool) -> Tuple[str, ...]:
+    return (
+        *EXPORT_FIELDS,
+        *(COUNTER_FIELDS if include_counts else ()),
+        *(("data",) if include_blocks else ()),
+    )
+
+
+async def iter_project_batches(
+    columns: Tuple[str, ...], cursor: Optional[str], batch_size: int
+) -> AsyncIterator[List[dict]]:
+    """Oldest first, one short keyset query per batch, so no connection or
+    transaction stays open between batches and rows added meanwhile are
+    picked up at the end.
+
+    Every row carries the cursor to resume after it.
+    """
+    while True:
+        rows = (
+            await after_cursor(Project.all(), cursor, descending=False)
+            .limit(batch_size)
+            .values(*columns)
+        )
+        for row in rows:
+            row["cursor"] = encode_cursor(row["created_time"], row["id"])
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        cursor = rows[-1]["cursor"]
+
+
+def _ndjson(rows: List[dict]) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return dumps(value).decode()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv(lines: Iterable[Iterable[str]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(lines)
+    return buffer.getvalue().encode()
+
+
+async def export_projects(
+    format: str,
+    cursor: Optional[str],
+    include_blocks: bool,
+    include_counts: bool,
+) -> AsyncIterator[bytes]:
+    columns = export_columns(include_blocks, include_counts)
+    batch_size = (
+        settings.EXPORT_BLOCKS_BATCH_SIZE
+        if include_blocks
+        else settings.EXPORT_BATCH_SIZE
+    )
+
+    header = (*columns, "cursor")
+    if format == "csv":
+        yield _csv([header])
+    async for rows in iter_project_batches(columns, cursor, batch_size):
+        if format == "csv":
+            yield _csv(
+                [_csv_value(row[column]) for column in header] for row in rows
+            )
+        else:
+            yield _ndjson(rows)
@@ -0,0 +1,129 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+_FORMATS = {
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def images_dir() -> str:
+    return os.path.join(settings.BASE_DIR, settings.UPLOAD_DIR, "images")
+
+
+def image_url(filename: str) -> str:
+    return f"https://{settings.ORIGIN}/api/{settings.UPLOAD_DIR}/images/{filename}"
+
+
+def clean_derivatives(value) -> Optional[Dict[str, str]]:
+    if not isinstance(value, dict):
+        return None
+    derivatives = {
+        name: url
+        for name, url in value.items()
+        if name in settings.IMAGE_DERIVATIVES and isinstance(url, str)
+    }
+    return derivatives or None
+
+
+def _render_derivatives(
+    source: str, targets: Dict[str, Tuple[str, int]], image_format: str, quality: int
+) -> Dict[str, Tuple[int, int]]:
+    try:
+        image = Image.open(source)
+        # Let the JPEG decoder downscale while decoding when it can.
+        largest = max(max_size for _, max_size in targets.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    if image_format == "JPEG" or not has_alpha:
+        image = image.convert("RGB")
+    else:
+        image = image.convert("RGBA")
+
+    sizes = {}
+    for name, (path, max_size) in targets.items():
+        derivative = image.copy()
+        derivative.thumbnail((max_size, max_size), Image.LANCZOS)
+        # Saving without exif/icc arguments strips the source metadata.
+        temp_path = f"{path}.tmp"
+        derivative.save(temp_path, format=image_format, quality=quality)
+        os.replace(temp_path, path)
+        sizes[name] = derivative.size
+    return sizes
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    global _pool
+    # Another request may have replaced the broken pool already.
+    if _pool is pool:
+        _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def derivative_extension() -> str:
+    return _FORMATS[settings.IMAGE_DERIVATIVE_FORMAT][1]
+
+
+async def create_derivatives(source: str, stem: str) -> Dict[str, str]:
+    image_format, extension = _FORMATS[settings.IMAGE_DERIVATIVE_FORMAT]
+    filenames = {
+        name: f"{stem}_{name}.{extension}" for name in settings.IMAGE_DERIVATIVES
+    }
+    targets = {
+        name: (os.path.join(images_dir(), filenames[name]), max_size)
+        for name, max_size in settings.IMAGE_DERIVATIVES.items()
+    }
+
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        await loop.run_in_executor(
+            pool,
+            _render_derivatives,
+            source,
+            targets,
+            image_format,
+            settings.IMAGE_DERIVATIVE_QUALITY,
+        )
+    except BrokenProcessPool:
+        # A crashed worker breaks the pool for good; the next call starts a new
+        # one.
+        _discard_pool(pool)
+        raise
+    return filenames
@@ -0,0 +1,112 @@
+import logging
+import time
+
+from app.core.config import settings
+from app.core.db import track_queries
+from app.core.metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM = b"text/event-stream"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to the end of the response body",
+    ["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries issued while handling a request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries while handling a request",
+    ["route"],
+)
+
+
+def route_label(scope, root_path: str) -> str:
+    # The route template keeps cardinality bounded (no ids in labels).
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    mounted = scope.get("root_path", "")[len(root_path) :]
+    return f"{mounted}/*" if mounted else "unmatched"
+
+
+def _server_timing(stats, elapsed: float) -> bytes:
+    return (
+        f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries",'
+        f" app;dur={elapsed * 1000:.1f}"
+    ).encode("latin-1")
+
+
+class InstrumentationMiddleware:
+    """Records per-route latency and database usage, adds Server-Timing and
+    logs slow requests together with their queries."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        started = time.perf_counter()
+        status = 500
+        streaming = False
+
+        with track_queries() as stats:
+
+            async def send_with_timing(message):
+                nonlocal status, streaming
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    streaming = any(
+                        name == b"content-type" and value.startswith(EVENT_STREAM)
+                        for name, value in message.get("headers", [])
+                    )
+                    if settings.SERVER_TIMING:
+                        elapsed = time.perf_counter() - started
+                        message["headers"] = [
+                            *message.get("headers", []),
+                            (b"server-timing", _server_timing(stats, elapsed)),
+                        ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                elapsed = time.perf_counter() - started
+                route = route_label(scope, root_path)
+                REQUEST_DURATION.observe(
+                    elapsed, method=scope["method"], route=route, status=status
+                )
+                REQUEST_QUERIES.observe(stats.count, route=route)
+                REQUEST_DB_SECONDS.observe(stats.seconds, route=route)
+                # Event streams are open for as long as the client listens.
+                if elapsed >= settings.SLOW_REQUEST_SECONDS and not streaming:
+                    _log_slow_request(scope, route, status, elapsed, stats)
+
+
+def _log_slow_request(scope, route: str, status: int, elapsed: float, stats):
+    queries = "".join(
+        f"\n  {seconds * 1000:.1f}ms {' '.join(query.split())}"
+        for seconds, query in stats.queries
+    )
+    logger.warning(
+        "Slow request %s %s (%s) -> %s in %.0fms, %d queries in %.0fms%s",
+        scope["method"],
+        scope["path"],
+        route,
+        status,
+        elapsed * 1000,
+        stats.count,
+        stats.seconds * 1000,
+        queries,
+    )
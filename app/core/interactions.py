@@ -0,0 +1,130 @@
+from typing import Optional, Tuple
+from uuid import UUID
+
+from tortoise import Tortoise
+from tortoise.exceptions import DoesNotExist, IntegrityError
+from tortoise.transactions import in_transaction
+
+from app.core.counters import change_counter
+from app.models.models import Project, ProjectLike, ProjectShare, ProjectUnlike
+
+
+# Deletes the like if it exists, otherwise inserts it, and moves the counter by
+# whatever actually happened. When both are no-ops a concurrent toggle inserted
+# the like first, so the pair ends up liked. A deleted like is recorded in
+# project_unlikes for the daily stats.
+TOGGLE_LIKE_QUERY = """
+    WITH deleted AS (
+        DELETE FROM project_likes
+        WHERE user_id = $1 AND project_id = $2
+        RETURNING id, project_id, created_time
+    ), unliked AS (
+        INSERT INTO project_unlikes (project_id, like_id, liked_time)
+        SELECT project_id, id, created_time FROM deleted
+    ), inserted AS (
+        INSERT INTO project_likes (user_id, project_id)
+        SELECT $1, $2
+        WHERE NOT EXISTS (SELECT 1 FROM deleted)
+        ON CONFLICT (user_id, project_id) DO NOTHING
+        RETURNING project_id
+    ), delta AS (
+        SELECT
+            (SELECT COUNT(*) FROM inserted) - (SELECT COUNT(*) FROM deleted) AS value
+    )
+    UPDATE projects
+    SET likes_count = likes_count + delta.value,
+        version = version + 1
+    FROM delta
+    WHERE projects.id = $2
+    RETURNING
+        projects.likes_count,
+        NOT EXISTS (SELECT 1 FROM deleted) AS liked
+"""
+
+RECORD_SHARE_QUERY = """
+    WITH inserted AS (
+        INSERT INTO project_shares (user_id, project_id)
+        VALUES ($1, $2)
+        ON CONFLICT (user_id, project_id) DO NOTHING
+        RETURNING project_id
+    )
+    UPDATE projects
+    SET shares_count = shares_count + 1,
+        version = version + 1
+    WHERE id IN (SELECT project_id FROM inserted)
+    RETURNING shares_count
+"""
+
+
+def _is_postgres(connection) -> bool:
+    return connection.capabilities.dialect == "postgres"
+
+
+async def toggle_like(user_id: int, project_id: UUID) -> Tuple[bool, int]:
+    """Returns the new liked state and likes count, DoesNotExist if no project."""
+    connection = Tortoise.get_connection("default")
+    if not _is_postgres(connection):
+        return await _toggle_like_fallback(user_id, project_id)
+
+    try:
+        rows = await connection.execute_query_dict(
+            TOGGLE_LIKE_QUERY, [user_id, project_id]
+        )
+    except IntegrityError as error:
+        # The only constraint left to violate is the project foreign key.
+        raise DoesNotExist("Project not found") from error
+    if not rows:
+        raise DoesNotExist("Project not found")
+    return rows[0]["liked"], rows[0]["likes_count"]
+
+
+async def record_share(user_id: int, project_id: UUID) -> Optional[int]:
+    """Returns the new shares count, or None if the user already shared."""
+    connection = Tortoise.get_connection("default")
+    if not _is_postgres(connection):
+        return await _record_share_fallback(user_id, project_id)
+
+    try:
+        rows = await connection.execute_query_dict(
+            RECORD_SHARE_QUERY, [user_id, project_id]
+        )
+    except IntegrityError as error:
+        raise DoesNotExist("Project not found") from error
+    if not rows:
+        return None
+    return rows[0]["shares_count"]
+
+
+async def _likes_count(project_id: UUID) -> int:
+    return await Project.get(id=project_id).values_list("likes_count", flat=True)
+
+
+async def _toggle_like_fallback(user_id: int, project_id: UUID) -> Tuple[bool, int]:
+    async with in_transaction():
+        if not await Project.exists(id=project_id):
+            raise DoesNotExist("Project not found")
+
+        like = await ProjectLike.filter(user_id=user_id, project_id=project_id).first()
+        if like is not None:
+            await like.delete()
+            await ProjectUnlike.create(
+                project_id=project_id, like_id=like.id, liked_time=like.created_time
+            )
+            await change_counter(project_id, "likes_count", -1)
+        else:
+            await ProjectLike.create(user_id=user_id, project_id=project_id)
+            await change_counter(project_id, "likes_count", 1)
+        return like is None, await _likes_count(project_id)
+
+
+async def _record_share_fallback(user_id: int, project_id: UUID) -> Optional[int]:
+    try:
+        async with in_transaction():
+            if not await Project.exists(id=project_id):
+                raise DoesNotExist("Project not found")
+
+            await ProjectShare.create(user_id=user_id, project_id=project_id)
+            await change_counter(project_id, "shares_count", 1)
+    except IntegrityError:
+        return None
+    return await Project.get(id=project_id).values_list("shares_count", flat=True)
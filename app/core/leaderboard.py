@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.project import SHORT_PROJECT_FIELDS
+from app.models.models import Project
+
+
+logger = logging.getLogger(__name__)
+
+
+class Leaderboards:
+    METRICS = {
+        "views": "views_count",
+        "likes": "likes_count",
+    }
+
+    def __init__(self, size: int, refresh_interval: float, min_refresh_interval: float):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+
+        self._entries: Dict[str, List[dict]] = {}
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def invalidate(self):
+        self._changed.set()
+
+    async def top(self, metric: str, limit: int) -> List[dict]:
+        if metric not in self._entries:
+            await self.refresh()
+        return self._entries[metric][:limit]
+
+    async def refresh(self):
+        for metric, field in self.METRICS.items():
+            self._entries[metric] = (
+                await Project.all()
+                .order_by(f"-{field}", "-created_time")
+                .limit(self.size)
+                .values(*SHORT_PROJECT_FIELDS)
+            )
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._changed.clear()
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh leaderboards")
+
+            # Coalesce bursts of counter changes into one refresh.
+            await asyncio.sleep(self.min_refresh_interval)
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait(),
+                    max(self.refresh_interval - self.min_refresh_interval, 0),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+
+leaderboards = Leaderboards(
+    size=settings.LEADERBOARD_SIZE,
+    refresh_interval=settings.LEADERBOARD_REFRESH_INTERVAL,
+    min_refresh_interval=settings.LEADERBOARD_MIN_REFRESH_INTERVAL,
+)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Set
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.counters import COUNTER_FIELDS
+from app.core.metrics import Counter, Gauge
+from app.models.models import Project
+
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBERS = Gauge("live_subscribers", "Open live counter subscriptions")
+MESSAGES = Counter("live_messages_total", "Counter updates handed to subscribers")
+CONFLATED = Counter(
+    "live_conflated_total",
+    "Counter updates replaced by a newer one before a subscriber read them",
+)
+
+RESYNC_BATCH_SIZE = 1000
+
+
+class Subscription:
+    """Holds only the newest counts, so a slow client skips intermediate
+    updates instead of buffering them."""
+
+    def __init__(self, project_id: UUID):
+        self.project_id = project_id
+        self.closed = False
+        self._latest: Optional[dict] = None
+        self._ready = asyncio.Event()
+
+    def offer(self, counts: dict):
+        if self._latest is not None:
+            CONFLATED.inc()
+        self._latest = counts
+        self._ready.set()
+        MESSAGES.inc()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """Newest counts, or None when nothing changed within timeout."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        counts, self._latest = self._latest, None
+        return counts
+
+
+class LiveCounters:
+    """In-process pub/sub of project counters.
+
+    Writers publish absolute counts as they learn them; subscribers get at most
+    one message per interval per project. Subscribed projects are also
+    re-read every resync_interval so changes made by other workers show up.
+    """
+
+    def __init__(self, interval: float, resync_interval: float, max_subscribers: int):
+        self.interval = interval
+        self.resync_interval = resync_interval
+        self.max_subscribers = max_subscribers
+
+        self._subscribers: Dict[UUID, Set[Subscription]] = {}
+        self._counts: Dict[UUID, dict] = {}
+        self._dirty: Set[UUID] = set()
+        self._total = 0
+        self._task: Optional[asyncio.Task] = None
+
+        SUBSCRIBERS.set_function(lambda: self._total)
+
+    @property
+    def full(self) -> bool:
+        return self._total >= self.max_subscribers
+
+    def publish(self, project_id: UUID, **counts: int):
+        current = self._counts.get(project_id)
+        if current is None:
+            return
+        for field, value in counts.items():
+            if current[field] != value:
+                current[field] = value
+                self._dirty.add(project_id)
+
+    async def subscribe(self, project_id: UUID) -> Optional[Subscription]:
+        counts = (
+            await Project.filter(id=project_id)
+            .first()
+            .values("id", *COUNTER_FIELDS)
+        )
+        if counts is None:
+            return None
+
+        subscription = Subscription(project_id)
+        self._subscribers.setdefault(project_id, set()).add(subscription)
+        self._counts.setdefault(project_id, counts)
+        self._total += 1
+        subscription.offer(dict(self._counts[project_id]))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.project_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self._total -= 1
+        if not subscribers:
+            del self._subscribers[subscription.project_id]
+            self._counts.pop(subscription.project_id, None)
+            self._dirty.discard(subscription.project_id)
+
+    def close(self, project_id: UUID):
+        for subscription in list(self._subscribers.get(project_id, ())):
+            subscription.close()
+            self.unsubscribe(subscription)
+
+    def flush(self):
+        dirty, self._dirty = self._dirty, set()
+        for project_id in dirty:
+            counts = self._counts.get(project_id)
+            if counts is None:
+                continue
+            for subscription in self._subscribers[project_id]:
+                subscription.offer(dict(counts))
+
+    async def resync(self):
+        project_ids = list(self._subscribers)
+        for start in range(0, len(project_ids), RESYNC_BATCH_SIZE):
+            batch = project_ids[start : start + RESYNC_BATCH_SIZE]
+            rows = await Project.filter(id__in=batch).values("id", *COUNTER_FIELDS)
+            found = set()
+            for row in rows:
+                found.add(row["id"])
+                self.publish(row.pop("id"), **row)
+            # Deleted since they were subscribed to.
+            for project_id in set(batch) - found:
+                self.close(project_id)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for project_id in list(self._subscribers):
+            self.close(project_id)
+
+    async def _run(self):
+        last_resync = time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if time.monotonic() - last_resync >= self.resync_interval:
+                    last_resync = time.monotonic()
+                    await self.resync()
+                self.flush()
+            except Exception:
+                logger.exception("Failed to publish live counters")
+
+
+live_counters = LiveCounters(
+    interval=settings.LIVE_INTERVAL,
+    resync_interval=settings.LIVE_RESYNC_INTERVAL,
+    max_subscribers=settings.LIVE_MAX_SUBSCRIBERS,
+)
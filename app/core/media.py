@@ -0,0 +1,268 @@
+import mimetypes
+import os
+import re
+import stat as stat_module
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+from anyio import to_thread
+from starlette.types import Receive, Scope, Send
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Blobs and their derivatives are named after the content hash.
+_CONTENT_ADDRESSED_RE = re.compile(r"(?:^|/)([0-9a-f]{64}(?:_\w+)?)\.\w+$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@dataclass(frozen=True)
+class MediaFile:
+    path: str
+    size: int
+    mtime: float
+    etag: str
+    last_modified: str
+    content_type: str
+    cache_control: str
+
+
+def _route_path(scope: Scope) -> str:
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path) and path != root_path:
+        if path[len(root_path)] == "/":
+            return path[len(root_path) :]
+    return path
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Returns the inclusive byte range, or None for an unsatisfiable one.
+
+    Raises ValueError for ranges that are ignored (malformed or multipart).
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        raise ValueError(header)
+
+    start, end = match.groups()
+    if not start and not end:
+        raise ValueError(header)
+    if not start:
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+
+class MediaFiles:
+    """Serves uploaded files with validators, byte ranges and long caching.
+
+    Content-addressed files are served as immutable. File metadata is kept
+    in a small LRU so hot files do not cost a stat per request, and bodies
+    go through the server's zero-copy extensions when it offers them.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.realpath(directory)
+        self._files = TTLCache(settings.MEDIA_CACHE_SIZE, settings.MEDIA_CACHE_TTL)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        assert scope["type"] == "http"
+
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send_empty(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+
+        media = await self._lookup(_route_path(scope))
+        if media is None:
+            await self._send_empty(send, 404, [])
+            return
+
+        request_headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        headers = [
+            (b"etag", media.etag.encode()),
+            (b"last-modified", media.last_modified.encode()),
+            (b"cache-control", media.cache_control.encode()),
+            (b"accept-ranges", b"bytes"),
+        ]
+
+        if self._not_modified(request_headers, media):
+            await self._send_empty(send, 304, headers)
+            return
+
+        start, end, status = 0, media.size - 1, 200
+        range_header = request_headers.get("range")
+        if range_header and media.size and self._range_applies(request_headers, media):
+            try:
+                byte_range = _parse_range(range_header, media.size)
+            except ValueError:
+                byte_range = (start, end)
+            else:
+                if byte_range is None:
+                    headers.append(
+                        (b"content-range", f"bytes */{media.size}".encode())
+                    )
+                    await self._send_empty(send, 416, headers)
+                    return
+                status = 206
+                headers.append(
+                    (
+                        b"content-range",
+                        f"bytes {byte_range[0]}-{byte_range[1]}/{media.size}".encode(),
+                    )
+                )
+            start, end = byte_range
+
+        length = max(end - start + 1, 0)
+        headers.append((b"content-type", media.content_type.encode()))
+        headers.append((b"content-length", str(length).encode()))
+
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        if scope["method"] == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self._send_body(scope, send, media, start, length)
+
+    async def _lookup(self, route_path: str) -> Optional[MediaFile]:
+        media = self._files.get(route_path)
+        if media is not None:
+            return media
+
+        path = os.path.realpath(os.path.join(self.directory, route_path.lstrip("/")))
+        if not path.startswith(self.directory + os.sep):
+            return None
+        # Hidden files include uploads that are still being written.
+        if any(part.startswith(".") for part in route_path.split("/")):
+            return None
+
+        try:
+            stat = await to_thread.run_sync(os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat_module.S_ISREG(stat.st_mode):
+            return None
+
+        match = _CONTENT_ADDRESSED_RE.search(route_path)
+        if match:
+            etag = f'"{match.group(1)}"'
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            cache_control = f"public, max-age={settings.MEDIA_MAX_AGE}"
+
+        content_type, _ = mimetypes.guess_type(path)
+        media = MediaFile(
+            path=path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            etag=etag,
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            content_type=content_type or "application/octet-stream",
+            cache_control=cache_control,
+        )
+        self._files.set(route_path, media)
+        return media
+
+    @staticmethod
+    def _not_modified(request_headers: dict, media: MediaFile) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, media.etag)
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(media.mtime) <= since
+        return False
+
+    @staticmethod
+    def _range_applies(request_headers: dict, media: MediaFile) -> bool:
+        if_range = request_headers.get("if-range")
+        if not if_range:
+            return True
+        return if_range == media.etag or if_range == media.last_modified
+
+    async def _send_body(
+        self, scope: Scope, send: Send, media: MediaFile, start: int, length: int
+    ):
+        extensions = scope.get("extensions") or {}
+
+        if "http.response.pathsend" in extensions and length == media.size:
+            await send({"type": "http.response.pathsend", "path": media.path})
+            return
+
+        try:
+            file = await to_thread.run_sync(open, media.path, "rb")
+        except FileNotFoundError:
+            # Deleted after its metadata was cached; the headers are already out.
+            self._files.pop(_route_path(scope))
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        try:
+            if "http.response.zerocopysend" in extensions:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file,
+                        "offset": start,
+                        "count": length,
+                    }
+                )
+                return
+
+            await to_thread.run_sync(file.seek, start)
+            remaining = length
+            while remaining > 0:
+                chunk = await to_thread.run_sync(file.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": remaining > 0,
+                    }
+                )
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            await to_thread.run_sync(file.close)
+
+    @staticmethod
+    async def _send_empty(
+        send: Send, status: int, headers: List[Tuple[bytes, bytes]]
+    ):
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
+
+
+def encode_cursor(created_time: datetime, id: UUID) -> str:
+    raw = json.dumps([created_time.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_time, id = json.loads(raw)
+        return datetime.fromisoformat(created_time), UUID(id)
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def after_cursor(
+    queryset: QuerySet, cursor: Optional[str], descending: bool = True
+) -> QuerySet:
+    if cursor:
+        created_time, id = decode_cursor(cursor)
+        # The redundant bound on created_time lets the (created_time, id)
+        # index start the scan at the cursor instead of filtering up to it.
+        if descending:
+            queryset = queryset.filter(
+                Q(created_time__lt=created_time)
+                | Q(created_time=created_time, id__lt=id),
+                created_time__lte=created_time,
+            )
+        else:
+            queryset = queryset.filter(
+                Q(created_time__gt=created_time)
+                | Q(created_time=created_time, id__gt=id),
+                created_time__gte=created_time,
+            )
+
+    if descending:
+        return queryset.order_by("-created_time", "-id")
+    return queryset.order_by("created_time", "id")
+
+
+async def paginate(
+    queryset: QuerySet,
+    fields: Tuple[str, ...],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+) -> Tuple[List[dict], Optional[str]]:
+    rows = (
+        await after_cursor(queryset, cursor, descending)
+        .limit(limit + 1)
+        .values(*fields, "created_time")
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_time"], rows[-1]["id"])
+
+    return rows, next_cursor
@@ -1,4 +1,14 @@
-from tortoise import Tortoise
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+
+from app.core.counters import COUNTER_FIELDS
+from app.core.replicas import get_read_connection
+from app.models.models import Project, ProjectLike
+
+
+SHORT_PROJECT_FIELDS = ("id", "title", "subtitle", "image_url", "image_derivatives")
 
 
 def shorter(text, max_length=250):
@@ -16,25 +26,66 @@ def shorter(text, max_length=250):
     return shorted
 
 
-async def fuzzy_multiword_search(user_input: str):
-    words = user_input.lower().split()
+def _in_order(rows: List[dict], ids: List[UUID]) -> List[dict]:
+    by_id = {row["id"]: row for row in rows}
+    return [by_id[id] for id in dict.fromkeys(ids) if id in by_id]
+
+
+async def get_project_cards(ids: List[UUID]) -> List[dict]:
+    rows = await Project.filter(id__in=ids).values(
+        *SHORT_PROJECT_FIELDS, *COUNTER_FIELDS
+    )
+    return _in_order(rows, ids)
+
+
+async def get_liked_ids(user_id: Optional[int], ids: Iterable[UUID]) -> set:
+    if user_id is None:
+        return set()
+    return set(
+        await ProjectLike.filter(user_id=user_id, project_id__in=ids).values_list(
+            "project_id", flat=True
+        )
+    )
+
+
+async def get_project_stats(ids: List[UUID], user_id: Optional[int]) -> List[dict]:
+    # Two queries for any number of ids: the counters and the caller's likes.
+    rows = await Project.filter(id__in=ids).values("id", *COUNTER_FIELDS)
+    liked_ids = await get_liked_ids(user_id, [row["id"] for row in rows])
+    for row in rows:
+        row["liked"] = row["id"] in liked_ids
+    return _in_order(rows, ids)
+
 
-    conditions = " OR ".join([
-        f"similarity(title, '{word}') > 0.1 OR similarity(subtitle, '{word}') > 0.1"
-        for word in words
-    ])
+PROJECT_BLOCKS_QUERY = """
+    SELECT
+        jsonb_array_length(data) AS total,
+        (
+            SELECT COALESCE(jsonb_agg(block ORDER BY position), '[]'::jsonb)
+            FROM jsonb_array_elements(data) WITH ORDINALITY AS blocks(block, position)
+            WHERE position > $2 AND position <= $2 + $3
+        ) AS blocks
+    FROM projects
+    WHERE id = $1
+"""
 
-    order = " + ".join([
-        f"similarity(title, '{word}') + similarity(subtitle, '{word}')"
-        for word in words
-    ])
 
-    query = f"""
-        SELECT * FROM projects
-        WHERE {conditions}
-        ORDER BY {order} DESC
-        LIMIT 10
-    """
+async def get_project_blocks(
+    project_id: UUID, offset: int, limit: int
+) -> Optional[Tuple[List[dict], int]]:
+    connection = get_read_connection()
+    if connection.capabilities.dialect != "postgres":
+        data = await Project.filter(id=project_id).first().values_list(
+            "data", flat=True
+        )
+        if data is None:
+            return None
+        return data[offset : offset + limit], len(data)
 
-    rows = await Tortoise.get_connection("default").execute_query_dict(query)
-    return rows
+    # Slice inside the database so long documents are never sent whole.
+    rows = await connection.execute_query_dict(
+        PROJECT_BLOCKS_QUERY, [project_id, offset, limit]
+    )
+    if not rows:
+        return None
+    return orjson.loads(rows[0]["blocks"]), rows[0]["total"]
@@ -0,0 +1,234 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient, TransactionalDBClient
+
+from app.core.cache import TTLCache
+from app.core.config import REPLICA_CONNECTIONS, settings
+from app.core.deps import token_user_id
+from app.core.metrics import Counter, Gauge
+
+
+logger = logging.getLogger(__name__)
+
+REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy", "Whether a replica is used for reads", ["connection"]
+)
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Replication lag seen by the last check", ["connection"]
+)
+READ_ROUTES = Counter(
+    "db_read_routes_total", "Requests routed per read connection", ["connection"]
+)
+
+# Zero when the replica has replayed everything it received, so an idle
+# primary does not make its replicas look stale.
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END AS lag
+"""
+
+# POST endpoints that only read, so they can be served by replicas too.
+READ_ONLY_PATHS = {"/projects/batch", "/projects/stats"}
+
+# Set on every write response and holding the time until which the client's
+# reads go to the primary. Unlike the per-worker record of users who wrote, it
+# reaches whichever worker serves the next request, and also covers writes
+# made before the client had a token (logging in).
+STICKY_COOKIE = "db_primary_until"
+
+_read_connection: ContextVar[Optional[str]] = ContextVar(
+    "read_connection", default=None
+)
+
+
+def read_connection_name() -> str:
+    return _read_connection.get() or "default"
+
+
+def get_read_connection() -> BaseDBAsyncClient:
+    return connections.get(read_connection_name())
+
+
+class ReplicaRouter:
+    """Tortoise router sending ORM reads to the replica picked for the request."""
+
+    def db_for_read(self, model) -> str:
+        # Reads inside a transaction must see its writes.
+        if isinstance(connections.get("default"), TransactionalDBClient):
+            return "default"
+        return read_connection_name()
+
+    def db_for_write(self, model) -> str:
+        return "default"
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        names: List[str],
+        check_interval: float,
+        max_lag: float,
+        sticky_seconds: float,
+        sticky_cache_size: int,
+    ):
+        self.names = names
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+
+        self._healthy: Dict[str, bool] = {name: True for name in names}
+        self._cycle = itertools.cycle(names)
+        self._sticky = TTLCache(sticky_cache_size, sticky_seconds)
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[str]:
+        for _ in range(len(self.names)):
+            name = next(self._cycle)
+            if self._healthy[name]:
+                return name
+        return None
+
+    def stick(self, user_id: int):
+        self._sticky.set(user_id, time.monotonic())
+
+    def is_sticky(self, user_id: int) -> bool:
+        return self._sticky.get(user_id) is not None
+
+    async def check(self):
+        for name in self.names:
+            try:
+                rows = await asyncio.wait_for(
+                    connections.get(name).execute_query_dict(REPLICA_LAG_QUERY),
+                    self.check_interval,
+                )
+                lag = float(rows[0]["lag"])
+                healthy = lag <= self.max_lag
+                REPLICA_LAG.set(lag, connection=name)
+            except Exception:
+                logger.warning("Replica %s failed its check", name, exc_info=True)
+                healthy = False
+
+            if healthy != self._healthy[name]:
+                logger.warning(
+                    "Replica %s is now %s", name, "healthy" if healthy else "unhealthy"
+                )
+            self._healthy[name] = healthy
+            REPLICA_HEALTHY.set(int(healthy), connection=name)
+
+    async def start(self):
+        if self.names and self._task is None:
+            await self.check()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
+
+
+replicas = ReplicaSet(
+    names=list(REPLICA_CONNECTIONS),
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+    sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS,
+    sticky_cache_size=settings.DB_REPLICA_STICKY_CACHE_SIZE,
+)
+
+
+def _bearer_user_id(scope) -> Optional[int]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token_user_id(token)
+    return None
+
+
+def _sticky_cookie(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name != b"cookie":
+            continue
+        for cookie in value.decode("latin-1").split(";"):
+            key, _, until = cookie.strip().partition("=")
+            if key == STICKY_COOKIE:
+                try:
+                    return float(until) > time.time()
+                except ValueError:
+                    return False
+    return False
+
+
+def _with_sticky_cookie(send):
+    seconds = int(settings.DB_REPLICA_STICKY_SECONDS)
+
+    async def send_with_cookie(message):
+        if message["type"] == "http.response.start":
+            cookie = (
+                f"{STICKY_COOKIE}={int(time.time()) + seconds}; Max-Age={seconds};"
+                " Path=/; HttpOnly; SameSite=Lax"
+            )
+            message = {
+                **message,
+                "headers": [
+                    *message.get("headers", ()),
+                    (b"set-cookie", cookie.encode("latin-1")),
+                ],
+            }
+        await send(message)
+
+    return send_with_cookie
+
+
+class ReplicaRoutingMiddleware:
+    """Routes GET/HEAD requests to a replica unless the user wrote recently."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas.names:
+            await self.app(scope, receive, send)
+            return
+
+        user_id = _bearer_user_id(scope)
+        read_only = scope["method"] in ("GET", "HEAD") or (
+            scope["method"] == "POST" and scope["path"] in READ_ONLY_PATHS
+        )
+        if not read_only:
+            if user_id is not None:
+                replicas.stick(user_id)
+            await self.app(scope, receive, _with_sticky_cookie(send))
+            return
+
+        name = None
+        sticky = _sticky_cookie(scope) or (
+            user_id is not None and replicas.is_sticky(user_id)
+        )
+        if not sticky:
+            name = replicas.choose()
+        READ_ROUTES.inc(connection=name or "default")
+
+        token = _read_connection.set(name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _read_connection.reset(token)
@@ -0,0 +1,105 @@
+from tortoise import Tortoise
+
+from app.core.config import settings
+
+
+def _add_interaction_time(table: str) -> str:
+    # Rows from before the column existed get their project's creation time,
+    # the earliest moment the interaction can have happened.
+    return f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = '{table}' AND column_name = 'created_time'
+            ) THEN
+                ALTER TABLE {table} ADD COLUMN created_time TIMESTAMPTZ;
+                UPDATE {table} SET created_time = projects.created_time
+                FROM projects WHERE projects.id = {table}.project_id;
+                ALTER TABLE {table} ALTER COLUMN created_time SET NOT NULL;
+            END IF;
+        END $$
+    """
+
+
+def _set_search_threshold(threshold: float) -> str:
+    # Only the <% operator can use the trigram indexes, and it compares against
+    # pg_trgm.word_similarity_threshold. As the database default, searches need
+    # no SET (and so no transaction) on pooled connections. The catalog is
+    # checked first so that a restart does not rewrite it; without ownership of
+    # the database searches still return correct matches, but only those above
+    # the server default.
+    setting = f"pg_trgm.word_similarity_threshold={float(threshold)}"
+    return f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_db_role_setting
+                JOIN pg_database ON pg_database.oid = setdatabase
+                WHERE datname = current_database() AND setrole = 0
+                    AND '{setting}' = ANY(setconfig)
+            ) THEN
+                EXECUTE format(
+                    'ALTER DATABASE %I SET pg_trgm.word_similarity_threshold = %s',
+                    current_database(),
+                    {float(threshold)}
+                );
+            END IF;
+        EXCEPTION WHEN insufficient_privilege THEN
+            RAISE WARNING 'Failed to set pg_trgm.word_similarity_threshold: %',
+                SQLERRM;
+        END $$
+    """
+
+
+# generate_schemas only creates missing tables, so columns added to existing
+# tables are applied here. Every statement must be idempotent.
+SCHEMA_UPDATES = [
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS likes_count INT NOT NULL DEFAULT 0",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS views_count INT NOT NULL DEFAULT 0",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS shares_count INT NOT NULL DEFAULT 0",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS image_derivatives JSONB",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1",
+    "CREATE INDEX IF NOT EXISTS projects_views_count_idx"
+    " ON projects (views_count DESC, created_time DESC)",
+    "CREATE INDEX IF NOT EXISTS projects_likes_count_idx"
+    " ON projects (likes_count DESC, created_time DESC)",
+    "CREATE INDEX IF NOT EXISTS projects_created_time_id_idx"
+    " ON projects (created_time DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS projects_user_created_time_id_idx"
+    " ON projects (user_id, created_time DESC, id DESC)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS projects_title_trgm_idx"
+    " ON projects USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS projects_subtitle_trgm_idx"
+    " ON projects USING gin (subtitle gin_trgm_ops)",
+    _set_search_threshold(settings.SEARCH_SIMILARITY_THRESHOLD),
+    _add_interaction_time("project_likes"),
+    _add_interaction_time("project_views"),
+    _add_interaction_time("project_shares"),
+    # The raw SQL inserts in app.core.interactions and the view recorder leave
+    # created_time to the database.
+    "ALTER TABLE project_likes ALTER COLUMN created_time SET DEFAULT now()",
+    "ALTER TABLE project_views ALTER COLUMN created_time SET DEFAULT now()",
+    "ALTER TABLE project_shares ALTER COLUMN created_time SET DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS project_likes_created_time_idx"
+    " ON project_likes (created_time)",
+    "CREATE INDEX IF NOT EXISTS project_views_created_time_idx"
+    " ON project_views (created_time)",
+    "CREATE INDEX IF NOT EXISTS project_shares_created_time_idx"
+    " ON project_shares (created_time)",
+    "ALTER TABLE stored_images ADD COLUMN IF NOT EXISTS"
+    " last_used_time TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS stored_images_last_used_time_idx"
+    " ON stored_images (last_used_time)",
+]
+
+
+async def apply_schema_updates():
+    connection = Tortoise.get_connection("default")
+    if connection.capabilities.dialect != "postgres":
+        return
+
+    for statement in SCHEMA_UPDATES:
+        await connection.execute_script(statement)
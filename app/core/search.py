@@ -0,0 +1,196 @@
+import json
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.project import SHORT_PROJECT_FIELDS
+from app.core.replicas import get_read_connection
+from app.models.models import Project
+
+
+# The threshold is also the database default for the <% operator (see
+# app.core.schema); the explicit comparison keeps results exact on connections
+# opened before that default changed.
+SEARCH_QUERY = """
+    SELECT id, title, subtitle, image_url, image_derivatives,
+        COUNT(*) OVER () AS total
+    FROM (
+        SELECT id, title, subtitle, image_url, image_derivatives, created_time,
+            GREATEST(word_similarity($1, title), word_similarity($1, subtitle))
+                AS rank
+        FROM projects
+        WHERE $1 <% title OR $1 <% subtitle
+    ) AS matches
+    WHERE rank >= $4
+    ORDER BY rank DESC, created_time DESC, id
+    LIMIT $2 OFFSET $3
+"""
+
+COUNT_QUERY = """
+    SELECT COUNT(*) AS total FROM projects
+    WHERE ($1 <% title OR $1 <% subtitle)
+        AND GREATEST(word_similarity($1, title), word_similarity($1, subtitle)) >= $2
+"""
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str) -> Set[str]:
+    # Same extraction as pg_trgm: lowercased alphanumeric words padded with
+    # two spaces in front and one behind.
+    result = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i : i + 3])
+    return result
+
+
+class PostgresSearchBackend:
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+
+    async def start(self):
+        pass
+
+    def index(self, project: Project):
+        pass
+
+    def remove(self, project_id: UUID):
+        pass
+
+    async def search(
+        self, query: str, offset: int, limit: int
+    ) -> Tuple[List[dict], int]:
+        connection = get_read_connection()
+        rows = await connection.execute_query_dict(
+            SEARCH_QUERY, [query, limit, offset, self.threshold]
+        )
+        if rows:
+            total = rows[0]["total"]
+        elif offset:
+            # The window count is lost when paging past the last match.
+            total = (
+                await connection.execute_query_dict(
+                    COUNT_QUERY, [query, self.threshold]
+                )
+            )[0]["total"]
+        else:
+            total = 0
+        return [self._row(row) for row in rows], total
+
+    @staticmethod
+    def _row(row: dict) -> dict:
+        row = {key: row[key] for key in SHORT_PROJECT_FIELDS}
+        # Raw queries return jsonb undecoded.
+        if isinstance(row["image_derivatives"], str):
+            row["image_derivatives"] = json.loads(row["image_derivatives"])
+        return row
+
+
+class TrigramIndexBackend:
+    """In-process inverted trigram index for databases without pg_trgm.
+
+    Ranks by the share of query trigrams found in the title or subtitle,
+    which approximates pg_trgm's word_similarity.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._documents: Dict[UUID, dict] = {}
+        self._title_postings: Dict[str, Set[UUID]] = defaultdict(set)
+        self._subtitle_postings: Dict[str, Set[UUID]] = defaultdict(set)
+        self._trigrams: Dict[UUID, Tuple[Set[str], Set[str]]] = {}
+
+    async def start(self):
+        rows = await Project.all().values(*SHORT_PROJECT_FIELDS, "created_time")
+        for row in rows:
+            self._add(row)
+
+    def index(self, project: Project):
+        self._add(
+            {
+                "id": project.id,
+                "title": project.title,
+                "subtitle": project.subtitle,
+                "image_url": project.image_url,
+                "image_derivatives": project.image_derivatives,
+                "created_time": project.created_time,
+            }
+        )
+
+    def remove(self, project_id: UUID):
+        self._documents.pop(project_id, None)
+        title_trigrams, subtitle_trigrams = self._trigrams.pop(
+            project_id, (set(), set())
+        )
+        for trigram in title_trigrams:
+            self._discard(self._title_postings, trigram, project_id)
+        for trigram in subtitle_trigrams:
+            self._discard(self._subtitle_postings, trigram, project_id)
+
+    async def search(
+        self, query: str, offset: int, limit: int
+    ) -> Tuple[List[dict], int]:
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return [], 0
+
+        title_hits: Dict[UUID, int] = defaultdict(int)
+        subtitle_hits: Dict[UUID, int] = defaultdict(int)
+        for trigram in query_trigrams:
+            for project_id in self._title_postings.get(trigram, ()):
+                title_hits[project_id] += 1
+            for project_id in self._subtitle_postings.get(trigram, ()):
+                subtitle_hits[project_id] += 1
+
+        matches = []
+        for project_id in title_hits.keys() | subtitle_hits.keys():
+            hits = max(title_hits.get(project_id, 0), subtitle_hits.get(project_id, 0))
+            rank = hits / len(query_trigrams)
+            if rank >= self.threshold:
+                document = self._documents[project_id]
+                matches.append((rank, document["created_time"], project_id))
+
+        matches.sort(key=lambda match: (-match[0], -_timestamp(match[1]), match[2]))
+        page = matches[offset : offset + limit]
+        return [self._row(project_id) for _, _, project_id in page], len(matches)
+
+    def _add(self, row: dict):
+        self.remove(row["id"])
+        title_trigrams = trigrams(row["title"])
+        subtitle_trigrams = trigrams(row["subtitle"])
+        for trigram in title_trigrams:
+            self._title_postings[trigram].add(row["id"])
+        for trigram in subtitle_trigrams:
+            self._subtitle_postings[trigram].add(row["id"])
+        self._trigrams[row["id"]] = (title_trigrams, subtitle_trigrams)
+        self._documents[row["id"]] = row
+
+    def _row(self, project_id: UUID) -> dict:
+        document = self._documents[project_id]
+        return {key: document[key] for key in SHORT_PROJECT_FIELDS}
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[UUID]], trigram: str, project_id: UUID):
+        ids = postings.get(trigram)
+        if ids is not None:
+            ids.discard(project_id)
+            if not ids:
+                del postings[trigram]
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    return value.timestamp() if value else 0.0
+
+
+def _create_backend():
+    if settings.SEARCH_BACKEND == "memory":
+        return TrigramIndexBackend(settings.SEARCH_SIMILARITY_THRESHOLD)
+    return PostgresSearchBackend(settings.SEARCH_SIMILARITY_THRESHOLD)
+
+
+search_engine = _create_backend()
@@ -0,0 +1,199 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+import orjson
+from anyio import to_thread
+from scipy import sparse
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.project import SHORT_PROJECT_FIELDS
+from app.core.replicas import get_read_connection
+from app.models.models import Project, ProjectLike, ProjectSimilar, ProjectView
+
+
+logger = logging.getLogger(__name__)
+
+INTERACTIONS = {"view": ProjectView, "like": ProjectLike}
+
+WRITE_BATCH_SIZE = 1000
+
+SIMILAR_PROJECTS_QUERY = """
+    SELECT
+        projects.id,
+        projects.title,
+        projects.subtitle,
+        projects.image_url,
+        projects.image_derivatives,
+        neighbor.score
+    FROM project_similar
+    CROSS JOIN LATERAL jsonb_to_recordset(project_similar.neighbors)
+        AS neighbor(id uuid, score float8)
+    JOIN projects ON projects.id = neighbor.id
+    WHERE project_similar.project_id = $1
+    ORDER BY neighbor.score DESC
+    LIMIT $2
+"""
+
+
+def interaction_matrix(
+    project_index: np.ndarray,
+    user_ids: np.ndarray,
+    weights: np.ndarray,
+    project_count: int,
+) -> sparse.csr_matrix:
+    """Project x user matrix with L2-normalised rows, so the dot product of
+    two rows is their cosine similarity."""
+    _, user_index = np.unique(user_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (weights.astype(np.float32), (project_index, user_index)),
+        shape=(project_count, int(user_index.max(initial=-1)) + 1),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags((1 / norms).astype(np.float32)) @ matrix
+
+
+def nearest_neighbors(
+    matrix: sparse.csr_matrix, k: int, min_score: float, batch_cells: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k rows by cosine similarity for every row, -1 padded.
+
+    Similarities are computed a batch of rows at a time so memory stays at
+    about batch_cells entries however many projects there are. The batch is
+    kept sparse: most pairs never share a user.
+    """
+    count = matrix.shape[0]
+    k = max(0, min(k, count - 1))
+    neighbors = np.full((count, k), -1, dtype=np.int32)
+    scores = np.zeros((count, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+
+    transposed = matrix.T.tocsr()
+    batch_size = max(1, batch_cells // count)
+    for start in range(0, count, batch_size):
+        stop = min(start + batch_size, count)
+        similarity = (matrix[start:stop] @ transposed).tocsr()
+        rows = np.repeat(
+            np.arange(stop - start, dtype=np.int32), np.diff(similarity.indptr)
+        )
+        columns, values = similarity.indices, similarity.data
+        # A project is not its own neighbor.
+        keep = (values >= min_score) & (columns != rows + start)
+        rows, columns, values = rows[keep], columns[keep], values[keep]
+
+        order = np.lexsort((-values, rows))
+        rows, columns, values = rows[order], columns[order], values[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        top = rank < k
+        neighbors[start + rows[top], rank[top]] = columns[top]
+        scores[start + rows[top], rank[top]] = values[top]
+    return neighbors, scores
+
+
+async def _load_interactions(
+    index: Dict[UUID, int],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    project_index, user_ids, weights = [], [], []
+    for kind, model in INTERACTIONS.items():
+        rows = await model.all().values_list("project_id", "user_id")
+        # Projects created after the ids were read are left for the next build.
+        rows = [row for row in rows if row[0] in index]
+        project_index.append(
+            np.fromiter((index[row[0]] for row in rows), np.int32, len(rows))
+        )
+        user_ids.append(np.fromiter((row[1] for row in rows), np.int64, len(rows)))
+        weights.append(np.full(len(rows), settings.SIMILAR_WEIGHTS[kind], np.float32))
+    return (
+        np.concatenate(project_index),
+        np.concatenate(user_ids),
+        np.concatenate(weights),
+    )
+
+
+async def build_similar_projects() -> int:
+    """Recomputes project_similar from views and likes; returns the number of
+    projects that got neighbors."""
+    started = time.perf_counter()
+    project_ids = await Project.all().order_by("id").values_list("id", flat=True)
+    index = {project_id: position for position, project_id in enumerate(project_ids)}
+    project_index, user_ids, weights = await _load_interactions(index)
+    loaded = time.perf_counter()
+
+    def compute():
+        matrix = interaction_matrix(project_index, user_ids, weights, len(index))
+        return nearest_neighbors(
+            matrix,
+            settings.SIMILAR_K,
+            settings.SIMILAR_MIN_SCORE,
+            settings.SIMILAR_BATCH_CELLS,
+        )
+
+    neighbors, scores = await to_thread.run_sync(compute)
+    computed = time.perf_counter()
+
+    rows = [
+        ProjectSimilar(
+            project_id=project_ids[position],
+            neighbors=[
+                {"id": str(project_ids[neighbor]), "score": round(float(score), 4)}
+                for neighbor, score in zip(neighbors[position], scores[position])
+                if neighbor >= 0
+            ],
+        )
+        for position in np.flatnonzero(neighbors[:, :1] >= 0)
+    ]
+    async with in_transaction() as transaction:
+        await ProjectSimilar.all().using_db(transaction).delete()
+        await ProjectSimilar.bulk_create(
+            rows, batch_size=WRITE_BATCH_SIZE, using_db=transaction
+        )
+
+    logger.info(
+        "Built similar projects for %d of %d projects from %d interactions"
+        " (load %.1fs, compute %.1fs, write %.1fs)",
+        len(rows),
+        len(project_ids),
+        len(project_index),
+        loaded - started,
+        computed - loaded,
+        time.perf_counter() - computed,
+    )
+    return len(rows)
+
+
+async def get_similar_projects(project_id: UUID, limit: int) -> Optional[List[dict]]:
+    connection = get_read_connection()
+    if connection.capabilities.dialect == "postgres":
+        rows = await connection.execute_query_dict(
+            SIMILAR_PROJECTS_QUERY, [project_id, limit]
+        )
+        for row in rows:
+            if isinstance(row["image_derivatives"], str):
+                row["image_derivatives"] = orjson.loads(row["image_derivatives"])
+    else:
+        rows = await _get_similar_fallback(project_id, limit)
+
+    if not rows and not await Project.exists(id=project_id):
+        return None
+    return rows
+
+
+async def _get_similar_fallback(project_id: UUID, limit: int) -> List[dict]:
+    neighbors = (
+        await ProjectSimilar.filter(project_id=project_id)
+        .first()
+        .values_list("neighbors", flat=True)
+    )
+    if not neighbors:
+        return []
+    scores = {UUID(neighbor["id"]): neighbor["score"] for neighbor in neighbors}
+    cards = await Project.filter(id__in=list(scores)).values(*SHORT_PROJECT_FIELDS)
+    for card in cards:
+        card["score"] = scores[card["id"]]
+    cards.sort(key=lambda card: card["score"], reverse=True)
+    return cards[:limit]
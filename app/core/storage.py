@@ -0,0 +1,262 @@
+import asyncio
+import datetime
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from anyio import to_thread
+from tortoise import Tortoise
+from tortoise.expressions import Subquery
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.images import create_derivatives, derivative_extension, images_dir
+from app.core.metrics import Counter
+from app.core.uploads import ReceivedImage
+from app.models.models import Project, ProjectImage, StoredImage
+
+logger = logging.getLogger(__name__)
+
+COLLECTED = Counter("images_collected_total", "Unreferenced stored images deleted")
+
+# FOR UPDATE SKIP LOCKED passes over images a concurrent project save is
+# referencing right now: its foreign key check holds a lock on the row.
+COLLECT_QUERY = """
+    DELETE FROM stored_images
+    WHERE sha256 IN (
+        SELECT sha256 FROM stored_images
+        WHERE last_used_time < $1
+            AND NOT EXISTS (
+                SELECT 1 FROM project_images
+                WHERE project_images.image_id = stored_images.sha256
+            )
+        ORDER BY last_used_time
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING sha256, extension
+"""
+
+_HASH_URL_RE = re.compile(r"/images/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$")
+
+
+def blob_stem(sha256: str) -> str:
+    # Two levels of 256 directories keep every directory small.
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def parse_image_hash(url: str) -> Optional[str]:
+    match = _HASH_URL_RE.search(url)
+    return match.group(1) if match else None
+
+
+def legacy_upload_path(url) -> Optional[str]:
+    """Local path of an image uploaded before content addressing, or None.
+
+    Those were stored directly in the images directory under random names.
+    Block URLs come from clients, so nothing else is ever returned: not shared
+    blobs (in subdirectories), not external URLs, not paths leading elsewhere.
+    """
+    if not isinstance(url, str) or "/api/" not in url:
+        return None
+    path = os.path.realpath(
+        os.path.join(settings.BASE_DIR, url.split("/api/", 1)[1].lstrip("/"))
+    )
+    if os.path.dirname(path) != os.path.realpath(images_dir()):
+        return None
+    return path
+
+
+def extract_image_hashes(blocks: Iterable[dict]) -> Set[str]:
+    hashes = set()
+    for block in blocks:
+        if block.get("type") != "image":
+            continue
+        # Image blocks may hold a single url or a list of them.
+        url = block.get("data", {}).get("file", {}).get("url")
+        for url in [url] if isinstance(url, str) else url or ():
+            sha256 = parse_image_hash(url)
+            if sha256:
+                hashes.add(sha256)
+    return hashes
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _derivative_filenames(stem: str) -> Dict[str, str]:
+    extension = derivative_extension()
+    return {name: f"{stem}_{name}.{extension}" for name in settings.IMAGE_DERIVATIVES}
+
+
+def _missing_files(filenames: Iterable[str]) -> bool:
+    return any(
+        not os.path.exists(os.path.join(images_dir(), filename))
+        for filename in filenames
+    )
+
+
+async def store_image(image: ReceivedImage) -> Tuple[str, Dict[str, str]]:
+    sha256 = image.writer.sha256
+    stem = blob_stem(sha256)
+    filename = f"{stem}.{image.extension}"
+    path = os.path.join(images_dir(), filename)
+
+    # Touched before the file is checked, so the collector leaves a blob
+    # alone once a new upload has claimed it.
+    _, created = await StoredImage.get_or_create(
+        sha256=sha256,
+        defaults={"extension": image.extension, "size": image.writer.size},
+    )
+    if not created:
+        await StoredImage.filter(sha256=sha256).update(last_used_time=_now())
+
+    if await to_thread.run_sync(os.path.exists, path):
+        await image.writer.abort()
+    else:
+        await to_thread.run_sync(
+            lambda: os.makedirs(os.path.dirname(path), exist_ok=True)
+        )
+        await image.writer.commit(path)
+
+    derivatives = _derivative_filenames(stem)
+    if await to_thread.run_sync(_missing_files, derivatives.values()):
+        derivatives = await create_derivatives(path, stem)
+
+    return filename, derivatives
+
+
+async def sync_project_images(project: Project, hashes: Set[str]) -> Set[str]:
+    """Point the project's image references at `hashes`.
+
+    Returns the hashes the project no longer references.
+    """
+    current = set(
+        await ProjectImage.filter(project=project).values_list("image_id", flat=True)
+    )
+    removed = current - hashes
+    added = hashes - current
+
+    if removed:
+        await ProjectImage.filter(project=project, image_id__in=removed).delete()
+    if added:
+        known = await StoredImage.filter(sha256__in=added).values_list(
+            "sha256", flat=True
+        )
+        await ProjectImage.bulk_create(
+            [ProjectImage(project=project, image_id=sha256) for sha256 in known],
+            ignore_conflicts=True,
+        )
+    return removed
+
+
+def _delete_files(filenames: Iterable[str]):
+    for filename in filenames:
+        try:
+            os.remove(os.path.join(images_dir(), filename))
+        except FileNotFoundError:
+            pass
+
+
+async def release_images(hashes: Set[str]):
+    """Start the grace period of images a project stopped referencing.
+
+    Nothing is deleted here: an upload is only referenced once its project is
+    saved, so an image unused right now may still belong to an open draft.
+    ImageCollector deletes images still unreferenced when the period ends.
+    """
+    if hashes:
+        await StoredImage.filter(sha256__in=hashes).update(last_used_time=_now())
+
+
+class ImageCollector:
+    def __init__(self, interval: float, grace: float, batch_size: int):
+        self.interval = interval
+        self.grace = grace
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def collect(self) -> int:
+        total = 0
+        while True:
+            collected = await self._collect_batch()
+            total += collected
+            if collected < self.batch_size:
+                return total
+
+    async def _collect_batch(self) -> int:
+        cutoff = _now() - datetime.timedelta(seconds=self.grace)
+        connection = Tortoise.get_connection("default")
+        if connection.capabilities.dialect == "postgres":
+            rows = [
+                (row["sha256"], row["extension"])
+                for row in await connection.execute_query_dict(
+                    COLLECT_QUERY, [cutoff, self.batch_size]
+                )
+            ]
+        else:
+            rows = await self._collect_batch_fallback(cutoff)
+        if not rows:
+            return 0
+
+        # A blob uploaded again since its row was deleted keeps its files.
+        reclaimed = set(
+            await StoredImage.filter(
+                sha256__in=[sha256 for sha256, _ in rows]
+            ).values_list("sha256", flat=True)
+        )
+        filenames = []
+        for sha256, extension in rows:
+            if sha256 in reclaimed:
+                continue
+            stem = blob_stem(sha256)
+            filenames.append(f"{stem}.{extension}")
+            filenames.extend(_derivative_filenames(stem).values())
+        await to_thread.run_sync(_delete_files, filenames)
+
+        COLLECTED.inc(len(rows))
+        return len(rows)
+
+    async def _collect_batch_fallback(
+        self, cutoff: datetime.datetime
+    ) -> List[Tuple[str, str]]:
+        async with in_transaction():
+            rows = (
+                await StoredImage.filter(last_used_time__lt=cutoff)
+                .exclude(sha256__in=Subquery(ProjectImage.all().values("image_id")))
+                .order_by("last_used_time")
+                .limit(self.batch_size)
+                .values_list("sha256", "extension")
+            )
+            await StoredImage.filter(sha256__in=[sha256 for sha256, _ in rows]).delete()
+        return rows
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.collect()
+            except Exception:
+                logger.exception("Failed to collect unreferenced images")
+            await asyncio.sleep(self.interval)
+
+
+image_collector = ImageCollector(
+    interval=settings.IMAGE_GC_INTERVAL,
+    grace=settings.IMAGE_GC_GRACE,
+    batch_size=settings.IMAGE_GC_BATCH_SIZE,
+)
@@ -0,0 +1,380 @@
+import asyncio
+import datetime
+import heapq
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.metrics import Gauge, Histogram
+from app.core.project import SHORT_PROJECT_FIELDS
+from app.models.models import (
+    Project,
+    ProjectLike,
+    ProjectShare,
+    ProjectTrending,
+    ProjectView,
+)
+
+
+logger = logging.getLogger(__name__)
+
+TRACKED_PROJECTS = Gauge("trending_projects", "Projects with a live trending score")
+REFRESH_SECONDS = Histogram(
+    "trending_refresh_seconds",
+    "Time to rebuild the trending top list",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# Scores are kept as ln(sum(weight * e^(decay * (t - EPOCH)))) over interactions
+# at time t. Decaying every score by the same factor does not change their
+# order, so nothing is rewritten as time passes; the current score is
+# e^(log_score - decay * (now - EPOCH)). Logs keep the values small forever.
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+# Sorted ids keep concurrent workers from deadlocking on each other's rows.
+CHECKPOINT_QUERY = """
+    INSERT INTO project_trending (project_id, log_score, updated_time)
+    SELECT delta.project_id, delta.log_score, now()
+    FROM unnest($1::uuid[], $2::float8[]) AS delta(project_id, log_score)
+    WHERE EXISTS (SELECT 1 FROM projects WHERE projects.id = delta.project_id)
+    ORDER BY delta.project_id
+    ON CONFLICT (project_id) DO UPDATE SET
+        log_score = GREATEST(project_trending.log_score, EXCLUDED.log_score)
+            + ln(1 + exp(-abs(project_trending.log_score - EXCLUDED.log_score))),
+        updated_time = now()
+"""
+
+# Interactions from before they were timestamped were backfilled with their
+# project's creation time (see app.core.schema). That is not when they
+# happened, and counting them would turn every recent project's history into a
+# burst at its creation, so they are left out.
+REBUILD_QUERY = """
+    INSERT INTO project_trending (project_id, log_score, updated_time)
+    SELECT
+        interactions.project_id,
+        $4::float8 + ln(SUM(
+            weight * exp(
+                $1::float8
+                * (EXTRACT(EPOCH FROM interactions.created_time)::float8 - $2::float8)
+                - $4::float8
+            )
+        )),
+        now()
+    FROM (
+        SELECT project_id, created_time, $5::float8 AS weight
+        FROM project_views WHERE created_time > $3
+        UNION ALL
+        SELECT project_id, created_time, $6::float8
+        FROM project_likes WHERE created_time > $3
+        UNION ALL
+        SELECT project_id, created_time, $7::float8
+        FROM project_shares WHERE created_time > $3
+    ) AS interactions
+    JOIN projects ON projects.id = interactions.project_id
+    WHERE interactions.created_time > projects.created_time
+    GROUP BY interactions.project_id
+"""
+
+
+REBUILD_LOCK_QUERY = "SELECT pg_advisory_xact_lock(hashtext('project_trending'))"
+
+
+def _logaddexp(a: float, b: float) -> float:
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+
+class TrendingEngine:
+    """Exponentially decayed interaction scores, updated as interactions are
+    recorded and merged with other workers through project_trending."""
+
+    def __init__(
+        self,
+        half_life: float,
+        weights: Dict[str, float],
+        size: int,
+        refresh_interval: float,
+        checkpoint_interval: float,
+        prune_interval: float,
+        min_score: float,
+        liked_cache_size: int,
+    ):
+        self.decay = math.log(2) / half_life
+        self.weights = weights
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.prune_interval = prune_interval
+        self.min_score = min_score
+        self.liked_cache_size = liked_cache_size
+
+        self._scores: Dict[UUID, float] = {}
+        # Recorded here but not yet checkpointed.
+        self._pending: Dict[UUID, float] = {}
+        # Likes already counted, so like/unlike toggling cannot pump a score.
+        self._liked: OrderedDict[Tuple[int, UUID], None] = OrderedDict()
+        self._top: List[dict] = []
+        self._synced_at: Optional[datetime.datetime] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        TRACKED_PROJECTS.set_function(lambda: len(self._scores))
+
+    def record(
+        self, project_id: UUID, kind: str, count: int = 1, at: Optional[float] = None
+    ):
+        if count <= 0:
+            return
+        at = time.time() if at is None else at
+        value = math.log(self.weights[kind] * count) + self.decay * (at - EPOCH)
+        for scores in (self._scores, self._pending):
+            current = scores.get(project_id)
+            scores[project_id] = (
+                value if current is None else _logaddexp(current, value)
+            )
+
+    def record_like(self, user_id: int, project_id: UUID):
+        key = (user_id, project_id)
+        if key in self._liked:
+            self._liked.move_to_end(key)
+            return
+        self._liked[key] = None
+        if len(self._liked) > self.liked_cache_size:
+            self._liked.popitem(last=False)
+        self.record(project_id, "like")
+
+    def remove(self, project_id: UUID):
+        self._scores.pop(project_id, None)
+        self._pending.pop(project_id, None)
+        self._top = [entry for entry in self._top if entry["id"] != project_id]
+
+    def top(self, limit: int) -> List[dict]:
+        offset = self.decay * (time.time() - EPOCH)
+        return [
+            {**entry["card"], "score": math.exp(entry["log_score"] - offset)}
+            for entry in self._top[:limit]
+        ]
+
+    def _threshold(self) -> float:
+        return math.log(self.min_score) + self.decay * (time.time() - EPOCH)
+
+    async def refresh(self):
+        started = time.perf_counter()
+        ids = heapq.nlargest(self.size, self._scores, key=self._scores.__getitem__)
+        rows = await Project.filter(id__in=ids).values(*SHORT_PROJECT_FIELDS)
+        cards = {row["id"]: row for row in rows}
+
+        top = []
+        for project_id in ids:
+            if project_id not in cards:
+                # Deleted since it was scored.
+                self.remove(project_id)
+            elif project_id in self._scores:
+                top.append(
+                    {
+                        "id": project_id,
+                        "card": cards[project_id],
+                        "log_score": self._scores[project_id],
+                    }
+                )
+        self._top = top
+        REFRESH_SECONDS.observe(time.perf_counter() - started)
+
+    async def checkpoint(self):
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            try:
+                if pending:
+                    await self._write(pending)
+            except Exception:
+                for project_id, value in pending.items():
+                    current = self._pending.get(project_id)
+                    self._pending[project_id] = (
+                        value if current is None else _logaddexp(current, value)
+                    )
+                raise
+            await self._sync()
+
+    async def _write(self, pending: Dict[UUID, float]):
+        connection = Tortoise.get_connection("default")
+        if connection.capabilities.dialect == "postgres":
+            project_ids = sorted(pending)
+            await connection.execute_query(
+                CHECKPOINT_QUERY,
+                [project_ids, [pending[project_id] for project_id in project_ids]],
+            )
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        async with in_transaction():
+            existing = dict(
+                await ProjectTrending.filter(project_id__in=list(pending)).values_list(
+                    "project_id", "log_score"
+                )
+            )
+            alive = set(
+                await Project.filter(id__in=list(pending)).values_list("id", flat=True)
+            )
+            for project_id, value in pending.items():
+                if project_id not in alive:
+                    continue
+                if project_id in existing:
+                    await ProjectTrending.filter(project_id=project_id).update(
+                        log_score=_logaddexp(existing[project_id], value),
+                        updated_time=now,
+                    )
+                else:
+                    await ProjectTrending.create(project_id=project_id, log_score=value)
+
+    async def _sync(self):
+        # Picks up what other workers checkpointed since the last sync; the
+        # overlap covers rows whose transaction committed late.
+        threshold = self._threshold()
+        synced_at = datetime.datetime.now(datetime.timezone.utc)
+        query = ProjectTrending.filter(log_score__gte=threshold)
+        if self._synced_at is not None:
+            overlap = datetime.timedelta(seconds=self.checkpoint_interval)
+            query = query.filter(updated_time__gte=self._synced_at - overlap)
+
+        for project_id, log_score in await query.values_list(
+            "project_id", "log_score"
+        ):
+            pending = self._pending.get(project_id)
+            self._scores[project_id] = (
+                log_score if pending is None else _logaddexp(log_score, pending)
+            )
+        self._synced_at = synced_at
+
+        for project_id in [
+            project_id
+            for project_id, log_score in self._scores.items()
+            if log_score < threshold
+        ]:
+            del self._scores[project_id]
+
+    async def prune(self):
+        """Deletes the stored scores that have decayed below min_score."""
+        await ProjectTrending.filter(log_score__lt=self._threshold()).delete()
+
+    async def rebuild(self) -> int:
+        """Recomputes every score from the interaction timestamps."""
+        async with self._lock:
+            # Everything recorded so far is in the interaction tables already.
+            self._pending.clear()
+            return await self._rebuild()
+
+    async def _rebuild(self) -> int:
+        now = time.time()
+        shift = self.decay * (now - EPOCH)
+        # Older interactions have decayed below min_score even at full weight.
+        horizon = math.log(max(self.weights.values()) / self.min_score) / self.decay
+        cutoff = datetime.datetime.fromtimestamp(now - horizon, datetime.timezone.utc)
+
+        connection = Tortoise.get_connection("default")
+        async with in_transaction() as transaction:
+            if connection.capabilities.dialect == "postgres":
+                # Concurrent rebuilds would insert the same project ids.
+                await transaction.execute_query(REBUILD_LOCK_QUERY)
+            await ProjectTrending.all().using_db(transaction).delete()
+            if connection.capabilities.dialect == "postgres":
+                await transaction.execute_query(
+                    REBUILD_QUERY,
+                    [
+                        self.decay,
+                        EPOCH,
+                        cutoff,
+                        shift,
+                        self.weights["view"],
+                        self.weights["like"],
+                        self.weights["share"],
+                    ],
+                )
+            else:
+                scores: Dict[UUID, float] = {}
+                for model, kind in (
+                    (ProjectView, "view"),
+                    (ProjectLike, "like"),
+                    (ProjectShare, "share"),
+                ):
+                    rows = await model.filter(created_time__gt=cutoff).values_list(
+                        "project_id", "created_time", "project__created_time"
+                    )
+                    for project_id, created_time, project_created_time in rows:
+                        if created_time <= project_created_time:
+                            continue
+                        value = math.log(self.weights[kind]) + self.decay * (
+                            created_time.timestamp() - EPOCH
+                        )
+                        current = scores.get(project_id)
+                        scores[project_id] = (
+                            value if current is None else _logaddexp(current, value)
+                        )
+                await ProjectTrending.bulk_create(
+                    [
+                        ProjectTrending(project_id=project_id, log_score=log_score)
+                        for project_id, log_score in scores.items()
+                    ],
+                    using_db=transaction,
+                )
+
+        await self.prune()
+        self._scores.clear()
+        self._synced_at = None
+        await self._sync()
+        return len(self._scores)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        # Rebuilding is left to app.commands.rebuild_trending: an empty table
+        # is also what a quiet site looks like once everything has decayed.
+        await self._sync()
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.checkpoint()
+        except Exception:
+            logger.exception("Failed to checkpoint trending scores on shutdown")
+
+    async def _run(self):
+        last_checkpoint = last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                    last_checkpoint = time.monotonic()
+                    await self.checkpoint()
+                if time.monotonic() - last_prune >= self.prune_interval:
+                    last_prune = time.monotonic()
+                    await self.prune()
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to update trending projects")
+
+
+trending = TrendingEngine(
+    half_life=settings.TRENDING_HALF_LIFE,
+    weights=settings.TRENDING_WEIGHTS,
+    size=settings.TRENDING_SIZE,
+    refresh_interval=settings.TRENDING_REFRESH_INTERVAL,
+    checkpoint_interval=settings.TRENDING_CHECKPOINT_INTERVAL,
+    prune_interval=settings.TRENDING_PRUNE_INTERVAL,
+    min_score=settings.TRENDING_MIN_SCORE,
+    liked_cache_size=settings.TRENDING_LIKED_CACHE_SIZE,
+)
@@ -0,0 +1,204 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Optional
+
+from anyio import to_thread
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+from app.core.images import images_dir
+
+
+WRITE_BUFFER_SIZE = 256 * 1024
+# Room for the multipart boundaries and part headers around the file.
+MULTIPART_OVERHEAD = 64 * 1024
+SNIFF_SIZE = 12
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+class UploadWriter:
+    """Writes a stream to a temporary file off the event loop.
+
+    The file only appears under its final name once `commit` renames it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.temp_path = os.path.join(directory, f".{os.urandom(8).hex()}.part")
+        self.size = 0
+        self._file: Optional[BinaryIO] = None
+        self._buffer = bytearray()
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    async def open(self):
+        self._file = await to_thread.run_sync(open, self.temp_path, "wb")
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        self._buffer.extend(data)
+        if len(self._buffer) >= WRITE_BUFFER_SIZE:
+            await self._flush()
+
+    async def close(self):
+        await self._flush()
+        await to_thread.run_sync(self._close)
+
+    async def commit(self, path: str):
+        await self.close()
+        await to_thread.run_sync(os.replace, self.temp_path, path)
+
+    async def abort(self):
+        await to_thread.run_sync(self._close)
+        try:
+            await to_thread.run_sync(os.remove, self.temp_path)
+        except FileNotFoundError:
+            pass
+
+    async def _flush(self):
+        if self._buffer:
+            data, self._buffer = bytes(self._buffer), bytearray()
+            await to_thread.run_sync(self._write, data)
+
+    def _write(self, data: bytes):
+        # hashlib releases the GIL for large buffers, so hash on the worker too.
+        self._hash.update(data)
+        self._file.write(data)
+
+    def _close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+
+@dataclass
+class ReceivedImage:
+    writer: UploadWriter
+    extension: str
+
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=detail)
+
+
+async def receive_image(request: Request, field_name: str = "file") -> ReceivedImage:
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > settings.MAX_IMAGE_SIZE + MULTIPART_OVERHEAD:
+            raise _invalid("invalid image size")
+
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise _invalid("invalid image type")
+
+    events = []
+    header_field = bytearray()
+    header_value = bytearray()
+    part_headers: Dict[bytes, bytes] = {}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        part_headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        events.append(("headers", dict(part_headers)))
+        part_headers.clear()
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(("data", data[start:end]))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    writer = UploadWriter(images_dir())
+    await writer.open()
+
+    extension = None
+    in_file_part = False
+    file_done = False
+    head = bytearray()
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > settings.MAX_IMAGE_SIZE + MULTIPART_OVERHEAD:
+                raise _invalid("invalid image size")
+
+            parser.write(chunk)
+            for event, data in events:
+                if event == "headers":
+                    _, disposition = parse_options_header(
+                        data.get(b"content-disposition")
+                    )
+                    in_file_part = (
+                        not file_done
+                        and disposition.get(b"name") == field_name.encode()
+                        and b"filename" in disposition
+                    )
+                elif event == "data" and in_file_part:
+                    if extension is None:
+                        # Decide the type from magic bytes, not client metadata.
+                        head.extend(data)
+                        if len(head) < SNIFF_SIZE:
+                            continue
+                        extension = sniff_image_type(bytes(head))
+                        if extension not in settings.ALLOWED_IMAGE_EXTENSIONS:
+                            raise _invalid("invalid image type")
+                        data, head = bytes(head), bytearray()
+
+                    if writer.size + len(data) > settings.MAX_IMAGE_SIZE:
+                        raise _invalid("invalid image size")
+                    await writer.write(data)
+                elif event == "end" and in_file_part:
+                    in_file_part = False
+                    file_done = True
+            events.clear()
+
+        parser.finalize()
+        if not file_done or extension is None:
+            raise _invalid("invalid image type")
+        await writer.close()
+    except BaseException:
+        await writer.abort()
+        raise
+
+    return ReceivedImage(writer=writer, extension=extension)
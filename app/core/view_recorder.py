@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import time
+from collections import Counter as CounterDict, OrderedDict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from app.core.config import settings
+from app.core.counters import change_counter
+from app.core.leaderboard import leaderboards
+from app.core.live import live_counters
+from app.core.metrics import Counter, Gauge, Histogram
+from app.core.trending import trending
+from app.models.models import Project, ProjectView
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = Histogram(
+    "view_recorder_batch_size",
+    "Number of views written by one flush",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 5000),
+)
+FLUSH_LAG = Histogram(
+    "view_recorder_lag_seconds",
+    "Time between recording a view and writing it to the database",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+DROPPED = Counter(
+    "view_recorder_dropped_total", "Views dropped because the queue was full"
+)
+PENDING = Gauge("view_recorder_pending", "Views waiting to be written")
+
+INSERT_VIEWS_QUERY = """
+    WITH inserted AS (
+        INSERT INTO project_views (user_id, project_id)
+        SELECT pending.user_id, pending.project_id
+        FROM unnest($1::bigint[], $2::uuid[]) AS pending(user_id, project_id)
+        WHERE EXISTS (SELECT 1 FROM projects WHERE projects.id = pending.project_id)
+        ON CONFLICT (user_id, project_id) DO NOTHING
+        RETURNING project_id
+    )
+    UPDATE projects SET
+        views_count = projects.views_count + counted.views,
+        version = projects.version + 1
+    FROM (
+        SELECT project_id, COUNT(*) AS views FROM inserted GROUP BY project_id
+    ) AS counted
+    WHERE projects.id = counted.project_id
+    RETURNING projects.id, counted.views, projects.views_count
+"""
+
+
+class ViewRecorder:
+    def __init__(
+        self,
+        flush_interval: float,
+        batch_size: int,
+        max_pending: int,
+        recorded_cache_size: int,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.recorded_cache_size = recorded_cache_size
+
+        self._pending: Dict[Tuple[int, UUID], float] = {}
+        # Pairs that are known to be stored already, so re-views are not queued.
+        self._recorded: OrderedDict[Tuple[int, UUID], None] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        PENDING.set_function(lambda: len(self._pending))
+
+    def record(self, user_id: int, project_id: UUID):
+        key = (user_id, project_id)
+        if key in self._pending:
+            return
+        if key in self._recorded:
+            self._recorded.move_to_end(key)
+            return
+        if len(self._pending) >= self.max_pending:
+            DROPPED.inc()
+            return
+
+        self._pending[key] = time.monotonic()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Failed to flush project views on shutdown")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush project views")
+
+    async def flush(self):
+        async with self._lock:
+            while self._pending:
+                batch = dict(list(self._pending.items())[: self.batch_size])
+                for key in batch:
+                    del self._pending[key]
+
+                try:
+                    await self._write(batch)
+                except Exception:
+                    self._requeue(batch)
+                    raise
+
+    async def _write(self, batch: Dict[Tuple[int, UUID], float]):
+        user_ids = [user_id for user_id, _ in batch]
+        project_ids = [project_id for _, project_id in batch]
+
+        connection = Tortoise.get_connection("default")
+        if connection.capabilities.dialect == "postgres":
+            rows = await connection.execute_query_dict(
+                INSERT_VIEWS_QUERY, [user_ids, project_ids]
+            )
+        else:
+            rows = await self._write_fallback(list(batch))
+        if rows:
+            leaderboards.invalidate()
+        for row in rows:
+            trending.record(row["id"], "view", row["views"])
+            live_counters.publish(row["id"], views_count=row["views_count"])
+
+        now = time.monotonic()
+        BATCH_SIZE.observe(len(batch))
+        for key, recorded_at in batch.items():
+            FLUSH_LAG.observe(now - recorded_at)
+            self._remember(key)
+
+    async def _write_fallback(self, keys: List[Tuple[int, UUID]]) -> List[dict]:
+        project_ids = {project_id for _, project_id in keys}
+        async with in_transaction():
+            existing = set(
+                await Project.filter(id__in=project_ids).values_list("id", flat=True)
+            )
+            stored = set(
+                await ProjectView.filter(project_id__in=project_ids).values_list(
+                    "user_id", "project_id"
+                )
+            )
+            new = [
+                key for key in keys if key[1] in existing and key not in stored
+            ]
+            await ProjectView.bulk_create(
+                [ProjectView(user_id=user_id, project_id=id) for user_id, id in new]
+            )
+            views = CounterDict(project_id for _, project_id in new)
+            for project_id, count in views.items():
+                await change_counter(project_id, "views_count", count)
+            rows = await Project.filter(id__in=list(views)).values(
+                "id", "views_count"
+            )
+        for row in rows:
+            row["views"] = views[row["id"]]
+        return rows
+
+    def _requeue(self, batch: Dict[Tuple[int, UUID], float]):
+        for key, recorded_at in batch.items():
+            if len(self._pending) >= self.max_pending:
+                DROPPED.inc()
+                continue
+            self._pending.setdefault(key, recorded_at)
+
+    def _remember(self, key: Tuple[int, UUID]):
+        self._recorded[key] = None
+        self._recorded.move_to_end(key)
+        if len(self._recorded) > self.recorded_cache_size:
+            self._recorded.popitem(last=False)
+
+
+view_recorder = ViewRecorder(
+    flush_interval=settings.VIEW_FLUSH_INTERVAL,
+    batch_size=settings.VIEW_FLUSH_BATCH_SIZE,
+    max_pending=settings.VIEW_QUEUE_MAX_SIZE,
+    recorded_cache_size=settings.VIEW_RECORDED_CACHE_SIZE,
+)
@@ -1,18 +1,61 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from tortoise.contrib.fastapi import register_tortoise
+from tortoise.contrib.fastapi import RegisterTortoise
 
 from app.routers.main import router
 from app.core.config import DATABASE_CONFIG, settings
+from app.core.daily_stats import daily_stats
+from app.core.db import instrument_queries
+from app.core.schema import apply_schema_updates
+from app.core.images import shutdown_pool
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.leaderboard import leaderboards
+from app.core.live import live_counters
+from app.core.media import MediaFiles
+from app.core.replicas import ReplicaRoutingMiddleware, replicas
+from app.core.search import search_engine
+from app.core.storage import image_collector
+from app.core.trending import trending
+from app.core.view_recorder import view_recorder
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with RegisterTortoise(app, config=DATABASE_CONFIG, generate_schemas=True):
+        instrument_queries()
+        await apply_schema_updates()
+        await replicas.start()
+        await search_engine.start()
+        await view_recorder.start()
+        await leaderboards.start()
+        await trending.start()
+        await live_counters.start()
+        await daily_stats.start()
+        await image_collector.start()
+        yield
+        await image_collector.stop()
+        await daily_stats.stop()
+        await live_counters.stop()
+        await trending.stop()
+        await leaderboards.stop()
+        await view_recorder.stop()
+        await replicas.stop()
+        shutdown_pool()
 
-app = FastAPI(openapi_version="3.1.0")
+
+app = FastAPI(
+    openapi_version="3.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.mount(
     "/uploads",
-    StaticFiles(directory=f"{settings.BASE_DIR}/{settings.UPLOAD_DIR}"),
+    MediaFiles(directory=f"{settings.BASE_DIR}/{settings.UPLOAD_DIR}"),
     name="uploads",
 )
 
@@ -25,6 +68,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-register_tortoise(app, config=DATABASE_CONFIG, generate_schemas=True)
+app.add_middleware(ReplicaRoutingMiddleware)
+app.add_middleware(InstrumentationMiddleware)
 
 app.include_router(router)
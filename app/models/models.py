@@ -11,6 +11,8 @@ class User(Model):
     username = fields.CharField(max_length=255, null=True)
     photo_url = fields.TextField(null=True)
     created_time = fields.DatetimeField(auto_now_add=True)
+    # Bumped on profile updates; part of the cache key of project details.
+    version = fields.IntField(default=1)
 
     class Meta:
         table = "users"
@@ -23,8 +25,13 @@ class Project(Model):
     title = fields.TextField()
     subtitle = fields.TextField()
     image_url = fields.TextField(null=True)
+    image_derivatives = fields.JSONField(null=True)
     created_time = fields.DatetimeField(auto_now_add=True)
     required_funds = fields.BigIntField()
+    likes_count = fields.IntField(default=0)
+    views_count = fields.IntField(default=0)
+    shares_count = fields.IntField(default=0)
+    version = fields.IntField(default=1)
     views = fields.ReverseRelation["ProjectView"]
     likes = fields.ReverseRelation["ProjectLike"]
 
@@ -36,6 +43,7 @@ class ProjectLike(Model):
     id = fields.BigIntField(pk=True)
     user = fields.ForeignKeyField("models.User", related_name="likes")
     project = fields.ForeignKeyField("models.Project", related_name="likes")
+    created_time = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
         table = "project_likes"
@@ -49,6 +57,7 @@ class ProjectView(Model):
     id = fields.BigIntField(pk=True)
     user = fields.ForeignKeyField("models.User", related_name="views")
     project = fields.ForeignKeyField("models.Project", related_name="views")
+    created_time = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
         table = "project_views"
@@ -58,10 +67,40 @@ class ProjectView(Model):
         return str(self.id)
 
 
+class StoredImage(Model):
+    sha256 = fields.CharField(max_length=64, primary_key=True)
+    extension = fields.CharField(max_length=8)
+    size = fields.BigIntField()
+    created_time = fields.DatetimeField(auto_now_add=True)
+    # Last upload or release; unreferenced images are collected a grace
+    # period after it.
+    last_used_time = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "stored_images"
+
+    def __str__(self) -> str:
+        return self.sha256
+
+
+class ProjectImage(Model):
+    id = fields.BigIntField(pk=True)
+    project = fields.ForeignKeyField("models.Project", related_name="images")
+    image = fields.ForeignKeyField("models.StoredImage", related_name="projects")
+
+    class Meta:
+        table = "project_images"
+        unique_together = ("project", "image")
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+
 class ProjectShare(Model):
     id = fields.BigIntField(pk=True)
     user = fields.ForeignKeyField("models.User")
     project = fields.ForeignKeyField("models.Project")
+    created_time = fields.DatetimeField(auto_now_add=True)
 
     class Meta:
         table = "project_shares"
@@ -69,3 +108,77 @@ class ProjectShare(Model):
 
     def __str__(self) -> str:
         return str(self.id)
+
+
+class ProjectTrending(Model):
+    id = fields.BigIntField(pk=True)
+    project = fields.OneToOneField("models.Project", related_name="trending")
+    # ln of the decayed score, expressed at the trending epoch so it never
+    # needs rewriting as time passes (see app.core.trending).
+    log_score = fields.FloatField(index=True)
+    updated_time = fields.DatetimeField(auto_now=True, index=True)
+
+    class Meta:
+        table = "project_trending"
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+
+class ProjectSimilar(Model):
+    id = fields.BigIntField(pk=True)
+    project = fields.OneToOneField("models.Project", related_name="similar")
+    # [{"id": ..., "score": ...}] by descending cosine similarity.
+    neighbors = fields.JSONField()
+    created_time = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "project_similar"
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+
+class ProjectDailyStats(Model):
+    id = fields.BigIntField(pk=True)
+    project = fields.ForeignKeyField("models.Project", related_name="daily_stats")
+    # UTC day the interactions happened on.
+    day = fields.DateField()
+    views = fields.IntField(default=0)
+    likes = fields.IntField(default=0)
+    shares = fields.IntField(default=0)
+
+    class Meta:
+        table = "project_daily_stats"
+        unique_together = ("project", "day")
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+
+class ProjectUnlike(Model):
+    # A removed like, kept until the daily stats have taken it back from the
+    # day the like was given (see app.core.daily_stats).
+    id = fields.BigIntField(pk=True)
+    project = fields.ForeignKeyField("models.Project", related_name="unlikes")
+    like_id = fields.BigIntField()
+    liked_time = fields.DatetimeField()
+
+    class Meta:
+        table = "project_unlikes"
+
+    def __str__(self) -> str:
+        return str(self.id)
+
+
+class RollupWatermark(Model):
+    # The interaction table rolled up; rows up to last_id are counted.
+    name = fields.CharField(max_length=64, pk=True)
+    last_id = fields.BigIntField(default=0)
+    updated_time = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "rollup_watermarks"
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,33 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from app.core.deps import AdminUserDep
+from app.core.export import MEDIA_TYPES, export_projects
+from app.core.pagination import decode_cursor
+
+
+router = APIRouter()
+
+
+@router.get(path="/export/projects")
+async def export_projects_view(
+    user: AdminUserDep,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    cursor: Optional[str] = None,
+    include_blocks: bool = False,
+    include_counts: bool = True,
+):
+    if cursor:
+        # Fail before the response starts instead of mid-stream.
+        decode_cursor(cursor)
+
+    return StreamingResponse(
+        export_projects(format, cursor, include_blocks, include_counts),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="projects.{format}"',
+            "Cache-Control": "no-store",
+        },
+    )
@@ -1,10 +1,13 @@
 import time
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi import APIRouter, HTTPException, status
+from tortoise.expressions import F
 
 from app.models.models import User
 from app.schemas.user import UserTelegramData
 from app.core.auth import verify_telegram_hash, create_access_token
+from app.core.deps import invalidate_user
+from app.core.replicas import replicas
 
 
 router = APIRouter()
@@ -30,11 +33,20 @@ async def auth_user(user: UserTelegramData):
         new = True
     else:
         user_in_base.update_from_dict(user_dict)
-        await user_in_base.save()
+        # The version is bumped in the database, so that concurrent logins
+        # never write back a stale one.
+        await user_in_base.save(
+            update_fields=["first_name", "last_name", "username", "photo_url"]
+        )
+        await User.filter(id=user_in_base.id).update(version=F("version") + 1)
+        invalidate_user(user_in_base.id)
 
+    # The login request carried no token, so the routing middleware could not
+    # tell whose reads to keep on the primary.
+    replicas.stick(user_in_base.id)
     access_token, expire = create_access_token(user_id=user_in_base.id)
 
-    response = JSONResponse(
+    response = ORJSONResponse(
         content={
             "success": True,
             "access_token": access_token,
@@ -1,11 +1,14 @@
 from uuid import UUID
 from fastapi import APIRouter, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
-from tortoise.exceptions import OperationalError
+from tortoise.exceptions import DoesNotExist, IntegrityError, OperationalError
 
+from app.core import interactions
 from app.core.deps import CurrentUserDep
-from app.models.models import Project, ProjectLike, ProjectShare
+from app.core.leaderboard import leaderboards
+from app.core.live import live_counters
+from app.core.trending import trending
 
 
 router = APIRouter()
@@ -13,59 +16,62 @@ router = APIRouter()
 
 @router.post("/set-like/{project_id}")
 async def toggle_like(user: CurrentUserDep, project_id: UUID):
-    project = await Project.filter(id=project_id).first()
-    if not project:
-        return JSONResponse(
+    try:
+        liked, likes_count = await interactions.toggle_like(user.id, project_id)
+    except DoesNotExist:
+        return ORJSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={"detail": "Project not found"},
         )
-
-    like = await ProjectLike.filter(user=user, project=project).first()
-    if like:
-        await like.delete()
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content={"detail": "Disliked"},
-        )
-    try:
-        await ProjectLike.create(user=user, project=project)
-        return JSONResponse(
-            status_code=status.HTTP_201_CREATED,
-            content={"detail": "Liked"},
+    except IntegrityError:
+        return ORJSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": "Already liked"},
         )
     except OperationalError:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content={"detail": "Unexpected error"},
         )
 
+    leaderboards.invalidate()
+    live_counters.publish(project_id, likes_count=likes_count)
+    if liked:
+        trending.record_like(user.id, project_id)
+    return ORJSONResponse(
+        status_code=status.HTTP_201_CREATED if liked else status.HTTP_200_OK,
+        content={
+            "detail": "Liked" if liked else "Disliked",
+            "liked": liked,
+            "likes_count": likes_count,
+        },
+    )
+
 
 @router.post("/set-share/{project_id}")
-async def set_share(user: CurrentUserDep, project_id: str):
-    project = await Project.filter(id=project_id).first()
-    if not project:
-        return JSONResponse(
+async def set_share(user: CurrentUserDep, project_id: UUID):
+    try:
+        shares_count = await interactions.record_share(user.id, project_id)
+    except DoesNotExist:
+        return ORJSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={"detail": "Project not found"},
         )
+    except OperationalError:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Database error"},
+        )
 
-    exists = await ProjectShare.filter(user=user, project=project).exists()
-
-    if not exists:
-        try:
-            await ProjectShare.create(user=user, project=project)
-        except OperationalError:
-            return JSONResponse(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                content={"detail": "Database error"},
-            )
-    else:
-        return JSONResponse(
+    if shares_count is None:
+        return ORJSONResponse(
             status_code=status.HTTP_406_NOT_ACCEPTABLE,
             content={"detail": "Already shared"},
         )
 
-    return JSONResponse(
+    trending.record(project_id, "share")
+    live_counters.publish(project_id, shares_count=shares_count)
+    return ORJSONResponse(
         status_code=status.HTTP_200_OK,
-        content={"detail": "Project shared"},
+        content={"detail": "Project shared", "shares_count": shares_count},
     )
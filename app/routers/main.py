@@ -2,15 +2,19 @@ from fastapi import APIRouter
 
 from app.routers import like_view_share
 
+from . import admin
 from . import auth
+from . import metrics
 from . import upload
 from . import projects
 
 router = APIRouter()
 
+router.include_router(metrics.router)
 router.include_router(upload.router, tags=["Upload"])
 router.include_router(auth.router, prefix="/auth", tags=["User Auth"])
 router.include_router(projects.router, prefix="/projects", tags=["Projects"])
+router.include_router(admin.router, prefix="/admin", tags=["Admin"])
 router.include_router(
     like_view_share.router,
     prefix="/set-project",
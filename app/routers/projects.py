@@ -1,134 +1,314 @@
 import os
 import random
 import uuid
-from typing import List
-from tortoise.expressions import Q
-from tortoise.functions import Count
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, Body, status, Query
-
-from app.core.project import fuzzy_multiword_search, shorter
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi import APIRouter, Body, Header, status, Query
+
+from app.core.daily_stats import get_daily_stats
+from app.core.encoding import dumps
+from app.core.images import clean_derivatives
+from app.core.project import (
+    SHORT_PROJECT_FIELDS,
+    get_project_blocks,
+    get_project_cards,
+    get_project_stats,
+)
+from app.core.search import search_engine
+from app.core.similar import get_similar_projects
+from app.core.storage import (
+    extract_image_hashes,
+    legacy_upload_path,
+    release_images,
+    sync_project_images,
+)
 from app.core.deps import CurrentUserDep, OptionalUserDep
-from app.schemas.project import CreateProjectData, ShortProjectOut
-from app.models.models import Project, ProjectLike, ProjectShare, ProjectView
+from app.core.detail_cache import get_project_detail, project_etag, with_liked
+from app.core.leaderboard import leaderboards
+from app.core.live import live_counters
+from app.core.media import etag_matches
+from app.core.pagination import paginate
+from app.core.trending import trending
+from app.core.view_recorder import view_recorder
+from app.schemas.project import (
+    CreateProjectData,
+    ProjectBlocksPage,
+    ProjectCard,
+    ProjectDailyStatsOut,
+    ProjectIds,
+    ProjectOut,
+    ProjectPage,
+    ProjectStats,
+    SearchResults,
+    ShortProjectOut,
+    SimilarProjectOut,
+    TrendingProjectOut,
+)
+from app.models.models import Project, ProjectLike
 from app.core.config import settings
 
 
 router = APIRouter()
 
 
+def filter_by_funds(queryset, min_funds: Optional[int], max_funds: Optional[int]):
+    if min_funds is not None:
+        queryset = queryset.filter(required_funds__gte=min_funds)
+    if max_funds is not None:
+        queryset = queryset.filter(required_funds__lte=max_funds)
+    return queryset
+
+
 @router.post(path="/project", status_code=status.HTTP_201_CREATED)
 async def create_project(
     user: CurrentUserDep,
     project: CreateProjectData = Body(...),
 ):
-    blocks = project.blocks
-    if len(blocks) < 2:
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST, content="Blocks length too small"
+    serialized_blocks = [block.model_dump() for block in project.blocks]
+    async with in_transaction():
+        project_in_base = await Project.create(
+            user=user,
+            data=serialized_blocks,
+            title=project.title,
+            subtitle=project.subtitle,
+            image_url=project.image_url,
+            image_derivatives=project.image_derivatives,
+            required_funds=project.requiredFunds,
         )
-
-    if not (
-        blocks[0].type == "header"
-        and blocks[0].data.get("level", 0) == 3
-        and len(blocks[0].data.get("text", "")) > 5
-        and len(blocks[0].data.get("text", "")) < 50
-        and blocks[1].type == "header"
-        and blocks[1].data.get("level", 0) == 5
-        and len(blocks[1].data.get("text", "")) > 10
-        and len(blocks[1].data.get("text", "")) < 500
-    ):
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST, content="Invalid blocks"
+        await sync_project_images(
+            project_in_base, extract_image_hashes(serialized_blocks)
         )
+    search_engine.index(project_in_base)
+    leaderboards.invalidate()
 
-    project_title = blocks[0].data.get("text")
-    project_subtitle = shorter(blocks[1].data.get("text"))
-
-    project_image_url = None
-    for block in blocks:
-        file_data = block.data.get("file", None)
-        if file_data:
-            project_image_url = file_data.get("url")[0]
-            break
-
-    serialized_blocks = [block.model_dump() for block in blocks]
-    await Project.create(
-        user=user,
-        data=serialized_blocks,
-        title=project_title,
-        subtitle=project_subtitle,
-        image_url=project_image_url,
-        required_funds=project.requiredFunds,
-    )
+    return ORJSONResponse(content="Project created")
 
-    return JSONResponse(content="Project created")
 
-
-@router.get(path="/my-projects", status_code=200, response_model=List[ShortProjectOut])
+@router.get(path="/my-projects", status_code=200, response_model=ProjectPage)
 async def get_my_projects(
     user: CurrentUserDep,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=settings.FEED_MAX_LIMIT),
+    min_funds: Optional[int] = Query(None, ge=0),
+    max_funds: Optional[int] = Query(None, ge=0),
 ):
-    projects = await Project.filter(user=user).prefetch_related("user").all()
+    queryset = filter_by_funds(Project.filter(user=user), min_funds, max_funds)
+    projects, next_cursor = await paginate(
+        queryset, SHORT_PROJECT_FIELDS, cursor, limit
+    )
 
-    return projects
+    return {"items": projects, "next_cursor": next_cursor}
 
 
-@router.get(path="/project/{id}", status_code=status.HTTP_200_OK)
-async def get_project(id: uuid.UUID, user: OptionalUserDep):
-    project = await Project.filter(id=id).prefetch_related("user").first()
-    if project:
-        if user:
-            await ProjectView.get_or_create(user=user, project=project)
+@router.get(path="/feed", response_model=ProjectPage)
+async def get_feed(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=settings.FEED_MAX_LIMIT),
+    author: Optional[int] = None,
+    min_funds: Optional[int] = Query(None, ge=0),
+    max_funds: Optional[int] = Query(None, ge=0),
+):
+    queryset = Project.all()
+    if author is not None:
+        queryset = queryset.filter(user_id=author)
+    queryset = filter_by_funds(queryset, min_funds, max_funds)
+    projects, next_cursor = await paginate(
+        queryset, SHORT_PROJECT_FIELDS, cursor, limit
+    )
+
+    return {"items": projects, "next_cursor": next_cursor}
+
+
+@router.post(path="/batch", response_model=List[ProjectCard])
+async def get_projects_batch(body: ProjectIds = Body(...)):
+    return await get_project_cards(body.ids)
+
+
+@router.post(path="/stats", response_model=List[ProjectStats])
+async def get_projects_stats(user: OptionalUserDep, body: ProjectIds = Body(...)):
+    return await get_project_stats(body.ids, user.id if user else None)
+
+
+@router.get(
+    path="/project/{id}", status_code=status.HTTP_200_OK, response_model=ProjectOut
+)
+async def get_project(
+    id: uuid.UUID,
+    user: OptionalUserDep,
+    if_none_match: Optional[str] = Header(None),
+):
+    versions = (
+        await Project.filter(id=id).first().values_list("version", "user__version")
+    )
+    if versions is not None:
+        version, author_version = versions
         liked = False
         if user:
-            liked = await ProjectLike.filter(user=user, project=project).exists()
-
-        likes_count = await ProjectLike.filter(project=project).count()
-        shares_count = await ProjectShare.filter(project=project).count()
-        views_count = await ProjectView.filter(project=project).count()
-
-        project_out_data = {
-            "id": project.id,
-            "user": {
-                "id": project.user.id,
-                "telegram_id": project.user.telegram_id,
-                "username": project.user.username,
-                "first_name": project.user.first_name,
-                "last_name": project.user.last_name,
-            },
-            "data": project.data,
-            "views_count": views_count,
-            "likes_count": likes_count,
-            "shares_count": shares_count,
-            "created_time": project.created_time,
-            "liked": liked,
-            "required_funds": project.required_funds,
+            view_recorder.record(user.id, id)
+            liked = await ProjectLike.filter(user=user, project_id=id).exists()
+
+        headers = {
+            "ETag": project_etag(id, version, author_version, liked),
+            "Cache-Control": "private, no-cache",
+            "Vary": "Authorization",
         }
+        if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-        return project_out_data
-    return JSONResponse(
+        project_out_data, version, author_version = await get_project_detail(
+            id, version, author_version
+        )
+        if project_out_data is not None:
+            headers["ETag"] = project_etag(id, version, author_version, liked)
+            return Response(
+                content=with_liked(project_out_data, liked),
+                media_type="application/json",
+                headers=headers,
+            )
+    return ORJSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
         content="Project not found",
     )
 
 
+@router.get(path="/project/{id}/blocks", response_model=ProjectBlocksPage)
+async def get_project_blocks_page(
+    id: uuid.UUID,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=settings.PROJECT_BLOCKS_MAX_LIMIT),
+):
+    page = await get_project_blocks(id, offset, limit)
+    if page is None:
+        return ORJSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content="Project not found",
+        )
+
+    blocks, total = page
+    next_offset = offset + limit if offset + limit < total else None
+    return {
+        "blocks": blocks,
+        "total": total,
+        "offset": offset,
+        "next_offset": next_offset,
+    }
+
+
+async def _live_events(subscription):
+    # Clients reconnect after 5s if the stream drops.
+    yield b"retry: 5000\n\n"
+    while True:
+        counts = await subscription.next(settings.LIVE_HEARTBEAT_INTERVAL)
+        if subscription.closed:
+            yield b"event: deleted\ndata: {}\n\n"
+            return
+        if counts is None:
+            yield b": ping\n\n"
+        else:
+            yield b"event: counts\ndata: " + dumps(counts) + b"\n\n"
+
+
+@router.get(path="/project/{id}/live")
+async def get_project_live(id: uuid.UUID):
+    if live_counters.full:
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content="Too many subscribers",
+        )
+    subscription = await live_counters.subscribe(id)
+    if subscription is None:
+        return ORJSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content="Project not found",
+        )
+    return StreamingResponse(
+        _live_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also runs when the client disconnects mid-stream.
+        background=BackgroundTask(live_counters.unsubscribe, subscription),
+    )
+
+
+@router.get(path="/project/{id}/daily-stats", response_model=ProjectDailyStatsOut)
+async def get_project_daily_stats(
+    user: CurrentUserDep,
+    id: uuid.UUID,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    owner_id = await Project.filter(id=id).first().values_list("user_id", flat=True)
+    if owner_id is None:
+        return ORJSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND, content="Project not found"
+        )
+    if owner_id != user.id:
+        return ORJSONResponse(
+            status_code=status.HTTP_403_FORBIDDEN, content="Project is not yours"
+        )
+
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days >= settings.DAILY_STATS_MAX_DAYS:
+        return ORJSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST, content="Invalid date range"
+        )
+
+    days = await get_daily_stats(id, start, end)
+    return {"start": start, "end": end, "days": days}
+
+
+@router.get(path="/project/{id}/similar", response_model=List[SimilarProjectOut])
+async def get_similar(
+    id: uuid.UUID,
+    limit: int = Query(10, ge=1, le=settings.SIMILAR_K),
+):
+    projects = await get_similar_projects(id, limit)
+    if projects is None:
+        return ORJSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content="Project not found",
+        )
+    return projects
+
+
 @router.delete(path="/project/{id}", status_code=status.HTTP_200_OK)
 async def delete_project(user: CurrentUserDep, id: uuid.UUID):
-    project = await Project.filter(id=id).first()
+    project = await Project.filter(id=id).only("id", "user_id", "data").first()
     if project:
+        if project.user_id != user.id:
+            return ORJSONResponse(
+                status_code=status.HTTP_403_FORBIDDEN, content="Project is not yours"
+            )
+        # Images shared by content hash are released below if unused.
+        image_hashes = extract_image_hashes(project.data)
         for item in project.data:
             if item['type'] == "image":
-                urls = item['data']['file']['url']
-                for url in urls:
-                    relative_path = url.split("/api/")[1]
+                file_data = item['data']['file']
+                url = file_data.get('url')
+                derivatives = clean_derivatives(file_data.get('derivatives')) or {}
+                urls = [url] if isinstance(url, str) else [*(url or ())]
+                for url in [*urls, *derivatives.values()]:
+                    path = legacy_upload_path(url)
+                    if path is None:
+                        continue
                     try:
-                        os.remove(os.path.join(settings.BASE_DIR, relative_path))
-                    except:
+                        os.remove(path)
+                    except OSError:
                         pass
         await project.delete()
+        await release_images(image_hashes)
+        search_engine.remove(id)
+        leaderboards.invalidate()
+        trending.remove(id)
+        live_counters.close(id)
         return {"message": "Deleted"}
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
         content="Project not found",
     )
@@ -138,86 +318,78 @@ async def delete_project(user: CurrentUserDep, id: uuid.UUID):
 async def update_project(
     user: CurrentUserDep, id: uuid.UUID, project: CreateProjectData = Body(...)
 ):
-    project_in_base = await Project.filter(id=id).prefetch_related("user").first()
-    if not project:
-        return JSONResponse(
+    project_in_base = (
+        await Project.filter(id=id).only("id", "user_id", "created_time").first()
+    )
+    if not project_in_base:
+        return ORJSONResponse(
             status_code=status.HTTP_404_NOT_FOUND, content="Project not found"
         )
-    if project_in_base.user != user:
-        return JSONResponse(
+    if project_in_base.user_id != user.id:
+        return ORJSONResponse(
             status_code=status.HTTP_403_FORBIDDEN, content="Project is not yours"
         )
-    blocks = project.blocks
-    if len(blocks) < 2:
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST, content="Blocks length too small"
-        )
-
-    if not (
-        blocks[0].type == "header"
-        and blocks[0].data.get("level", 0) == 3
-        and len(blocks[0].data.get("text", "")) > 5
-        and len(blocks[0].data.get("text", "")) < 50
-        and blocks[1].type == "header"
-        and blocks[1].data.get("level", 0) == 5
-        and len(blocks[1].data.get("text", "")) > 10
-        and len(blocks[1].data.get("text", "")) < 500
-    ):
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST, content="Invalid blocks"
-        )
-
-    project_title = blocks[0].data.get("text")
-    project_subtitle = shorter(blocks[1].data.get("text"))
-
-    project_image_url = None
-    for block in blocks:
-        file_data = block.data.get("file", None)
-        if file_data:
-            project_image_url = file_data.get("url")[0]
-
-    serialized_blocks = [block.model_dump() for block in blocks]
+    serialized_blocks = [block.model_dump() for block in project.blocks]
 
     project_in_base.data = serialized_blocks
-    project_in_base.title = project_title
-    project_in_base.subtitle = project_subtitle
-    project_in_base.image_url = project_image_url
+    project_in_base.title = project.title
+    project_in_base.subtitle = project.subtitle
+    project_in_base.image_url = project.image_url
+    project_in_base.image_derivatives = project.image_derivatives
     project_in_base.required_funds = project.requiredFunds
-    await project_in_base.save()
+    async with in_transaction():
+        await Project.filter(id=id).update(
+            data=serialized_blocks,
+            title=project.title,
+            subtitle=project.subtitle,
+            image_url=project.image_url,
+            image_derivatives=project.image_derivatives,
+            required_funds=project.requiredFunds,
+            version=F("version") + 1,
+        )
+        removed_images = await sync_project_images(
+            project_in_base, extract_image_hashes(serialized_blocks)
+        )
+    await release_images(removed_images)
+    search_engine.index(project_in_base)
+    leaderboards.invalidate()
 
-    return JSONResponse(status_code=status.HTTP_200_OK, content="Project updated")
+    return ORJSONResponse(status_code=status.HTTP_200_OK, content="Project updated")
 
 
 @router.get(path="/most-viewed", response_model=List[ShortProjectOut])
-async def get_most_viewed_projects():
-    projects = (
-        await Project.annotate(views_count=Count("views"))
-        .prefetch_related("user")
-        .order_by("-views_count")
-        .limit(5)
-    )
-
-    return projects
+async def get_most_viewed_projects(
+    limit: int = Query(5, ge=1, le=settings.LEADERBOARD_SIZE),
+):
+    return await leaderboards.top("views", limit)
 
 
 @router.get(path="/most-liked", response_model=List[ShortProjectOut])
-async def get_most_liked_projects():
-    projects = (
-        await Project.annotate(likes_count=Count("likes"))
-        .prefetch_related("user")
-        .order_by("-likes_count")
-        .limit(5)
-    )
+async def get_most_liked_projects(
+    limit: int = Query(5, ge=1, le=settings.LEADERBOARD_SIZE),
+):
+    return await leaderboards.top("likes", limit)
 
-    return projects
+
+@router.get(path="/trending", response_model=List[TrendingProjectOut])
+async def get_trending_projects(
+    limit: int = Query(20, ge=1, le=settings.TRENDING_SIZE),
+):
+    return trending.top(limit)
 
 
-@router.get(path="/search", response_model=List[ShortProjectOut])
-async def search_project(q: str = Query(..., min_length=3, max_length=20)):
-    projects = await fuzzy_multiword_search(q)
-    if projects == []:
-        return JSONResponse(
-            status_code=status.HTTP_404_NOT_FOUND, content="No projects like that"
-        )
-    projects = [ShortProjectOut(**row) for row in projects]
-    return projects
+@router.get(path="/search", response_model=SearchResults)
+async def search_project(
+    q: str = Query(..., min_length=3, max_length=20),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=settings.SEARCH_MAX_LIMIT),
+):
+    projects, total = await search_engine.search(q.lower(), offset, limit)
+    next_offset = offset + limit if offset + limit < total else None
+
+    return {
+        "items": projects,
+        "total": total,
+        "offset": offset,
+        "next_offset": next_offset,
+    }
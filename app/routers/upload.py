@@ -1,49 +1,67 @@
-import os
-import shutil
-from fastapi.responses import JSONResponse
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
-
-from app.core.config import settings
-from app.core.deps import CurrentUserDep
+import logging
+from concurrent.futures.process import BrokenProcessPool
 
+from fastapi.responses import ORJSONResponse
+from fastapi import APIRouter, Form, HTTPException, Request
 
-router = APIRouter()
+from app.core.deps import CurrentUserDep
+from app.core.images import InvalidImage, image_url
+from app.core.storage import release_images, store_image
+from app.core.uploads import receive_image
 
 
-@router.post("/uploadImage")
-async def upload_image(user: CurrentUserDep, file: UploadFile = File(...)):
-    if file.content_type not in settings.ALLOWED_IMAGE_TYPES:
-        raise HTTPException(status_code=400, detail="invalid image type")
+logger = logging.getLogger(__name__)
 
-    file_ext = file.filename.split(".")[-1].lower()
-    if file_ext not in settings.ALLOWED_IMAGE_EXTENSIONS:
-        raise HTTPException(status_code=400, detail="invalid image type")
+router = APIRouter()
 
-    file.file.seek(0, 2)
-    file_size = file.file.tell()
-    file.file.seek(0)
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
 
-    if file_size > settings.MAX_IMAGE_SIZE:
-        raise HTTPException(status_code=400, detail="invalid image size")
 
-    safe_filename = f"{os.urandom(8).hex()}.{file_ext}"
-    file_location = f"{settings.BASE_DIR}/{settings.UPLOAD_DIR}/images/{safe_filename}"
+@router.post("/uploadImage", openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_image(user: CurrentUserDep, request: Request):
+    image = await receive_image(request)
 
-    try:
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        print(e)
-        raise HTTPException(status_code=500, detail="error during saving")
+    for attempt in range(2):
+        try:
+            safe_filename, derivatives = await store_image(image)
+            break
+        except InvalidImage:
+            await release_images({image.writer.sha256})
+            raise HTTPException(status_code=400, detail="invalid image")
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); retry once on a new pool.
+            # The stored original is collected later if it stays unused.
+            logger.exception("Image worker crashed")
+            if attempt:
+                raise HTTPException(
+                    status_code=503, detail="image processing unavailable"
+                )
+        except OSError:
+            logger.exception("Failed to store uploaded image")
+            await image.writer.abort()
+            raise HTTPException(status_code=500, detail="error during saving")
 
-    return JSONResponse(
+    return ORJSONResponse(
         content={
             "success": 1,
             "file": {
-                "url": (
-                    f"https://{settings.ORIGIN}/api/{settings.UPLOAD_DIR}"
-                    f"/images/{safe_filename}",
-                )
+                "url": (image_url(safe_filename),),
+                "derivatives": {
+                    name: image_url(filename) for name, filename in derivatives.items()
+                },
             },
         }
     )
@@ -51,4 +69,4 @@ async def upload_image(user: CurrentUserDep, file: UploadFile = File(...)):
 
 @router.post("/fetch")
 async def fetch(url: str = Form(...)):
-    return JSONResponse(content={"success": 1, "file": {"url": url}})
+    return ORJSONResponse(content={"success": 1, "file": {"url": url}})
@@ -1,6 +1,13 @@
 from uuid import UUID
-from typing import List, Literal, Optional, Union
-from pydantic import BaseModel, Field, field_validator
+from datetime import date, datetime
+from typing import Annotated, Dict, List, Literal, Optional, Union
+
+import orjson
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
+
+from app.core.config import settings
+from app.core.images import clean_derivatives
+from app.core.project import shorter
 
 
 class HeaderBlock(BaseModel):
@@ -10,7 +17,8 @@ class HeaderBlock(BaseModel):
     @field_validator("data")
     @classmethod
     def validate_header(cls, v):
-        if "text" not in v or "level" not in v:
+        # Anything but a ValueError would surface as a 500 instead of a 422.
+        if not isinstance(v.get("text"), str) or type(v.get("level")) is not int:
             raise ValueError("Invalid header data")
         if not (1 <= v["level"] <= 6):
             raise ValueError("Header level out of range")
@@ -61,35 +69,51 @@ class ImageBlock(BaseModel):
     @field_validator("data")
     @classmethod
     def validate_image(cls, v):
-        file_data = v.get("file", {})
-        url = file_data.get("url")
+        file_data = v.get("file")
+        url = file_data.get("url") if isinstance(file_data, dict) else None
 
         if not url:
             raise ValueError("Image must contain URL")
         if isinstance(url, list):
-            if len(url) == 0 or not (
-                url[0].startswith("http://") or url[0].startswith("https://")
-            ):
+            strings = all(isinstance(item, str) for item in url)
+            if not strings or not url[0].startswith(("http://", "https://")):
                 raise ValueError("Image URL must be valid")
+        elif not isinstance(url, str):
+            raise ValueError("Image URL must be valid")
         return v
 
 
-BlockType = Union[
-    HeaderBlock,
-    ParagraphBlock,
-    ListBlock,
-    CodeBlock,
-    InlineCodeBlock,
-    EmbedBlock,
-    ImageBlock,
-    TableBlock,
+# Tagged by "type", so each block is checked against exactly one model.
+BlockType = Annotated[
+    Union[
+        HeaderBlock,
+        ParagraphBlock,
+        ListBlock,
+        CodeBlock,
+        InlineCodeBlock,
+        EmbedBlock,
+        ImageBlock,
+        TableBlock,
+    ],
+    Field(discriminator="type"),
 ]
 
 
+def _is_header(block, level: int, min_length: int, max_length: int) -> bool:
+    if block.type != "header" or block.data.get("level", 0) != level:
+        return False
+    return min_length < len(block.data.get("text", "")) < max_length
+
+
 class CreateProjectData(BaseModel):
-    blocks: List[BlockType]
+    blocks: List[BlockType] = Field(..., max_length=settings.PROJECT_MAX_BLOCKS)
     requiredFunds: int = Field(...)
 
+    _title: str = PrivateAttr()
+    _subtitle: str = PrivateAttr()
+    _image_url: Optional[str] = PrivateAttr(default=None)
+    _image_derivatives: Optional[Dict[str, str]] = PrivateAttr(default=None)
+
     @field_validator("requiredFunds")
     def check_amount(cls, v):
         if v <= 0:
@@ -97,12 +121,139 @@ class CreateProjectData(BaseModel):
 
         return v
 
+    @model_validator(mode="after")
+    def check_blocks(self):
+        blocks = self.blocks
+        if len(blocks) < 2:
+            raise ValueError("Blocks length too small")
+        if not (_is_header(blocks[0], 3, 5, 50) and _is_header(blocks[1], 5, 10, 500)):
+            raise ValueError("Invalid blocks")
+
+        self._title = blocks[0].data["text"]
+        self._subtitle = shorter(blocks[1].data["text"])
+
+        for index, block in enumerate(blocks):
+            try:
+                size = len(orjson.dumps(block.data))
+            except orjson.JSONEncodeError:
+                # e.g. integers beyond 64 bits.
+                raise ValueError(f"Block {index} is invalid")
+            if size > settings.PROJECT_MAX_BLOCK_SIZE:
+                raise ValueError(f"Block {index} is too large")
+
+            if self._image_url is None and block.type == "image":
+                file_data = block.data["file"]
+                url = file_data["url"]
+                self._image_url = url[0] if isinstance(url, list) else url
+                self._image_derivatives = clean_derivatives(
+                    file_data.get("derivatives")
+                )
+
+        return self
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    @property
+    def subtitle(self) -> str:
+        return self._subtitle
+
+    @property
+    def image_url(self) -> Optional[str]:
+        return self._image_url
+
+    @property
+    def image_derivatives(self) -> Optional[Dict[str, str]]:
+        return self._image_derivatives
+
 
 class ShortProjectOut(BaseModel):
     id: UUID
     title: str
     subtitle: str
     image_url: Optional[str]
+    image_derivatives: Optional[Dict[str, str]] = None
 
     class Config:
         from_attributes = True
+
+
+class TrendingProjectOut(ShortProjectOut):
+    score: float
+
+
+class SimilarProjectOut(ShortProjectOut):
+    score: float
+
+
+class ProjectIds(BaseModel):
+    ids: List[UUID] = Field(
+        ..., min_length=1, max_length=settings.PROJECT_BATCH_MAX_IDS
+    )
+
+
+class ProjectCard(ShortProjectOut):
+    views_count: int
+    likes_count: int
+    shares_count: int
+
+
+class ProjectStats(BaseModel):
+    id: UUID
+    views_count: int
+    likes_count: int
+    shares_count: int
+    liked: bool
+
+
+class DailyStats(BaseModel):
+    day: date
+    views: int
+    likes: int
+    shares: int
+
+
+class ProjectDailyStatsOut(BaseModel):
+    start: date
+    end: date
+    days: List[DailyStats]
+
+
+class ProjectAuthor(BaseModel):
+    id: int
+    telegram_id: int
+    username: Optional[str]
+    first_name: str
+    last_name: Optional[str]
+
+
+class ProjectOut(BaseModel):
+    id: UUID
+    user: ProjectAuthor
+    data: List[dict]
+    views_count: int
+    likes_count: int
+    shares_count: int
+    created_time: datetime
+    required_funds: int
+    liked: bool
+
+
+class ProjectBlocksPage(BaseModel):
+    blocks: List[dict]
+    total: int
+    offset: int
+    next_offset: Optional[int]
+
+
+class ProjectPage(BaseModel):
+    items: List[ShortProjectOut]
+    next_cursor: Optional[str]
+
+
+class SearchResults(BaseModel):
+    items: List[ShortProjectOut]
+    total: int
+    offset: int
+    next_offset: Optional[int]
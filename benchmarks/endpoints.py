@@ -0,0 +1,482 @@
+"""Drives every router of app.main:app in-process and reports latency, throughput
+and database queries per request.
+
+    python -m benchmarks.endpoints --projects 2000 --requests 300 --concurrency 10
+    python -m benchmarks.endpoints --update-baseline
+    python -m benchmarks.endpoints --db-url sqlite://:memory:
+
+The app is booted through its own lifespan against the configured database
+(or --db-url), which is seeded first, so point it at a throwaway database.
+Uploads go to a temporary directory.
+Results are compared with the committed baseline and the run exits non-zero
+if a scenario got slower, issues more queries than recorded or is missing from
+the baseline, or if there is no baseline at all.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+@dataclass
+class Context:
+    user_ids: List[int]
+    project_ids: List[str]
+    tokens: Dict[int, str]
+    rng: random.Random
+    image_path: Optional[str] = None
+    own_projects: Dict[int, List[str]] = field(default_factory=dict)
+    creators: set = field(default_factory=set)
+    etags: Dict[str, str] = field(default_factory=dict)
+
+    def user(self) -> int:
+        return self.rng.choice(self.user_ids)
+
+    def auth(self, user_id: Optional[int] = None) -> dict:
+        user_id = user_id or self.user()
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    def project(self) -> str:
+        return self.rng.choice(self.project_ids)
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    request: Callable[[Context], Optional[dict]]
+    expected: tuple = (200,)
+
+
+def _telegram_login(ctx: Context) -> dict:
+    from app.core.config import settings
+
+    data = {
+        "id": ctx.rng.randrange(10**9),
+        "first_name": "Bench",
+        "auth_date": int(time.time()),
+    }
+    secret = hashlib.sha256(settings.BOT_TOKEN.encode()).digest()
+    check = "\n".join(f"{key}={value}" for key, value in sorted(data.items()))
+    data["hash"] = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return {"url": "/auth/telegram-login", "json": data}
+
+
+def _project_blocks(ctx: Context) -> list:
+    from benchmarks.seed import make_blocks
+
+    return make_blocks(ctx.rng, 20)
+
+
+def _create_project(ctx: Context) -> dict:
+    user_id = ctx.user()
+    ctx.creators.add(user_id)
+    return {
+        "url": "/projects/project",
+        "headers": ctx.auth(user_id),
+        "json": {"blocks": _project_blocks(ctx), "requiredFunds": 1000},
+    }
+
+
+def _update_project(ctx: Context) -> Optional[dict]:
+    owners = [user_id for user_id, ids in ctx.own_projects.items() if ids]
+    if not owners:
+        return None
+    user_id = ctx.rng.choice(owners)
+    return {
+        "url": f"/projects/project/{ctx.rng.choice(ctx.own_projects[user_id])}",
+        "headers": ctx.auth(user_id),
+        "json": {"blocks": _project_blocks(ctx), "requiredFunds": 2000},
+    }
+
+
+def _delete_project(ctx: Context) -> Optional[dict]:
+    owners = [user_id for user_id, ids in ctx.own_projects.items() if ids]
+    if not owners:
+        return None
+    user_id = ctx.rng.choice(owners)
+    project_id = ctx.own_projects[user_id].pop()
+    return {"url": f"/projects/project/{project_id}", "headers": ctx.auth(user_id)}
+
+
+def _upload_image(ctx: Context) -> dict:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    color = tuple(ctx.rng.randrange(256) for _ in range(3))
+    Image.new("RGB", (64, 64), color).save(buffer, "PNG")
+    return {
+        "url": "/uploadImage",
+        "headers": ctx.auth(),
+        "files": {"file": ("bench.png", buffer.getvalue(), "image/png")},
+    }
+
+
+def _conditional_detail(ctx: Context) -> dict:
+    project_id = ctx.project()
+    headers = {}
+    if project_id in ctx.etags:
+        headers["If-None-Match"] = ctx.etags[project_id]
+    return {"url": f"/projects/project/{project_id}", "headers": headers}
+
+
+SCENARIOS = [
+    Scenario("auth.telegram_login", "POST", _telegram_login, (200, 201)),
+    Scenario(
+        "projects.feed",
+        "GET",
+        lambda ctx: {"url": "/projects/feed", "params": {"limit": 20}},
+    ),
+    Scenario(
+        "projects.my_projects",
+        "GET",
+        lambda ctx: {"url": "/projects/my-projects", "headers": ctx.auth()},
+    ),
+    Scenario(
+        "projects.detail_anonymous",
+        "GET",
+        lambda ctx: {"url": f"/projects/project/{ctx.project()}"},
+    ),
+    # Before any view is recorded, so that no version bump can make the ETags
+    # of the anonymous requests stale midway and vary the query count.
+    Scenario("projects.detail_conditional", "GET", _conditional_detail, (200, 304)),
+    Scenario(
+        "projects.detail_authenticated",
+        "GET",
+        lambda ctx: {
+            "url": f"/projects/project/{ctx.project()}",
+            "headers": ctx.auth(),
+        },
+    ),
+    Scenario(
+        "projects.blocks",
+        "GET",
+        lambda ctx: {
+            "url": f"/projects/project/{ctx.project()}/blocks",
+            "params": {"offset": 5, "limit": 10},
+        },
+    ),
+    Scenario(
+        "projects.similar",
+        "GET",
+        lambda ctx: {"url": f"/projects/project/{ctx.project()}/similar"},
+    ),
+    Scenario(
+        "projects.most_viewed",
+        "GET",
+        lambda ctx: {"url": "/projects/most-viewed", "params": {"limit": 20}},
+    ),
+    Scenario(
+        "projects.most_liked",
+        "GET",
+        lambda ctx: {"url": "/projects/most-liked", "params": {"limit": 20}},
+    ),
+    Scenario(
+        "projects.trending",
+        "GET",
+        lambda ctx: {"url": "/projects/trending", "params": {"limit": 20}},
+    ),
+    Scenario(
+        "projects.search",
+        "GET",
+        lambda ctx: {"url": "/projects/search", "params": {"q": "startup cloud"}},
+    ),
+    Scenario(
+        "projects.batch",
+        "POST",
+        lambda ctx: {
+            "url": "/projects/batch",
+            "json": {"ids": ctx.rng.sample(ctx.project_ids, 20)},
+        },
+    ),
+    Scenario(
+        "projects.stats",
+        "POST",
+        lambda ctx: {
+            "url": "/projects/stats",
+            "headers": ctx.auth(),
+            "json": {"ids": ctx.rng.sample(ctx.project_ids, 20)},
+        },
+    ),
+    Scenario("projects.create", "POST", _create_project),
+    Scenario("projects.update", "PUT", _update_project),
+    Scenario(
+        "set_project.like",
+        "POST",
+        lambda ctx: {
+            "url": f"/set-project/set-like/{ctx.project()}",
+            "headers": ctx.auth(),
+        },
+        (200, 201),
+    ),
+    Scenario(
+        "set_project.share",
+        "POST",
+        lambda ctx: {
+            "url": f"/set-project/set-share/{ctx.project()}",
+            "headers": ctx.auth(),
+        },
+        (200, 406),
+    ),
+    Scenario("upload.image", "POST", _upload_image),
+    Scenario(
+        "upload.fetch",
+        "POST",
+        lambda ctx: {
+            "url": "/fetch",
+            "data": {"url": "https://example.com/image.png"},
+        },
+    ),
+    Scenario(
+        "uploads.media",
+        "GET",
+        lambda ctx: ctx.image_path and {"url": ctx.image_path},
+    ),
+    Scenario("projects.delete", "DELETE", _delete_project),
+]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_scenario(
+    client, scenario: Scenario, ctx: Context, requests: int, concurrency: int
+) -> Optional[dict]:
+    from app.core.db import track_queries
+
+    latencies: List[float] = []
+    queries: List[int] = []
+    errors: List[str] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        request = scenario.request(ctx)
+        if not request:
+            return
+        url = request.pop("url")
+        async with semaphore:
+            with track_queries() as stats:
+                started = time.perf_counter()
+                response = await client.request(scenario.method, url, **request)
+                latencies.append(time.perf_counter() - started)
+            queries.append(stats.count)
+        if response.status_code not in scenario.expected:
+            errors.append(f"{response.status_code} {response.text[:200]}")
+        _remember(ctx, scenario, url, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return None
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_sample": errors[:3],
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rps": len(latencies) / elapsed,
+        "queries": statistics.fmean(queries),
+    }
+
+
+def _remember(ctx: Context, scenario: Scenario, url: str, response):
+    # Feeds later scenarios: conditional requests, updates/deletes, media.
+    if scenario.name == "projects.detail_anonymous" and "etag" in response.headers:
+        ctx.etags[url.rsplit("/", 1)[1]] = response.headers["etag"]
+    elif scenario.name == "upload.image" and response.status_code == 200:
+        image_url = response.json()["file"]["url"][0]
+        ctx.image_path = image_url.split("/api", 1)[1]
+
+
+async def _load_own_projects(ctx: Context):
+    from app.models.models import Project
+
+    rows = await Project.filter(user_id__in=ctx.creators).values("id", "user_id")
+    for row in rows:
+        ctx.own_projects.setdefault(row["user_id"], []).append(str(row["id"]))
+
+
+async def run(args) -> Dict[str, dict]:
+    import httpx
+
+    from app.core import config
+    from app.core.auth import create_access_token
+    from app.core.db import instrument_queries
+    from app.core.leaderboard import leaderboards
+    from app.core.search import search_engine
+    from app.core.similar import build_similar_projects
+    from app.core.trending import trending
+    from app.main import app
+    from benchmarks.seed import seed
+
+    if args.db_url:
+        config.DATABASE_CONFIG["connections"]["default"] = args.db_url
+
+    async with app.router.lifespan_context(app):
+        instrument_queries()
+        print(f"Seeding {args.users} users and {args.projects} projects...")
+        seeded = await seed(args.users, args.projects, random_seed=args.seed)
+        await search_engine.start()
+        leaderboards.invalidate()
+        await leaderboards.refresh()
+        await trending.rebuild()
+        await trending.refresh()
+        await build_similar_projects()
+
+        ctx = Context(
+            user_ids=seeded.user_ids,
+            project_ids=[str(project_id) for project_id in seeded.project_ids],
+            tokens={
+                user_id: create_access_token(user_id=user_id)[0]
+                for user_id in seeded.user_ids
+            },
+            rng=random.Random(args.seed),
+        )
+
+        results = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+            for scenario in SCENARIOS:
+                if args.scenario and not any(
+                    name in scenario.name for name in args.scenario
+                ):
+                    continue
+                if scenario.name in ("projects.update", "projects.delete"):
+                    if not ctx.own_projects:
+                        await _load_own_projects(ctx)
+                # Warm caches and connections before measuring.
+                await run_scenario(c, scenario, ctx, args.warmup, args.concurrency)
+                result = await run_scenario(
+                    c, scenario, ctx, args.requests, args.concurrency
+                )
+                if result is None:
+                    print(f"{scenario.name}: skipped")
+                    continue
+                results[scenario.name] = result
+                _print_result(scenario.name, result)
+    return results
+
+
+def _print_header():
+    print(
+        f"{'scenario':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        f" {'req/s':>8} {'queries':>8} {'errors':>7}"
+    )
+
+
+def _print_result(name: str, result: dict):
+    print(
+        f"{name:<32} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}"
+        f" {result['p99_ms']:>8.2f} {result['rps']:>8.0f}"
+        f" {result['queries']:>8.2f} {result['errors']:>7}"
+    )
+    for error in result["error_sample"]:
+        print(f"    {error}")
+
+
+def compare(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    latency_tolerance: float,
+    query_tolerance: float,
+) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            regressions.append(f"{name}: not in the baseline")
+            continue
+        limit = expected["p95_ms"] * (1 + latency_tolerance)
+        if result["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']:.2f}ms > {limit:.2f}ms"
+                f" (baseline {expected['p95_ms']:.2f}ms)"
+            )
+        if result["queries"] > expected["queries"] + query_tolerance:
+            regressions.append(
+                f"{name}: {result['queries']:.2f} queries/request"
+                f" > baseline {expected['queries']:.2f}"
+            )
+        if result["errors"] > expected.get("errors", 0):
+            regressions.append(f"{name}: {result['errors']} unexpected responses")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", help="Tortoise URL, e.g. sqlite://:memory:")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200, help="per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scenario", action="append", help="only scenarios containing this"
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5)
+    parser.add_argument("--query-tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.db_url and args.db_url.startswith("sqlite"):
+        # pg_trgm is unavailable outside Postgres.
+        os.environ.setdefault("SEARCH_BACKEND", "memory")
+
+    # Keep uploads out of the working tree.
+    base_dir = tempfile.mkdtemp(prefix="startups-bench-")
+    os.makedirs(os.path.join(base_dir, "uploads", "images"))
+    os.environ["BASE_DIR"] = base_dir
+
+    _print_header()
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        print(f"Wrote {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; record one with --update-baseline")
+        sys.exit(1)
+
+    regressions = compare(
+        results,
+        json.loads(args.baseline.read_text()),
+        args.latency_tolerance,
+        args.query_tolerance,
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compares stdlib/jsonable_encoder encoding with orjson on project payloads.
+
+    python -m benchmarks.json_encoding --blocks 50 200 1000
+"""
+
+import argparse
+import datetime
+import json
+import timeit
+import uuid
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+
+def make_block(index: int) -> dict:
+    kind = index % 4
+    if kind == 0:
+        return {"type": "paragraph", "data": {"text": "Lorem ipsum dolor sit " * 20}}
+    if kind == 1:
+        return {
+            "type": "list",
+            "data": {"style": "unordered", "items": [f"item {i}" for i in range(10)]},
+        }
+    if kind == 2:
+        return {
+            "type": "table",
+            "data": {"content": [[f"{r}:{c}" for c in range(5)] for r in range(5)]},
+        }
+    return {
+        "type": "image",
+        "data": {"file": {"url": [f"https://example.com/{uuid.uuid4().hex}.jpg"]}},
+    }
+
+
+def make_payload(blocks: int) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "user": {
+            "id": 1,
+            "telegram_id": 123456789,
+            "username": "author",
+            "first_name": "First",
+            "last_name": "Last",
+        },
+        "data": [make_block(i) for i in range(blocks)],
+        "views_count": 1000,
+        "likes_count": 100,
+        "shares_count": 10,
+        "created_time": datetime.datetime.now(datetime.timezone.utc),
+        "required_funds": 1_000_000,
+        "liked": False,
+    }
+
+
+def encode_stdlib(payload: dict) -> bytes:
+    # What JSONResponse does for a plain dict returned from an endpoint.
+    return json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def encode_orjson(payload: dict) -> bytes:
+    return orjson.dumps(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocks", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'blocks':>8} {'size KB':>8} {'stdlib ms':>10} {'orjson ms':>10} {'x':>6}")
+    for blocks in args.blocks:
+        payload = make_payload(blocks)
+        assert json.loads(encode_stdlib(payload)) == json.loads(encode_orjson(payload))
+
+        stdlib = timeit.timeit(lambda: encode_stdlib(payload), number=args.number)
+        fast = timeit.timeit(lambda: encode_orjson(payload), number=args.number)
+        size = len(encode_orjson(payload)) / 1024
+        print(
+            f"{blocks:>8} {size:>8.1f} {stdlib / args.number * 1000:>10.3f}"
+            f" {fast / args.number * 1000:>10.3f} {stdlib / fast:>6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Hammers one (user, project) pair with concurrent like toggles and shares.
+
+Runs against the configured database, using a throwaway user and project that
+are deleted afterwards. Exits non-zero if the denormalized counters disagree
+with the interaction rows.
+
+    python -m benchmarks.like_hammer --requests 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from tortoise import Tortoise
+
+from app.core import interactions
+from app.core.config import DATABASE_CONFIG
+from app.models.models import Project, ProjectLike, ProjectShare, User
+
+
+async def hammer(requests: int, concurrency: int) -> bool:
+    user = await User.create(
+        telegram_id=-random.randint(1, 2**62), first_name="like-hammer"
+    )
+    project = await Project.create(
+        user=user, data=[], title="like-hammer", subtitle="", required_funds=1
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = []
+
+    async def call(operation):
+        async with semaphore:
+            try:
+                await operation(user.id, project.id)
+            except Exception as error:
+                errors.append(error)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(call(interactions.toggle_like) for _ in range(requests)),
+            *(call(interactions.record_share) for _ in range(concurrency)),
+        )
+        elapsed = time.perf_counter() - started
+
+        await project.refresh_from_db(fields=["likes_count", "shares_count"])
+        likes = await ProjectLike.filter(project_id=project.id).count()
+        shares = await ProjectShare.filter(project_id=project.id).count()
+        total = requests + concurrency
+        print(f"{total} operations in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+        print(f"likes: counter={project.likes_count} rows={likes}")
+        print(f"shares: counter={project.shares_count} rows={shares}")
+        for error in errors[:5]:
+            print(f"error: {error!r}")
+        return (
+            not errors
+            and project.likes_count == likes
+            and likes in (0, 1)
+            and project.shares_count == shares == 1
+        )
+    finally:
+        await project.delete()
+        await user.delete()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    await Tortoise.init(config=DATABASE_CONFIG)
+    try:
+        ok = await hammer(args.requests, args.concurrency)
+    finally:
+        await Tortoise.close_connections()
+    print("OK" if ok else "FAILED")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""Seeds the configured database with synthetic users, projects and interactions.
+
+    python -m benchmarks.seed --users 500 --projects 2000
+
+Meant for a throwaway benchmark database: rows are only added, never removed.
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+from dataclasses import dataclass
+from typing import List
+from uuid import UUID
+
+from tortoise import Tortoise
+
+from app.core.config import DATABASE_CONFIG
+from app.core.schema import apply_schema_updates
+from app.models.models import Project, ProjectLike, ProjectShare, ProjectView, User
+from benchmarks.json_encoding import make_block
+
+WORDS = (
+    "startup platform cloud mobile health finance education marketplace "
+    "delivery energy solar farming logistics payments analytics robotics "
+    "travel music gaming security privacy social local open smart green"
+).split()
+
+BATCH_SIZE = 1000
+
+
+@dataclass
+class Seeded:
+    user_ids: List[int]
+    project_ids: List[UUID]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_blocks(rng: random.Random, count: int) -> List[dict]:
+    return [
+        {"type": "header", "data": {"text": _sentence(rng, 4), "level": 3}},
+        {"type": "header", "data": {"text": _sentence(rng, 12), "level": 5}},
+        *(make_block(rng.randrange(4)) for _ in range(count - 2)),
+    ]
+
+
+def _sample_users(rng: random.Random, user_ids: List[int], mean: int) -> List[int]:
+    # Skewed so a few projects get most of the interactions.
+    count = min(len(user_ids), int(rng.expovariate(1 / mean)) if mean else 0)
+    return rng.sample(user_ids, count)
+
+
+def _after(
+    rng: random.Random, start: datetime.datetime, end: datetime.datetime
+) -> datetime.datetime:
+    return start + (end - start) * rng.random()
+
+
+async def seed(
+    users: int,
+    projects: int,
+    likes: int = 10,
+    views: int = 40,
+    shares: int = 2,
+    blocks: int = 30,
+    random_seed: int = 0,
+) -> Seeded:
+    rng = random.Random(random_seed)
+    base_telegram_id = rng.randrange(10**12, 2 * 10**12)
+    await User.bulk_create(
+        [
+            User(telegram_id=base_telegram_id + index, first_name=f"User {index}")
+            for index in range(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = await User.filter(
+        telegram_id__gte=base_telegram_id, telegram_id__lt=base_telegram_id + users
+    ).values_list("id", flat=True)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    project_objects, interactions = [], []
+    for _ in range(projects):
+        data = make_blocks(rng, max(2, int(rng.gauss(blocks, blocks / 3))))
+        liked = _sample_users(rng, user_ids, likes)
+        viewed = _sample_users(rng, user_ids, views)
+        shared = _sample_users(rng, user_ids, shares)
+        project = Project(
+            user_id=rng.choice(user_ids),
+            data=data,
+            title=data[0]["data"]["text"],
+            subtitle=data[1]["data"]["text"],
+            required_funds=rng.randrange(1_000, 10_000_000),
+            created_time=now - datetime.timedelta(seconds=rng.randrange(90 * 86400)),
+            likes_count=len(liked),
+            views_count=len(viewed),
+            shares_count=len(shared),
+        )
+        project_objects.append(project)
+        interactions.append((project, liked, viewed, shared))
+
+    await Project.bulk_create(project_objects, batch_size=BATCH_SIZE)
+    for model, position in ((ProjectLike, 1), (ProjectView, 2), (ProjectShare, 3)):
+        await model.bulk_create(
+            [
+                model(
+                    user_id=user_id,
+                    project_id=item[0].id,
+                    created_time=_after(rng, item[0].created_time, now),
+                )
+                for item in interactions
+                for user_id in item[position]
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+    return Seeded(list(user_ids), [project.id for project in project_objects])
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--likes", type=int, default=10, help="mean per project")
+    parser.add_argument("--views", type=int, default=40, help="mean per project")
+    parser.add_argument("--shares", type=int, default=2, help="mean per project")
+    parser.add_argument("--blocks", type=int, default=30, help="mean per project")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    await Tortoise.init(config=DATABASE_CONFIG)
+    try:
+        await Tortoise.generate_schemas()
+        await apply_schema_updates()
+        seeded = await seed(
+            args.users,
+            args.projects,
+            args.likes,
+            args.views,
+            args.shares,
+            args.blocks,
+            args.seed,
+        )
+    finally:
+        await Tortoise.close_connections()
+    print(f"Seeded {len(seeded.user_ids)} users and {len(seeded.project_ids)} projects")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""Times the similar-projects build on synthetic interactions (no database).
+
+    python -m benchmarks.similar_build --projects 20000 --users 200000 \\
+        --interactions 2000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.similar import interaction_matrix, nearest_neighbors
+
+
+def make_interactions(projects: int, users: int, interactions: int, seed: int):
+    rng = np.random.default_rng(seed)
+    # Zipf-like popularity: a few projects get most of the views.
+    popularity = 1 / np.arange(1, projects + 1) ** 0.8
+    project_index = rng.choice(projects, interactions, p=popularity / popularity.sum())
+    user_ids = rng.integers(0, users, interactions)
+    weights = np.where(
+        rng.random(interactions) < 0.2,
+        settings.SIMILAR_WEIGHTS["like"],
+        settings.SIMILAR_WEIGHTS["view"],
+    )
+    return project_index.astype(np.int32), user_ids, weights
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--interactions", type=int, default=2_000_000)
+    parser.add_argument("--k", type=int, default=settings.SIMILAR_K)
+    parser.add_argument(
+        "--batch-cells", type=int, default=settings.SIMILAR_BATCH_CELLS
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    project_index, user_ids, weights = make_interactions(
+        args.projects, args.users, args.interactions, args.seed
+    )
+
+    started = time.perf_counter()
+    matrix = interaction_matrix(project_index, user_ids, weights, args.projects)
+    built = time.perf_counter()
+    neighbors, _ = nearest_neighbors(
+        matrix, args.k, settings.SIMILAR_MIN_SCORE, args.batch_cells
+    )
+    finished = time.perf_counter()
+
+    batch_size = max(1, args.batch_cells // args.projects)
+    print(
+        f"{args.interactions} interactions, {args.projects} projects, "
+        f"{args.users} users, k={args.k}"
+    )
+    print(f"matrix:    {built - started:8.2f}s ({matrix.nnz} non-zero)")
+    print(f"neighbors: {finished - built:8.2f}s ({batch_size} rows per batch)")
+    print(f"covered:   {np.count_nonzero(neighbors[:, 0] >= 0)} projects")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+#!/bin/bash
+# Runs once when the primary's data directory is initialised: lets the
+# replica stream WAL from it with the regular database credentials.
+set -e
+echo "host replication ${POSTGRES_USER} all scram-sha-256" >> "$PGDATA/pg_hba.conf"
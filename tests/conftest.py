@@ -0,0 +1,75 @@
+import os
+
+# Settings are read when app.core.config is imported; the values only have to
+# exist, nothing connects to them.
+for name, value in {
+    "BOT_TOKEN": "test",
+    "ORIGIN": "example.com",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_DB": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest  # noqa: E402
+from tortoise import Tortoise  # noqa: E402
+from tortoise.backends.base.executor import EXECUTOR_CACHE  # noqa: E402
+
+from app.core import deps  # noqa: E402
+from app.core.schema import SCHEMA_UPDATES  # noqa: E402
+
+
+MODELS = {"models": ["app.models.models"]}
+
+
+async def _close():
+    await Tortoise.close_connections()
+    # Insert statements are cached per connection name, whatever the dialect.
+    EXECUTOR_CACHE.clear()
+    # Ids restart with every database, so cached users would belong to another.
+    deps._user_cache.clear()
+
+
+async def _init_sqlite():
+    await Tortoise.init(db_url="sqlite://:memory:", modules=MODELS)
+    await Tortoise.generate_schemas()
+
+
+async def _init_postgres():
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    await Tortoise.init(db_url=url, modules=MODELS)
+    connection = Tortoise.get_connection("default")
+    await connection.execute_script("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+    await Tortoise.generate_schemas()
+    for statement in SCHEMA_UPDATES:
+        # Search indexes are not needed here and pg_trgm is not always there.
+        if "trgm" not in statement:
+            await connection.execute_script(statement)
+
+
+@pytest.fixture
+async def db():
+    await _init_sqlite()
+    yield
+    await _close()
+
+
+@pytest.fixture
+async def pg_db():
+    """A Postgres database from TEST_DATABASE_URL, emptied for every test."""
+    await _init_postgres()
+    yield
+    await _close()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+async def any_db(request):
+    """SQLite and, when TEST_DATABASE_URL is set, Postgres, so a test covers
+    both the ORM fallback and the raw SQL path."""
+    await (_init_sqlite() if request.param == "sqlite" else _init_postgres())
+    yield
+    await _close()
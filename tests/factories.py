@@ -0,0 +1,22 @@
+from itertools import count
+
+from app.models.models import Project, User
+
+
+_telegram_ids = count(1)
+
+
+async def create_user(**fields) -> User:
+    fields = {"first_name": "Test", **fields}
+    return await User.create(telegram_id=next(_telegram_ids), **fields)
+
+
+async def create_project(user: User, **fields) -> Project:
+    fields = {
+        "title": "Project",
+        "subtitle": "",
+        "required_funds": 1000,
+        "data": [],
+        **fields,
+    }
+    return await Project.create(user=user, **fields)
@@ -0,0 +1,56 @@
+import pytest
+
+from app.core.counters import change_counter, recount_counters
+from app.core.interactions import record_share, toggle_like
+from app.models.models import Project, ProjectLike, ProjectShare, ProjectView
+from tests.factories import create_project, create_user
+
+
+async def _counters(project_id) -> tuple:
+    return await Project.get(id=project_id).values_list(
+        "likes_count", "views_count", "shares_count", "version"
+    )
+
+
+async def test_change_counter_moves_the_counter_and_version(any_db):
+    project = await create_project(await create_user())
+    await change_counter(project.id, "views_count", 3)
+    await change_counter(project.id, "views_count", -1)
+    assert await _counters(project.id) == (0, 2, 0, 3)
+
+
+async def test_change_counter_rejects_unknown_fields(any_db):
+    project = await create_project(await create_user())
+    with pytest.raises(ValueError):
+        await change_counter(project.id, "version", 1)
+
+
+async def test_like_unlike_and_share_keep_counters(any_db):
+    users = [await create_user() for _ in range(2)]
+    project = await create_project(users[0])
+
+    await toggle_like(users[0].id, project.id)
+    await toggle_like(users[1].id, project.id)
+    assert (await _counters(project.id))[0] == 2
+    await toggle_like(users[0].id, project.id)
+    assert (await _counters(project.id))[0] == 1
+
+    await record_share(users[0].id, project.id)
+    await record_share(users[0].id, project.id)
+    await record_share(users[1].id, project.id)
+    assert (await _counters(project.id))[2] == 2
+
+
+async def test_recount_corrects_drift(any_db):
+    users = [await create_user() for _ in range(3)]
+    project = await create_project(users[0])
+    untouched = await create_project(users[0])
+    for user in users:
+        await ProjectView.create(user=user, project=project)
+    await ProjectLike.create(user=users[0], project=project)
+    await ProjectShare.create(user=users[1], project=project)
+    await Project.filter(id=untouched.id).update(likes_count=5, shares_count=-1)
+
+    assert await recount_counters() == 2
+    assert (await _counters(project.id))[:3] == (1, 3, 1)
+    assert (await _counters(untouched.id))[:3] == (0, 0, 0)
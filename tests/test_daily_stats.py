@@ -0,0 +1,138 @@
+import datetime
+
+import pytest
+
+from app.core.daily_stats import DailyStatsRollup, get_daily_stats
+from app.core.interactions import toggle_like
+from app.models.models import (
+    ProjectDailyStats,
+    ProjectLike,
+    ProjectUnlike,
+    ProjectView,
+)
+from tests.factories import create_project, create_user
+
+
+DAY = datetime.date(2025, 2, 10)
+
+
+async def test_get_daily_stats_fills_missing_days_with_zeros(db):
+    project = await create_project(await create_user())
+    await ProjectDailyStats.create(project=project, day=DAY, views=3, likes=1)
+    await ProjectDailyStats.create(
+        project=project, day=DAY + datetime.timedelta(days=3), shares=2
+    )
+    # Outside the range.
+    await ProjectDailyStats.create(
+        project=project, day=DAY + datetime.timedelta(days=9), views=9
+    )
+
+    days = await get_daily_stats(
+        project.id, DAY - datetime.timedelta(days=1), DAY + datetime.timedelta(days=4)
+    )
+    assert [day["day"] for day in days] == [
+        DAY + datetime.timedelta(days=offset) for offset in range(-1, 5)
+    ]
+    assert [(day["views"], day["likes"], day["shares"]) for day in days] == [
+        (0, 0, 0),
+        (3, 1, 0),
+        (0, 0, 0),
+        (0, 0, 0),
+        (0, 0, 2),
+        (0, 0, 0),
+    ]
+
+
+async def test_get_daily_stats_of_a_single_day(db):
+    project = await create_project(await create_user())
+    assert await get_daily_stats(project.id, DAY, DAY) == [
+        {"day": DAY, "views": 0, "likes": 0, "shares": 0}
+    ]
+
+
+@pytest.fixture
+def rollup():
+    return DailyStatsRollup(interval=60, delay=0, batch_size=2)
+
+
+async def test_rollup_counts_each_interaction_once(any_db, rollup):
+    users = [await create_user() for _ in range(3)]
+    project = await create_project(users[0])
+    for user in users:
+        await ProjectView.create(user=user, project=project)
+    await ProjectLike.create(user=users[0], project=project)
+
+    assert await rollup.rollup() == 4
+    assert await rollup.rollup() == 0
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    [stats] = await get_daily_stats(project.id, today, today)
+    assert (stats["views"], stats["likes"], stats["shares"]) == (3, 1, 0)
+
+
+async def _likes_today(project) -> int:
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    [stats] = await get_daily_stats(project.id, today, today)
+    return stats["likes"]
+
+
+async def test_relike_is_counted_once(any_db, rollup):
+    user = await create_user()
+    project = await create_project(user)
+    await toggle_like(user.id, project.id)
+    await rollup.rollup()
+    await toggle_like(user.id, project.id)
+    await toggle_like(user.id, project.id)
+    await rollup.rollup()
+
+    assert await _likes_today(project) == 1
+    assert not await ProjectUnlike.exists()
+
+
+async def test_like_removed_before_rollup_is_not_counted(any_db, rollup):
+    users = [await create_user() for _ in range(3)]
+    project = await create_project(users[0])
+    for user in users:
+        await toggle_like(user.id, project.id)
+    await toggle_like(users[0].id, project.id)
+    await rollup.rollup()
+
+    assert await _likes_today(project) == 2
+
+
+async def test_removed_like_is_taken_back(any_db, rollup):
+    user = await create_user()
+    project = await create_project(user)
+    await toggle_like(user.id, project.id)
+    await rollup.rollup()
+    assert await _likes_today(project) == 1
+
+    await toggle_like(user.id, project.id)
+    await rollup.rollup()
+    assert await _likes_today(project) == 0
+
+
+async def test_reset_forgets_removed_likes(any_db, rollup):
+    users = [await create_user() for _ in range(2)]
+    project = await create_project(users[0])
+    for user in users:
+        await toggle_like(user.id, project.id)
+    await rollup.rollup()
+    await toggle_like(users[0].id, project.id)
+
+    await rollup.reset()
+    await rollup.rollup()
+    assert await _likes_today(project) == 1
+
+
+async def test_unlike_waits_for_its_like_to_be_counted(any_db, rollup):
+    users = [await create_user() for _ in range(2)]
+    project = await create_project(users[0])
+    await toggle_like(users[0].id, project.id)
+    await toggle_like(users[0].id, project.id)
+    await rollup.rollup()
+    assert await ProjectUnlike.exists()
+
+    await toggle_like(users[1].id, project.id)
+    await rollup.rollup()
+    assert await _likes_today(project) == 1
+    assert not await ProjectUnlike.exists()
@@ -0,0 +1,71 @@
+import httpx
+import pytest
+
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.main import app
+from app.models.models import Project
+from tests.factories import create_project, create_user
+
+
+@pytest.fixture
+async def client(any_db):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+def base_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BASE_DIR", tmp_path)
+    (tmp_path / "uploads" / "images" / "ab" / "cd").mkdir(parents=True)
+    return tmp_path
+
+
+def _auth(user) -> dict:
+    token, _ = create_access_token(user_id=user.id)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _image(url, **derivatives) -> dict:
+    return {"type": "image", "data": {"file": {"url": url, "derivatives": derivatives}}}
+
+
+async def test_deletes_only_legacy_uploads(client, base_dir):
+    images = base_dir / "uploads" / "images"
+    legacy = images / "0123abcd.png"
+    blob_derivative = images / "ab" / "cd" / "blob_thumb.webp"
+    outside = base_dir / "secret.txt"
+    for path in (legacy, blob_derivative, outside):
+        path.write_bytes(b"x")
+
+    user = await create_user()
+    project = await create_project(
+        user,
+        data=[
+            _image(
+                "https://example.com/api/uploads/images/0123abcd.png",
+                thumb="https://example.com/api/uploads/images/../../secret.txt",
+                small="https://example.com/api/uploads/images/ab/cd/blob_thumb.webp",
+            ),
+            _image(["https://example.com/api//etc/passwd"]),
+        ],
+    )
+
+    response = await client.delete(
+        f"/projects/project/{project.id}", headers=_auth(user)
+    )
+    assert response.status_code == 200
+    assert not legacy.exists()
+    assert outside.exists() and blob_derivative.exists()
+    assert not await Project.exists(id=project.id)
+
+
+async def test_only_the_author_can_delete(client, base_dir):
+    project = await create_project(await create_user())
+    response = await client.delete(
+        f"/projects/project/{project.id}", headers=_auth(await create_user())
+    )
+    assert response.status_code == 403
+    assert await Project.exists(id=project.id)
@@ -0,0 +1,12 @@
+import uuid
+
+import orjson
+from asyncpg.pgproto.pgproto import UUID as PgUUID
+
+from app.core.encoding import dumps
+
+
+def test_dumps_asyncpg_uuid():
+    value = uuid.uuid4()
+    assert orjson.loads(dumps({"id": PgUUID(str(value))})) == {"id": str(value)}
+    assert orjson.loads(dumps({"id": value})) == {"id": str(value)}
@@ -0,0 +1,103 @@
+import csv
+import io
+
+import httpx
+import orjson
+import pytest
+
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.core.export import export_columns, iter_project_batches
+from app.main import app
+from tests.factories import create_project, create_user
+
+
+@pytest.fixture
+async def projects(any_db):
+    user = await create_user()
+    return [await create_project(user, title=f"Project {n}") for n in range(7)]
+
+
+@pytest.fixture
+async def client(any_db):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+async def admin(monkeypatch):
+    user = await create_user()
+    monkeypatch.setattr(settings, "ADMIN_TELEGRAM_IDS", {user.telegram_id})
+    return user
+
+
+def _auth(user) -> dict:
+    token, _ = create_access_token(user_id=user.id)
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _export(columns, cursor=None, batch_size=3) -> list:
+    return [batch async for batch in iter_project_batches(columns, cursor, batch_size)]
+
+
+async def test_batches_cover_every_project_once(projects):
+    batches = await _export(export_columns(False, True))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    ids = [row["id"] for batch in batches for row in batch]
+    assert sorted(ids) == sorted(project.id for project in projects)
+
+
+async def test_resume_from_cursor(projects):
+    columns = export_columns(False, False)
+    rows = [row for batch in await _export(columns) for row in batch]
+
+    resumed = [
+        row for batch in await _export(columns, rows[3]["cursor"]) for row in batch
+    ]
+    assert [row["id"] for row in resumed] == [row["id"] for row in rows[4:]]
+
+
+async def test_csv_columns(client, projects, admin):
+    response = await client.get(
+        "/admin/export/projects",
+        params={"format": "csv", "include_blocks": "true"},
+        headers=_auth(admin),
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    header, *rows = csv.reader(io.StringIO(response.text))
+    assert tuple(header) == (*export_columns(True, True), "cursor")
+    assert len(rows) == len(projects)
+    assert all(len(row) == len(header) for row in rows)
+    assert {row[header.index("title")] for row in rows} == {
+        project.title for project in projects
+    }
+
+
+async def test_ndjson_resumes_after_cursor(client, projects, admin):
+    response = await client.get("/admin/export/projects", headers=_auth(admin))
+    rows = [orjson.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == len(projects)
+
+    response = await client.get(
+        "/admin/export/projects",
+        params={"cursor": rows[1]["cursor"]},
+        headers=_auth(admin),
+    )
+    resumed = [orjson.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in resumed] == [row["id"] for row in rows[2:]]
+
+
+async def test_export_is_admin_only(client, projects, admin):
+    response = await client.get(
+        "/admin/export/projects", headers=_auth(await create_user())
+    )
+    assert response.status_code == 403
+
+    response = await client.get(
+        "/admin/export/projects", params={"cursor": "bogus"}, headers=_auth(admin)
+    )
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from tortoise.exceptions import DoesNotExist
+
+from app.core import interactions
+from app.models.models import ProjectLike, ProjectShare
+from tests.factories import create_project, create_user
+
+
+async def test_like_toggles(any_db):
+    user = await create_user()
+    project = await create_project(user)
+
+    assert await interactions.toggle_like(user.id, project.id) == (True, 1)
+    assert await interactions.toggle_like(user.id, project.id) == (False, 0)
+    assert await interactions.toggle_like(user.id, project.id) == (True, 1)
+
+
+async def test_like_missing_project(any_db):
+    user = await create_user()
+    project = await create_project(user)
+    await project.delete()
+
+    with pytest.raises(DoesNotExist):
+        await interactions.toggle_like(user.id, project.id)
+
+
+async def test_share_once(any_db):
+    user = await create_user()
+    project = await create_project(user)
+
+    assert await interactions.record_share(user.id, project.id) == 1
+    assert await interactions.record_share(user.id, project.id) is None
+
+
+async def test_concurrent_toggles_keep_counters_exact(pg_db):
+    users = [await create_user() for _ in range(5)]
+    project = await create_project(users[0])
+
+    # Nothing but the database serializes these, so concurrent toggles of the
+    # same pair race on the like row and the counter.
+    await asyncio.gather(
+        *(
+            interactions.toggle_like(user.id, project.id)
+            for _ in range(21)
+            for user in users
+        ),
+        *(
+            interactions.record_share(user.id, project.id)
+            for _ in range(5)
+            for user in users
+        ),
+    )
+
+    await project.refresh_from_db(fields=["likes_count", "shares_count"])
+    likes = await ProjectLike.filter(project_id=project.id).count()
+    shares = await ProjectShare.filter(project_id=project.id).count()
+    assert project.likes_count == likes
+    assert project.shares_count == shares == len(users)
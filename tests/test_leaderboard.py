@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.leaderboard import Leaderboards, leaderboards
+from app.main import app
+from tests.factories import create_project, create_user
+
+
+@pytest.fixture
+async def client(any_db, monkeypatch):
+    monkeypatch.setattr(leaderboards, "_entries", {})
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+async def test_changes_are_coalesced(any_db, monkeypatch):
+    board = Leaderboards(size=3, refresh_interval=60, min_refresh_interval=0.05)
+    refreshes = []
+    refresh = board.refresh
+
+    async def counted_refresh():
+        refreshes.append(None)
+        await refresh()
+
+    monkeypatch.setattr(board, "refresh", counted_refresh)
+    await board.start()
+    try:
+        await asyncio.sleep(0.01)
+        assert len(refreshes) == 1
+
+        for _ in range(5):
+            board.invalidate()
+        await asyncio.sleep(0.01)
+        assert len(refreshes) == 1
+        await asyncio.sleep(0.1)
+        assert len(refreshes) == 2
+
+        await asyncio.sleep(0.1)
+        assert len(refreshes) == 2
+    finally:
+        await board.stop()
+
+
+async def test_top_projects(client):
+    user = await create_user()
+    for views, likes in ((5, 1), (9, 0), (1, 7)):
+        await create_project(
+            user, title=f"{views} views", views_count=views, likes_count=likes
+        )
+
+    response = await client.get("/projects/most-viewed", params={"limit": 2})
+    assert [project["title"] for project in response.json()] == ["9 views", "5 views"]
+    response = await client.get("/projects/most-liked", params={"limit": 1})
+    assert [project["title"] for project in response.json()] == ["1 views"]
+
+
+@pytest.mark.parametrize("limit", [0, settings.LEADERBOARD_SIZE + 1])
+async def test_limit_is_bounded(client, limit):
+    response = await client.get("/projects/most-viewed", params={"limit": limit})
+    assert response.status_code == 422
@@ -0,0 +1,88 @@
+from uuid import uuid4
+
+import pytest
+
+from app.core import live
+from app.core.live import LiveCounters, Subscription
+from app.models.models import Project
+from tests.factories import create_project, create_user
+
+
+def test_subscription_keeps_only_the_newest_counts():
+    subscription = Subscription(uuid4())
+    conflated = live.CONFLATED._values.get((), 0)
+    subscription.offer({"likes_count": 1})
+    subscription.offer({"likes_count": 2})
+    assert live.CONFLATED._values[()] == conflated + 1
+
+
+async def test_subscription_next_returns_newest_then_times_out():
+    subscription = Subscription(uuid4())
+    subscription.offer({"likes_count": 1})
+    subscription.offer({"likes_count": 2})
+    assert await subscription.next(timeout=0.01) == {"likes_count": 2}
+    assert await subscription.next(timeout=0.01) is None
+
+
+@pytest.fixture
+def counters():
+    return LiveCounters(interval=1, resync_interval=10, max_subscribers=2)
+
+
+async def test_publishes_are_coalesced_until_flush(db, counters):
+    project = await create_project(await create_user())
+    first = await counters.subscribe(project.id)
+    second = await counters.subscribe(project.id)
+    for subscription in (first, second):
+        assert (await subscription.next(timeout=0.01))["likes_count"] == 0
+
+    counters.publish(project.id, likes_count=1)
+    counters.publish(project.id, likes_count=2, views_count=5)
+    assert await first.next(timeout=0.01) is None
+
+    counters.flush()
+    for subscription in (first, second):
+        counts = await subscription.next(timeout=0.01)
+        assert (counts["likes_count"], counts["views_count"]) == (2, 5)
+
+    # Unchanged counts are not sent again.
+    counters.publish(project.id, likes_count=2)
+    counters.flush()
+    assert await first.next(timeout=0.01) is None
+
+
+async def test_publish_without_subscribers_is_ignored(db, counters):
+    counters.publish(uuid4(), likes_count=1)
+    counters.flush()
+    assert not counters._counts
+
+
+async def test_unsubscribe_and_limits(db, counters):
+    project = await create_project(await create_user())
+    assert await counters.subscribe(uuid4()) is None
+
+    first = await counters.subscribe(project.id)
+    second = await counters.subscribe(project.id)
+    assert counters.full
+    counters.unsubscribe(first)
+    counters.unsubscribe(first)
+    assert not counters.full
+
+    counters.unsubscribe(second)
+    assert not counters._subscribers and not counters._counts
+
+
+async def test_resync_picks_up_other_writers_and_deletions(db, counters):
+    project = await create_project(await create_user())
+    subscription = await counters.subscribe(project.id)
+    await subscription.next(timeout=0.01)
+
+    await Project.filter(id=project.id).update(views_count=7)
+    await counters.resync()
+    counters.flush()
+    assert (await subscription.next(timeout=0.01))["views_count"] == 7
+
+    await project.delete()
+    await counters.resync()
+    assert subscription.closed
+    assert not counters._subscribers
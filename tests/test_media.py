@@ -0,0 +1,103 @@
+import hashlib
+
+import httpx
+import pytest
+
+from app.core.media import IMMUTABLE_CACHE_CONTROL, MediaFiles
+
+BODY = bytes(range(256)) * 4
+SHA = hashlib.sha256(BODY).hexdigest()
+
+
+@pytest.fixture
+def media(tmp_path):
+    (tmp_path / "ab").mkdir()
+    (tmp_path / "ab" / f"{SHA}.png").write_bytes(BODY)
+    (tmp_path / "legacy.png").write_bytes(BODY)
+    (tmp_path / ".partial.png").write_bytes(BODY)
+    (tmp_path.parent / "outside.png").write_bytes(BODY)
+    return MediaFiles(str(tmp_path))
+
+
+@pytest.fixture
+async def client(media):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=media),
+        base_url="http://test",
+    ) as client:
+        yield client
+
+
+async def _get_raw(app, path: str) -> int:
+    """Requests a path as is; httpx would normalize the dot segments away."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(
+        {"type": "http", "method": "GET", "path": path, "headers": []}, receive, send
+    )
+    return messages[0]["status"]
+
+
+async def test_range(client):
+    response = await client.get(f"/ab/{SHA}.png", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+    assert response.content == BODY[10:20]
+
+    response = await client.get("/legacy.png", headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == BODY[-5:]
+
+
+async def test_unsatisfiable_range(client):
+    response = await client.get("/legacy.png", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+    assert response.content == b""
+
+
+async def test_not_modified(client):
+    etag = (await client.get("/legacy.png")).headers["etag"]
+    response = await client.get("/legacy.png", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = await client.get("/legacy.png", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+async def test_stale_if_range_sends_the_whole_file(client):
+    response = await client.get(
+        "/legacy.png", headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+    )
+    assert response.status_code == 200
+    assert response.content == BODY
+
+    etag = (await client.get("/legacy.png")).headers["etag"]
+    response = await client.get(
+        "/legacy.png", headers={"Range": "bytes=0-9", "If-Range": etag}
+    )
+    assert response.status_code == 206
+
+
+async def test_hidden_and_outside_files_are_not_served(client, media):
+    assert (await client.get("/.partial.png")).status_code == 404
+    assert (await client.get("/missing.png")).status_code == 404
+    assert await _get_raw(media, "/../outside.png") == 404
+    assert await _get_raw(media, "/ab/../../outside.png") == 404
+
+
+async def test_cache_control(client):
+    response = await client.get(f"/ab/{SHA}.png")
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == f'"{SHA}"'
+    assert response.content == BODY
+
+    response = await client.get("/legacy.png")
+    assert response.headers["cache-control"] != IMMUTABLE_CACHE_CONTROL
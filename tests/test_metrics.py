@@ -0,0 +1,31 @@
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+
+
+async def _get(headers=None) -> httpx.Response:
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        return await client.get("/metrics", headers=headers)
+
+
+async def test_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert (await _get()).status_code == 404
+
+
+@pytest.mark.parametrize("header", [None, "Bearer wrong", "secret"])
+async def test_requires_token(monkeypatch, header):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret")
+    headers = {"Authorization": header} if header else None
+    assert (await _get(headers)).status_code == 401
+
+
+async def test_serves_metrics(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret")
+    response = await _get({"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.text
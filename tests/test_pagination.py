@@ -0,0 +1,48 @@
+import datetime
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor, paginate
+from app.models.models import Project
+from tests.factories import create_project, create_user
+
+
+def test_cursor_round_trip():
+    created_time = datetime.datetime(2025, 3, 1, 12, 30, tzinfo=datetime.timezone.utc)
+    id = uuid4()
+    cursor = encode_cursor(created_time, id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_time, id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "WzFd", "W10"])
+def test_invalid_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("descending", [True, False])
+async def test_paginate_visits_every_row_once(db, descending):
+    user = await create_user()
+    created_time = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    for offset in range(7):
+        project = await create_project(user)
+        # Pairs with the same created_time are ordered by id.
+        await Project.filter(id=project.id).update(
+            created_time=created_time + datetime.timedelta(minutes=offset // 2)
+        )
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = await paginate(
+            Project.all(), ("id",), cursor, limit=3, descending=descending
+        )
+        seen.extend((row["created_time"], row["id"]) for row in rows)
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert seen == sorted(seen, reverse=descending)
@@ -0,0 +1,78 @@
+import uuid
+
+import httpx
+import pytest
+
+from app.core.auth import create_access_token
+from app.core.db import instrument_queries, track_queries
+from app.main import app
+from app.models.models import ProjectLike
+from tests.factories import create_project, create_user
+
+
+@pytest.fixture
+async def client(any_db):
+    instrument_queries()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+async def projects(any_db):
+    user = await create_user()
+    return [await create_project(user, title=f"Project {n}") for n in range(5)]
+
+
+def _ids(*projects) -> list:
+    return [str(project.id) for project in projects]
+
+
+async def _post(client, path: str, ids: list, **kwargs) -> list:
+    response = await client.post(path, json={"ids": ids}, **kwargs)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize("path", ["/projects/batch", "/projects/stats"])
+async def test_order_duplicates_and_unknown_ids(client, projects, path):
+    first, second, third, *_ = projects
+    ids = [*_ids(third, first), str(uuid.uuid4()), *_ids(third, second)]
+
+    rows = await _post(client, path, ids)
+    assert [row["id"] for row in rows] == _ids(third, first, second)
+
+
+async def test_stats_mark_the_callers_likes(client, projects):
+    user = await create_user()
+    await ProjectLike.create(user=user, project=projects[1])
+    token, _ = create_access_token(user_id=user.id)
+
+    rows = await _post(
+        client,
+        "/projects/stats",
+        _ids(*projects[:3]),
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert [row["liked"] for row in rows] == [False, True, False]
+    assert not any(
+        row["liked"]
+        for row in await _post(client, "/projects/stats", _ids(*projects[:3]))
+    )
+
+
+@pytest.mark.parametrize(
+    "path, queries", [("/projects/batch", 1), ("/projects/stats", 2)]
+)
+async def test_query_count_does_not_grow_with_ids(client, projects, path, queries):
+    user = await create_user()
+    token, _ = create_access_token(user_id=user.id)
+    headers = {"Authorization": f"Bearer {token}"}
+    # Warms the user cache, so only the endpoint's own queries are counted.
+    await _post(client, "/projects/stats", _ids(projects[0]), headers=headers)
+
+    for count in (1, len(projects)):
+        with track_queries() as stats:
+            await _post(client, path, _ids(*projects[:count]), headers=headers)
+        assert stats.count == queries
@@ -0,0 +1,59 @@
+import hashlib
+import hmac
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from tests.factories import create_project, create_user
+
+
+@pytest.fixture
+async def client(any_db):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+def _signed_login(telegram_id: int, **profile) -> dict:
+    data = {"id": telegram_id, "auth_date": int(time.time()), **profile}
+    check = "\n".join(f"{key}={value}" for key, value in sorted(data.items()))
+    secret = hashlib.sha256(settings.BOT_TOKEN.encode()).digest()
+    data["hash"] = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return data
+
+
+async def test_unchanged_detail_is_not_modified(client):
+    project = await create_project(await create_user())
+    response = await client.get(f"/projects/project/{project.id}")
+    assert response.status_code == 200
+
+    etag = response.headers["ETag"]
+    response = await client.get(
+        f"/projects/project/{project.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+
+async def test_author_profile_change_invalidates_detail(client):
+    author = await create_user(first_name="Before")
+    project = await create_project(author)
+    response = await client.get(f"/projects/project/{project.id}")
+    assert response.json()["user"]["first_name"] == "Before"
+    etag = response.headers["ETag"]
+
+    response = await client.post(
+        "/auth/telegram-login",
+        json=_signed_login(author.telegram_id, first_name="After"),
+    )
+    assert response.status_code == 200
+
+    response = await client.get(
+        f"/projects/project/{project.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["user"]["first_name"] == "After"
@@ -0,0 +1,55 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.project import CreateProjectData
+
+
+def _payload(*blocks) -> dict:
+    return {
+        "blocks": [
+            {"type": "header", "data": {"text": "A title", "level": 3}},
+            {"type": "header", "data": {"text": "A longer subtitle", "level": 5}},
+            *blocks,
+        ],
+        "requiredFunds": 100,
+    }
+
+
+def test_valid_project():
+    project = CreateProjectData.model_validate(
+        _payload(
+            {"type": "image", "data": {"file": {"url": ["https://x.test/a.png"]}}}
+        )
+    )
+    assert project.title == "A title"
+    assert project.image_url == "https://x.test/a.png"
+
+
+@pytest.mark.parametrize(
+    "block",
+    [
+        {"type": "image", "data": {"file": {"url": []}}},
+        {"type": "image", "data": {"file": {"url": [1]}}},
+        {"type": "image", "data": {"file": {"url": 1}}},
+        {"type": "image", "data": {"file": "https://x.test/a.png"}},
+        {"type": "header", "data": {"text": ["A title"], "level": 3}},
+        {"type": "header", "data": {"text": "A title", "level": "3"}},
+    ],
+)
+def test_malformed_block_is_a_validation_error(block):
+    with pytest.raises(ValidationError):
+        CreateProjectData.model_validate(_payload(block))
+
+
+def test_malformed_title_is_a_validation_error():
+    payload = _payload()
+    payload["blocks"][0]["data"]["text"] = 12345678
+    with pytest.raises(ValidationError):
+        CreateProjectData.model_validate(payload)
+
+
+def test_unencodable_block_is_a_validation_error():
+    with pytest.raises(ValidationError):
+        CreateProjectData.model_validate(
+            _payload({"type": "paragraph", "data": {"n": 10**30}})
+        )
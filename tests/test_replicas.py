@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from app.core import replicas as replicas_module
+from app.core.replicas import (
+    STICKY_COOKIE,
+    ReplicaRoutingMiddleware,
+    ReplicaSet,
+    read_connection_name,
+)
+
+
+@pytest.fixture
+def replica_set(monkeypatch):
+    replica_set = ReplicaSet(
+        names=["replica"],
+        check_interval=1,
+        max_lag=1,
+        sticky_seconds=10,
+        sticky_cache_size=10,
+    )
+    monkeypatch.setattr(replicas_module, "replicas", replica_set)
+    return replica_set
+
+
+async def _request(method: str, cookie: str = None):
+    routes = []
+
+    async def app(scope, receive, send):
+        routes.append(read_connection_name())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    scope = {"type": "http", "method": method, "path": "/", "headers": headers}
+    await ReplicaRoutingMiddleware(app)(scope, None, send)
+    return routes[0], dict(messages[0]["headers"])
+
+
+async def test_reads_go_to_replicas(replica_set):
+    assert (await _request("GET"))[0] == "replica"
+
+
+async def test_write_makes_reads_sticky_through_a_cookie(replica_set):
+    # No token, as when logging in.
+    route, headers = await _request("POST")
+    assert route == "default"
+    cookie = headers[b"set-cookie"].decode().split(";")[0]
+    assert cookie.startswith(f"{STICKY_COOKIE}=")
+
+    assert (await _request("GET", cookie))[0] == "default"
+    expired = f"{STICKY_COOKIE}={int(time.time()) - 1}"
+    assert (await _request("GET", expired))[0] == "replica"
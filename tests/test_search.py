@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+
+from app.core.search import TrigramIndexBackend, trigrams
+from app.models.models import Project
+from tests.factories import create_project, create_user
+
+
+def test_trigrams_match_pg_trgm():
+    assert trigrams("Cat!") == {"  c", " ca", "cat", "at "}
+    assert trigrams("") == set()
+
+
+@pytest.fixture
+async def backend(db):
+    user = await create_user()
+    created_time = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    for offset, (title, subtitle) in enumerate(
+        [
+            ("Solar farm", "Clean energy for villages"),
+            ("Solar panels", "Rooftop kits"),
+            ("Bakery", "Fresh bread every morning"),
+            ("Water pumps", "Solar powered irrigation"),
+            ("Solaris", "Space game"),
+        ]
+    ):
+        project = await create_project(user, title=title, subtitle=subtitle)
+        await Project.filter(id=project.id).update(
+            created_time=created_time + datetime.timedelta(days=offset)
+        )
+
+    backend = TrigramIndexBackend(threshold=0.5)
+    await backend.start()
+    return backend
+
+
+async def test_ranks_full_matches_first_then_newest(backend):
+    rows, total = await backend.search("solar", 0, 10)
+    titles = [row["title"] for row in rows]
+    # Exact word matches rank above the partial "Solaris", newest first.
+    assert titles[:3] == ["Water pumps", "Solar panels", "Solar farm"]
+    assert titles[3:] == ["Solaris"]
+    assert total == 4
+    assert set(rows[0]) == {"id", "title", "subtitle", "image_url", "image_derivatives"}
+
+
+async def test_below_threshold_and_empty_queries_match_nothing(backend):
+    assert await backend.search("zzzz", 0, 10) == ([], 0)
+    assert await backend.search("!!", 0, 10) == ([], 0)
+
+
+async def test_pagination_keeps_total(backend):
+    first, total = await backend.search("solar", 0, 2)
+    second, second_total = await backend.search("solar", 2, 2)
+    past_end, past_end_total = await backend.search("solar", 10, 2)
+    assert total == second_total == past_end_total == 4
+    assert len(first) == len(second) == 2
+    assert not {row["id"] for row in first} & {row["id"] for row in second}
+    assert past_end == []
+
+
+async def test_remove_and_reindex(backend):
+    rows, _ = await backend.search("solar", 0, 10)
+    backend.remove(rows[0]["id"])
+    backend.remove(rows[0]["id"])
+    rows_after, total = await backend.search("solar", 0, 10)
+    assert total == 3
+    assert rows[0]["id"] not in {row["id"] for row in rows_after}
+    # Postings of removed documents are dropped, not left empty.
+    assert all(backend._title_postings.values())
+    assert all(backend._subtitle_postings.values())
+
+    project = await Project.get(id=rows_after[0]["id"])
+    project.title, project.subtitle = "Bread oven", "Wood fired"
+    backend.index(project)
+    assert project.id not in {
+        row["id"] for row in (await backend.search("solar", 0, 10))[0]
+    }
+    assert (await backend.search("oven", 0, 10))[0][0]["id"] == project.id
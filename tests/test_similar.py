@@ -0,0 +1,71 @@
+import numpy as np
+from scipy import sparse
+
+from app.core.similar import interaction_matrix, nearest_neighbors
+
+
+def _brute_force(matrix: sparse.csr_matrix, k: int, min_score: float):
+    similarity = (matrix @ matrix.T).toarray()
+    np.fill_diagonal(similarity, -np.inf)
+    result = []
+    for row in similarity:
+        order = sorted(
+            (column for column in range(len(row)) if row[column] >= min_score),
+            key=lambda column: (-row[column], column),
+        )
+        result.append(order[:k])
+    return result
+
+
+def test_interaction_matrix_rows_are_unit_length():
+    matrix = interaction_matrix(
+        np.array([0, 0, 1, 2]),
+        np.array([10, 20, 10, 30]),
+        np.array([1, 3, 1, 1], dtype=np.float32),
+        project_count=4,
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    assert np.allclose(norms, [1, 1, 1, 0])
+
+
+def test_nearest_neighbors_matches_brute_force():
+    rng = np.random.default_rng(1)
+    size = 2000
+    matrix = interaction_matrix(
+        rng.integers(0, 60, size),
+        rng.integers(0, 150, size),
+        rng.integers(1, 4, size).astype(np.float32),
+        project_count=60,
+    )
+    # A small batch size makes the loop run over many batches.
+    neighbors, scores = nearest_neighbors(matrix, k=5, min_score=0.05, batch_cells=500)
+
+    expected = _brute_force(matrix, k=5, min_score=0.05)
+    similarity = (matrix @ matrix.T).toarray()
+    for row, columns in enumerate(expected):
+        found = [column for column in neighbors[row] if column >= 0]
+        assert row not in found
+        assert len(found) == len(columns)
+        # Ties may be broken either way, so compare the scores.
+        assert np.allclose(
+            sorted(similarity[row, found]), sorted(similarity[row, columns]), atol=1e-6
+        )
+        assert np.allclose(scores[row, : len(found)], similarity[row, found])
+
+
+def test_nearest_neighbors_pads_missing_neighbors():
+    matrix = interaction_matrix(
+        np.array([0, 1]), np.array([1, 1]), np.ones(2, np.float32), project_count=3
+    )
+    neighbors, scores = nearest_neighbors(matrix, k=5, min_score=0.01, batch_cells=10)
+    assert neighbors.shape == (3, 2)
+    assert neighbors.tolist() == [[1, -1], [0, -1], [-1, -1]]
+    assert scores[0, 0] == scores[1, 0] == 1
+
+
+def test_nearest_neighbors_of_one_project():
+    matrix = interaction_matrix(
+        np.array([0]), np.array([1]), np.ones(1, np.float32), project_count=1
+    )
+    neighbors, _ = nearest_neighbors(matrix, k=5, min_score=0.01, batch_cells=10)
+    assert neighbors.shape == (1, 0)
@@ -0,0 +1,75 @@
+import datetime
+import os
+
+import pytest
+
+from app.core import storage
+from app.core.storage import (
+    ImageCollector,
+    blob_stem,
+    extract_image_hashes,
+    release_images,
+    sync_project_images,
+)
+from app.models.models import ProjectImage, StoredImage
+from tests.factories import create_project, create_user
+
+
+GRACE = 3600
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "images_dir", lambda: str(tmp_path))
+    return tmp_path
+
+
+async def _stored_image(images, name: str, age: float) -> StoredImage:
+    sha256 = name * 64
+    stem = blob_stem(sha256)
+    os.makedirs(images / os.path.dirname(stem), exist_ok=True)
+    for filename in (f"{stem}.png", *storage._derivative_filenames(stem).values()):
+        (images / filename).write_bytes(b"image")
+    image = await StoredImage.create(sha256=sha256, extension="png", size=5)
+    await StoredImage.filter(sha256=sha256).update(
+        last_used_time=datetime.datetime.now(datetime.timezone.utc)
+        - datetime.timedelta(seconds=age)
+    )
+    return image
+
+
+def _exists(images, image: StoredImage) -> bool:
+    return (images / f"{blob_stem(image.sha256)}.png").exists()
+
+
+async def test_collects_only_old_unreferenced_images(any_db, images):
+    project = await create_project(await create_user())
+    old = await _stored_image(images, "a", GRACE * 2)
+    recent = await _stored_image(images, "b", GRACE / 2)
+    referenced = await _stored_image(images, "c", GRACE * 2)
+    released = await _stored_image(images, "d", GRACE * 2)
+    await ProjectImage.create(project=project, image=referenced)
+    await release_images({released.sha256})
+
+    collector = ImageCollector(interval=60, grace=GRACE, batch_size=1)
+    assert await collector.collect() == 1
+
+    remaining = set(await StoredImage.all().values_list("sha256", flat=True))
+    assert remaining == {recent.sha256, referenced.sha256, released.sha256}
+    assert not _exists(images, old)
+    assert not any(images.rglob(f"{old.sha256}*"))
+    assert all(_exists(images, image) for image in (recent, referenced, released))
+    assert await ProjectImage.filter(image_id=referenced.sha256).exists()
+
+
+@pytest.mark.parametrize("as_list", [False, True])
+async def test_project_keeps_its_image_through_collection(any_db, images, as_list):
+    image = await _stored_image(images, "e", GRACE * 2)
+    url = f"https://example.com/api/uploads/images/{blob_stem(image.sha256)}.png"
+    blocks = [{"type": "image", "data": {"file": {"url": [url] if as_list else url}}}]
+    project = await create_project(await create_user(), data=blocks)
+    await sync_project_images(project, extract_image_hashes(blocks))
+
+    collector = ImageCollector(interval=60, grace=GRACE, batch_size=10)
+    assert await collector.collect() == 0
+    assert _exists(images, image)
@@ -0,0 +1,201 @@
+import asyncio
+import math
+import time
+from uuid import uuid4
+
+import pytest
+
+from app.core import trending as trending_module
+from app.core.trending import EPOCH, TrendingEngine, _logaddexp
+from app.models.models import ProjectLike, ProjectTrending, ProjectView
+from tests.factories import create_project, create_user
+
+
+HALF_LIFE = 3600
+
+
+@pytest.fixture
+def engine():
+    return TrendingEngine(
+        half_life=HALF_LIFE,
+        weights={"view": 1, "like": 4, "share": 8},
+        size=10,
+        refresh_interval=5,
+        checkpoint_interval=30,
+        prune_interval=3600,
+        min_score=0.05,
+        liked_cache_size=2,
+    )
+
+
+@pytest.fixture
+def now(monkeypatch):
+    current = [EPOCH + 400 * 86400]
+    monkeypatch.setattr(trending_module.time, "time", lambda: current[0])
+    return current
+
+
+def _score(engine: TrendingEngine, project_id, at: float) -> float:
+    return math.exp(engine._scores[project_id] - engine.decay * (at - EPOCH))
+
+
+@pytest.mark.parametrize("a, b", [(0.0, 0.0), (1.5, -2.0), (-700.0, 3.0)])
+def test_logaddexp(a, b):
+    assert _logaddexp(a, b) == pytest.approx(math.log(math.exp(a) + math.exp(b)))
+
+
+def test_logaddexp_of_large_values_does_not_overflow():
+    assert _logaddexp(5000.0, 5000.0) == pytest.approx(5000 + math.log(2))
+
+
+def test_score_is_weighted_and_halves_every_half_life(engine, now):
+    project_id = uuid4()
+    engine.record(project_id, "view", count=3)
+    engine.record(project_id, "like")
+    assert _score(engine, project_id, now[0]) == pytest.approx(7)
+    assert _score(engine, project_id, now[0] + HALF_LIFE) == pytest.approx(3.5)
+
+
+def test_older_interactions_count_less(engine, now):
+    project_id = uuid4()
+    engine.record(project_id, "share", at=now[0] - 2 * HALF_LIFE)
+    assert _score(engine, project_id, now[0]) == pytest.approx(2)
+
+
+def test_scores_stay_finite_long_after_epoch(engine, now):
+    # e^(decay * t) itself overflows a float after about a year of hourly
+    # half-lives.
+    now[0] = EPOCH + 50 * 365 * 86400
+    project_id = uuid4()
+    engine.record(project_id, "view")
+    assert math.isfinite(engine._scores[project_id])
+    assert _score(engine, project_id, now[0]) == pytest.approx(1)
+
+
+def test_pending_tracks_unwritten_records(engine, now):
+    project_id = uuid4()
+    engine.record(project_id, "view")
+    engine.record(project_id, "view")
+    assert engine._pending[project_id] == pytest.approx(engine._scores[project_id])
+    engine.record(project_id, "view", count=0)
+    assert _score(engine, project_id, now[0]) == pytest.approx(2)
+
+
+def test_like_is_counted_once_per_user(engine, now):
+    project_id = uuid4()
+    engine.record_like(1, project_id)
+    engine.record_like(1, project_id)
+    engine.record_like(2, project_id)
+    assert _score(engine, project_id, now[0]) == pytest.approx(8)
+
+
+def test_top_orders_by_current_score(engine, now):
+    quiet, busy = uuid4(), uuid4()
+    engine.record(quiet, "view")
+    engine.record(busy, "share")
+    engine._top = [
+        {"id": project_id, "card": {"id": project_id}, "log_score": score}
+        for project_id, score in sorted(
+            engine._scores.items(), key=lambda item: item[1], reverse=True
+        )
+    ]
+    top = engine.top(10)
+    assert [entry["id"] for entry in top] == [busy, quiet]
+    assert [entry["score"] for entry in top] == pytest.approx([8, 1])
+
+    engine.remove(busy)
+    assert [entry["id"] for entry in engine.top(10)] == [quiet]
+
+
+async def test_checkpoint_merges_scores_from_other_workers(any_db, engine):
+    project = await create_project(await create_user())
+    other = TrendingEngine(
+        half_life=HALF_LIFE,
+        weights=engine.weights,
+        size=10,
+        refresh_interval=5,
+        checkpoint_interval=30,
+        prune_interval=3600,
+        min_score=0.05,
+        liked_cache_size=2,
+    )
+    engine.record(project.id, "view")
+    other.record(project.id, "share")
+    await engine.checkpoint()
+    await other.checkpoint()
+    await engine.checkpoint()
+
+    assert not engine._pending
+    assert engine._scores[project.id] == pytest.approx(other._scores[project.id])
+    assert _score(engine, project.id, time.time()) == pytest.approx(9, rel=1e-3)
+
+
+async def test_rebuild_matches_recorded_scores(any_db, engine):
+    users = [await create_user() for _ in range(3)]
+    project = await create_project(users[0])
+    for user in users:
+        await ProjectView.create(user=user, project=project)
+        engine.record(project.id, "view")
+    await ProjectLike.create(user=users[0], project=project)
+    engine.record_like(users[0].id, project.id)
+    recorded = engine._scores[project.id]
+
+    assert await engine.rebuild() == 1
+    assert not engine._pending
+    assert engine._scores[project.id] == pytest.approx(recorded, abs=1e-3)
+    assert await ProjectTrending.filter(project_id=project.id).exists()
+
+
+async def test_rebuild_skips_backfilled_interactions(any_db, engine):
+    user = await create_user()
+    project = await create_project(user)
+    view = await ProjectView.create(user=user, project=project)
+    await ProjectView.filter(id=view.id).update(created_time=project.created_time)
+
+    assert await engine.rebuild() == 0
+    assert not await ProjectTrending.exists()
+
+
+async def test_prune_deletes_decayed_scores(any_db, engine, now):
+    fresh = await create_project(await create_user())
+    stale = await create_project(await create_user())
+    engine.record(fresh.id, "view")
+    engine.record(stale.id, "view", at=now[0] - 10 * HALF_LIFE)
+    await engine.checkpoint()
+    assert await ProjectTrending.all().count() == 2
+
+    await engine.prune()
+    assert await ProjectTrending.all().values_list("project_id", flat=True) == [
+        fresh.id
+    ]
+
+
+async def test_concurrent_rebuilds(any_db, engine):
+    users = [await create_user() for _ in range(3)]
+    projects = [await create_project(user) for user in users]
+    for user in users:
+        for project in projects:
+            await ProjectView.create(user=user, project=project)
+    other = TrendingEngine(
+        half_life=HALF_LIFE,
+        weights=engine.weights,
+        size=10,
+        refresh_interval=5,
+        checkpoint_interval=30,
+        prune_interval=3600,
+        min_score=0.05,
+        liked_cache_size=2,
+    )
+
+    assert await asyncio.gather(engine.rebuild(), other.rebuild()) == [3, 3]
+    assert await ProjectTrending.all().count() == 3
+
+
+async def test_start_does_not_rebuild(any_db, engine):
+    project = await create_project(await create_user())
+    await ProjectView.create(user=project.user, project=project)
+
+    await engine.start()
+    await engine.stop()
+    assert not engine._scores
+    assert not await ProjectTrending.exists()
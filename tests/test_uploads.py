@@ -0,0 +1,106 @@
+import hashlib
+import io
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.core.images import shutdown_pool
+from app.core.storage import blob_stem
+from app.core.uploads import MULTIPART_OVERHEAD
+from app.main import app
+from app.models.models import StoredImage
+from tests.factories import create_user
+
+BOUNDARY = "upload-test-boundary"
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BASE_DIR", tmp_path)
+    images = tmp_path / "uploads" / "images"
+    images.mkdir(parents=True)
+    yield images
+    shutdown_pool()
+
+
+@pytest.fixture
+async def client(any_db, images):
+    user = await create_user()
+    token, _ = create_access_token(user_id=user.id)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        yield client
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _multipart(content: bytes, filename: str = "image.png") -> bytes:
+    return (
+        (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            "Content-Type: image/png\r\n\r\n"
+        ).encode()
+        + content
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+
+async def _upload(client, content) -> httpx.Response:
+    return await client.post(
+        "/uploadImage",
+        content=content,
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+
+
+def _files(images) -> list:
+    return [path for path in images.rglob("*") if path.is_file()]
+
+
+async def test_upload_is_stored_under_its_hash(client, images):
+    png = _png()
+    sha256 = hashlib.sha256(png).hexdigest()
+
+    response = await _upload(client, _multipart(png))
+    assert response.status_code == 200
+    url = response.json()["file"]["url"][0]
+    assert url.endswith(f"/images/{blob_stem(sha256)}.png")
+    assert (images / f"{blob_stem(sha256)}.png").read_bytes() == png
+    assert await StoredImage.exists(sha256=sha256, extension="png", size=len(png))
+
+
+async def test_renamed_non_image_is_rejected(client, images):
+    response = await _upload(client, _multipart(b"%PDF-1.4 " * 100, "scan.png"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "invalid image type"
+    assert _files(images) == []
+
+
+async def test_oversized_upload_is_cut_off(client, images, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_IMAGE_SIZE", 1024)
+    chunk_size = 16 * 1024
+    sent = []
+
+    async def body():
+        yield _multipart(b"")[: -len(f"\r\n--{BOUNDARY}--\r\n")] + _png()
+        for _ in range(100):
+            sent.append(chunk_size)
+            yield b"\0" * chunk_size
+
+    response = await _upload(client, body())
+    assert response.status_code == 400
+    assert response.json()["detail"] == "invalid image size"
+    # Streamed without a Content-Length, so the limit is enforced as it arrives.
+    assert sum(sent) <= 1024 + MULTIPART_OVERHEAD + chunk_size
+    assert _files(images) == []
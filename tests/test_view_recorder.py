@@ -0,0 +1,68 @@
+import uuid
+
+import pytest
+
+from app.core.view_recorder import ViewRecorder
+from app.models.models import ProjectView
+from tests.factories import create_project, create_user
+
+
+def _recorder(**options) -> ViewRecorder:
+    options = {"batch_size": 100, "max_pending": 100, **options}
+    return ViewRecorder(flush_interval=60, recorded_cache_size=100, **options)
+
+
+async def _counts(project) -> tuple:
+    await project.refresh_from_db(fields=["views_count", "version"])
+    return project.views_count, project.version
+
+
+async def test_flush_counts_each_viewer_once(any_db):
+    author, viewer, other = (
+        await create_user(),
+        await create_user(),
+        await create_user(),
+    )
+    project = await create_project(author)
+    before = await _counts(project)
+
+    recorder = _recorder(batch_size=2)
+    recorder.record(viewer.id, project.id)
+    recorder.record(viewer.id, project.id)
+    recorder.record(other.id, project.id)
+    recorder.record(viewer.id, uuid.uuid4())
+    assert len(recorder._pending) == 3
+    await recorder.flush()
+
+    assert await _counts(project) == (before[0] + 2, before[1] + 1)
+    assert await ProjectView.filter(project_id=project.id).count() == 2
+
+    # Views stored by an earlier flush or another worker are not counted again.
+    recorder.record(viewer.id, project.id)
+    assert not recorder._pending
+    fresh = _recorder()
+    fresh.record(other.id, project.id)
+    await fresh.flush()
+    assert await _counts(project) == (before[0] + 2, before[1] + 1)
+
+
+async def test_failed_flush_requeues_the_batch(any_db, monkeypatch):
+    viewer = await create_user()
+    project = await create_project(await create_user())
+    before = await _counts(project)
+    recorder = _recorder()
+    recorder.record(viewer.id, project.id)
+
+    async def fail(batch):
+        raise ConnectionError
+
+    monkeypatch.setattr(recorder, "_write", fail)
+    with pytest.raises(ConnectionError):
+        await recorder.flush()
+    assert list(recorder._pending) == [(viewer.id, project.id)]
+    assert await _counts(project) == before
+
+    monkeypatch.undo()
+    await recorder.flush()
+    assert not recorder._pending
+    assert await _counts(project) == (before[0] + 1, before[1] + 1)